@@ -0,0 +1,9 @@
+"""
+fmtshift ベンチマーク
+
+合成した入力ファイルで変換の各フェーズ（読み込み・書き込み）の時間と
+ピークメモリを計測し、結果をJSONで保存・比較する。
+
+    python -m bench run -o result.json
+    python -m bench compare base.json result.json
+"""
@@ -0,0 +1,147 @@
+"""
+ベンチマークのCLI
+
+    python -m bench run [-o result.json] [--scale 0.1] [--repeat 3] [--case base]
+    python -m bench startup [-o startup.json] [--repeat 5]
+    python -m bench styles [-o styles.json] [--scale 1.0] [--repeat 3]
+    python -m bench rows [-o rows.json] [--scale 1.0] [--repeat 5]
+    python -m bench compare base.json result.json [--threshold 0.1] [--min-seconds 0.05]
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from bench.rows import run_rows
+from bench.runner import compare_results, default_cases, environment, run_suite
+from bench.startup import run_startup
+from bench.styles import run_styles
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m bench',
+                                     description='fmtshift の変換性能を計測・比較')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='合成した入力で計測してJSONに保存')
+    run.add_argument('-o', '--output', help='結果のJSONファイル (既定: 標準出力)')
+    run.add_argument('--scale', type=float, default=1.0,
+                     help='行数の倍率 (既定: 1.0 = 基準2000行)')
+    run.add_argument('--repeat', type=int, default=1,
+                     help='繰り返す回数 (時間は最小値を記録, 既定: 1)')
+    run.add_argument('--case', action='append', dest='cases',
+                     help='実行するケース名 (複数指定可, 既定: 全て)')
+    run.add_argument('--engine', default='openpyxl', help='FormatConverter のエンジン')
+    run.add_argument('--work-dir', help='入力・出力ファイルを残すディレクトリ')
+
+    startup = commands.add_parser('startup', help='CLIの起動時間とインポートを計測')
+    startup.add_argument('-o', '--output', help='結果のJSONファイル (既定: 標準出力)')
+    startup.add_argument('--repeat', type=int, default=5,
+                         help='繰り返す回数 (最小値を記録, 既定: 5)')
+
+    styles = commands.add_parser('styles', help='Excelのセルの書式の書き込みを計測')
+    styles.add_argument('-o', '--output', help='結果のJSONファイル (既定: 標準出力)')
+    styles.add_argument('--scale', type=float, default=1.0,
+                        help='行数の倍率 (既定: 1.0 = 基準2000行)')
+    styles.add_argument('--repeat', type=int, default=3,
+                        help='繰り返す回数 (時間は最小値を記録, 既定: 3)')
+
+    rows = commands.add_parser('rows', help='100列の行の変換（ExcelParser）を計測')
+    rows.add_argument('-o', '--output', help='結果のJSONファイル (既定: 標準出力)')
+    rows.add_argument('--scale', type=float, default=1.0,
+                      help='行数の倍率 (既定: 1.0 = 基準2000行)')
+    rows.add_argument('--repeat', type=int, default=5,
+                      help='繰り返す回数 (時間は最小値を記録, 既定: 5)')
+
+    compare = commands.add_parser('compare', help='2つの結果を比較')
+    compare.add_argument('base', help='基準の結果のJSONファイル')
+    compare.add_argument('new', help='比較する結果のJSONファイル')
+    compare.add_argument('--threshold', type=float, default=0.1,
+                         help='悪化とみなす増加率 (既定: 0.1 = 10%%)')
+    compare.add_argument('--min-seconds', type=float, default=0.05,
+                         help='悪化とみなす時間の最小の増加量 (秒, 既定: 0.05)')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run_command(args, parser)
+    elif args.command == 'startup':
+        startup_command(args)
+    elif args.command == 'styles':
+        styles_command(args)
+    elif args.command == 'rows':
+        rows_command(args)
+    else:
+        compare_command(args)
+
+
+def run_command(args, parser):
+    """計測して結果を保存"""
+    cases = default_cases(args.scale)
+    if args.cases:
+        names = {name for name, _ in cases}
+        unknown = set(args.cases) - names
+        if unknown:
+            parser.error(f'不明なケース: {", ".join(sorted(unknown))} '
+                         f'(ケース: {", ".join(name for name, _ in cases)})')
+        cases = [(name, spec) for name, spec in cases if name in args.cases]
+
+    log = lambda line: print(line, file=sys.stderr)
+    work_dir = Path(args.work_dir) if args.work_dir else None
+    result = run_suite(cases, repeat=args.repeat, engine=args.engine,
+                       work_dir=work_dir, log=log)
+
+    save_result(result, args.output)
+
+
+def startup_command(args):
+    """起動時間を計測して保存し、不要なモジュールがインポートされた場合は終了コード1"""
+    log = lambda line: print(line, file=sys.stderr)
+    results = run_startup(repeat=args.repeat, log=log)
+    save_result({'meta': environment('openpyxl', args.repeat), 'results': results}, args.output)
+
+    if any(record['forbidden_imports'] for record in results):
+        print('✗ 変換に不要なモジュールがインポートされています', file=sys.stderr)
+        sys.exit(1)
+
+
+def styles_command(args):
+    """セルの書式の書き込みを計測して保存"""
+    log = lambda line: print(line, file=sys.stderr)
+    results = run_styles(scale=args.scale, repeat=args.repeat, log=log)
+    save_result({'meta': environment('openpyxl', args.repeat), 'results': results}, args.output)
+
+
+def rows_command(args):
+    """行の変換を計測して保存"""
+    log = lambda line: print(line, file=sys.stderr)
+    results = run_rows(scale=args.scale, repeat=args.repeat, log=log)
+    save_result({'meta': environment('openpyxl', args.repeat), 'results': results}, args.output)
+
+
+def save_result(result: dict, output):
+    """結果をJSONで保存（output がNoneの場合は標準出力）"""
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if output:
+        Path(output).write_text(text + '\n', encoding='utf-8')
+    else:
+        print(text)
+
+
+def compare_command(args):
+    """比較結果を表示し、悪化がある場合は終了コード1"""
+    base = json.loads(Path(args.base).read_text(encoding='utf-8'))
+    new = json.loads(Path(args.new).read_text(encoding='utf-8'))
+
+    rows = compare_results(base, new, args.threshold, args.min_seconds)
+    for row in rows:
+        mark = '✗' if row['regressed'] else ' '
+        print(f"{mark} {row['case']:<16} {row['direction']:<9} {row['metric']:<12} "
+              f"{row['base']:>10.3f} → {row['new']:>10.3f} ({row['ratio'] - 1:+.1%})")
+
+    regressed = [row for row in rows if row['regressed']]
+    print(f'比較: {len(rows)} 件, 悪化: {len(regressed)} 件 (しきい値 {args.threshold:.0%})')
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Generators - ベンチマーク用の合成ファイルを作成
+"""
+import random
+from dataclasses import dataclass, asdict
+from pathlib import Path
+import openpyxl
+
+ASCII_CHARS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+CJK_CHARS = 'あいうえおかきくけこアイウエオ日本語漢字表計算変換形式文書資料'
+
+
+@dataclass
+class InputSpec:
+    """合成する入力の形"""
+    rows: int = 2000
+    columns: int = 10
+    sheets: int = 1
+    cell_length: int = 8
+    cjk: bool = False
+    # テーブル1行あたりのコードブロックの行数・リスト項目数（Markdownのみ）
+    code_density: float = 0.0
+    list_density: float = 0.0
+    seed: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class _CellFactory:
+    """シードから再現できるセルの値を作成"""
+
+    def __init__(self, spec: InputSpec):
+        self.spec = spec
+        self.random = random.Random(spec.seed)
+        self.chars = CJK_CHARS if spec.cjk else ASCII_CHARS
+
+    def text(self) -> str:
+        return ''.join(self.random.choices(self.chars, k=self.spec.cell_length))
+
+    def row(self, row_idx: int) -> list:
+        """1列目は整数、2列目は小数、残りは文字列"""
+        values = [row_idx, round(self.random.uniform(0, 10000), 2)]
+        values += [self.text() for _ in range(self.spec.columns - 2)]
+        return values[:self.spec.columns]
+
+
+def generate_workbook(path: Path, spec: InputSpec):
+    """
+    テーブルだけのシートからなるExcelファイルを作成
+
+    Args:
+        path: 出力先のパス
+        spec: 入力の形（code_density・list_density は使わない）
+    """
+    cells = _CellFactory(spec)
+    wb = openpyxl.Workbook(write_only=True)
+    for sheet_idx in range(spec.sheets):
+        ws = wb.create_sheet(f'Sheet{sheet_idx + 1}')
+        ws.append([f'col{col + 1}' for col in range(spec.columns)])
+        for row_idx in range(spec.rows):
+            ws.append(cells.row(row_idx))
+    wb.save(path)
+
+
+def generate_markdown(path: Path, spec: InputSpec):
+    """
+    見出し・テキスト・リスト・コードブロック・テーブルを含むMarkdownファイルを作成
+
+    Args:
+        path: 出力先のパス
+        spec: 入力の形
+    """
+    cells = _CellFactory(spec)
+    list_items = int(spec.rows * spec.list_density)
+    code_lines = int(spec.rows * spec.code_density)
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('# Benchmark\n\n')
+        for sheet_idx in range(spec.sheets):
+            f.write(f'## Sheet{sheet_idx + 1}\n\n')
+            f.write(f'{cells.text()}\n\n')
+
+            for _ in range(list_items):
+                f.write(f'- {cells.text()}\n')
+            if list_items:
+                f.write('\n')
+
+            if code_lines:
+                f.write('```python\n')
+                for _ in range(code_lines):
+                    f.write(f'print("{cells.text()}")\n')
+                f.write('```\n\n')
+
+            f.write('| ' + ' | '.join(f'col{col + 1}' for col in range(spec.columns)) + ' |\n')
+            f.write('| ' + ' | '.join(['---'] * spec.columns) + ' |\n')
+            for row_idx in range(spec.rows):
+                f.write('| ' + ' | '.join(map(str, cells.row(row_idx))) + ' |\n')
+            f.write('\n')
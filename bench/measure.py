@@ -0,0 +1,67 @@
+"""
+Measure - 1回分の変換を計測するワーカー（ピークメモリを分けるため別プロセスで実行）
+
+    python -m bench.measure phases <変換元> <変換先> [エンジン]
+    python -m bench.measure convert <変換元> <変換先> [エンジン]
+
+結果は1行のJSONとして標準出力に書き出す。
+"""
+import json
+import sys
+import time
+from pathlib import Path
+from converters.profiling import peak_rss_mb
+
+
+def measure_phases(from_file: Path, to_file: Path, engine: str) -> dict:
+    """読み込み（parse）と書き込み（write）を分けて計測"""
+    from converters.converter import FormatConverter
+
+    converter = FormatConverter(engine=engine)
+    parser = converter.parsers[from_file.suffix.lower()]
+    writer = converter.writers[to_file.suffix.lower()]
+
+    start = time.perf_counter()
+    document = parser.parse(from_file)
+    parsed = time.perf_counter()
+    writer.write(document, to_file)
+    written = time.perf_counter()
+
+    return {
+        'parse_s': parsed - start,
+        'write_s': written - parsed,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def measure_convert(from_file: Path, to_file: Path, engine: str) -> dict:
+    """CLIと同じ FormatConverter.convert（ストリーミング変換）を計測"""
+    from converters.converter import FormatConverter
+
+    converter = FormatConverter(engine=engine)
+    # モジュールのインポート（起動時間は bench.startup で計測）は含めない
+    converter.parsers[from_file.suffix.lower()]
+    converter.writers[to_file.suffix.lower()]
+
+    start = time.perf_counter()
+    converter.convert(from_file, to_file)
+    return {
+        'convert_s': time.perf_counter() - start,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def main():
+    mode, from_file, to_file = sys.argv[1], Path(sys.argv[2]), Path(sys.argv[3])
+    engine = sys.argv[4] if len(sys.argv) > 4 else 'openpyxl'
+    if mode == 'phases':
+        result = measure_phases(from_file, to_file, engine)
+    elif mode == 'convert':
+        result = measure_convert(from_file, to_file, engine)
+    else:
+        raise SystemExit(f'不明なモード: {mode}')
+    print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Rows - ExcelParser の行の変換（空行の判定・セルの文字列化）の計測
+
+100列の行をメモリ上で RowNormalizer に通す時間（normalize_s）と、
+100列のExcelファイルを ExcelParser で読み込む時間（parse_s）を記録する。
+"""
+import datetime
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+from bench.generators import InputSpec, generate_workbook
+
+COLUMNS = 100
+
+_DATE = datetime.datetime(2024, 1, 1, 9, 30)
+
+
+def _strings(rng: random.Random, col: int):
+    return f'v{rng.randrange(10 ** 6)}'
+
+
+def _numbers(rng: random.Random, col: int):
+    return rng.uniform(0, 10000) if col % 2 else rng.randrange(10 ** 6)
+
+
+def _sparse(rng: random.Random, col: int):
+    return f'x{col}' if rng.random() < 0.05 else None
+
+
+def _mixed(rng: random.Random, col: int):
+    return (_DATE + datetime.timedelta(days=col), col, f's{col}', None, col % 3 == 0)[col % 5]
+
+
+def _empty(rng: random.Random, col: int):
+    return None if col % 2 else ' '
+
+
+# メモリ上の行のケース（ケース名 → 列番号からセルの値を作る関数）
+ROW_CASES: Dict[str, Callable[[random.Random, int], object]] = {
+    'strings': _strings,
+    'numbers': _numbers,
+    'sparse': _sparse,
+    'mixed_dates': _mixed,
+    'empty': _empty,
+}
+
+
+def run_rows(scale: float = 1.0, repeat: int = 5, log=None) -> List[dict]:
+    """
+    全てのケースを計測
+
+    Args:
+        scale: 行数の倍率（1.0 = 基準2000行）
+        repeat: 計測を繰り返す回数（最小値を記録）
+        log: 進捗を1行ずつ受け取る関数
+
+    Returns:
+        List[dict]: ケースごとの計測結果（run_suite の results と同じ形）
+    """
+    from converters.cells import RowNormalizer
+    from parsers.excel_parser import ExcelParser
+
+    num_rows = max(1, int(2000 * scale))
+    results = []
+    for name, make_cell in ROW_CASES.items():
+        rng = random.Random(0)
+        rows = [tuple(make_cell(rng, col) for col in range(COLUMNS)) for _ in range(num_rows)]
+        normalize = RowNormalizer().normalize
+        record = {'case': name, 'direction': 'rows', 'rows': num_rows, 'columns': COLUMNS}
+        record['normalize_s'] = min(_timed(lambda: [normalize(row) for row in rows])
+                                    for _ in range(repeat))
+        results.append(record)
+        if log is not None:
+            log(f"{name:<16} rows      normalize_s={record['normalize_s']:.4f}")
+
+    with tempfile.TemporaryDirectory(prefix='fmtshift-rows-') as tmp:
+        spec = InputSpec(rows=num_rows, columns=COLUMNS)
+        source = Path(tmp) / 'columns_100.xlsx'
+        generate_workbook(source, spec)
+        parser = ExcelParser()
+        record = {'case': 'columns_100', 'direction': 'xlsx->rows', 'params': spec.to_dict()}
+        record['parse_s'] = min(_timed(lambda: _consume(parser.iter_events(source)))
+                                for _ in range(repeat))
+        results.append(record)
+        if log is not None:
+            log(f"{'columns_100':<16} xlsx->rows parse_s={record['parse_s']:.4f}")
+    return results
+
+
+def _timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def _consume(events):
+    """イベントとテーブルの行を全て読み込む"""
+    for event in events:
+        table = getattr(event.value, 'value', None)
+        for _ in getattr(table, 'rows', ()):
+            pass
@@ -0,0 +1,191 @@
+"""
+Runner - ベンチマークケースの実行と結果の比較
+"""
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from bench.generators import InputSpec, generate_markdown, generate_workbook
+
+# リポジトリのルート（ワーカーは converters などをここからインポートする）
+ROOT = Path(__file__).resolve().parent.parent
+
+# 変換方向（変換元の拡張子, 変換先の拡張子）
+DIRECTIONS = [('.md', '.xlsx'), ('.xlsx', '.md')]
+
+# 比較する指標（値が小さいほど良い）
+METRICS = ['parse_s', 'write_s', 'convert_s', 'peak_rss_mb', 'startup_s', 'import_s',
+           'save_s', 'alloc_peak_mb', 'style_hashes', 'normalize_s']
+
+
+def default_cases(scale: float = 1.0) -> List[Tuple[str, InputSpec]]:
+    """
+    基準のケースと、軸を1つずつ変えたケースの一覧
+
+    Args:
+        scale: 行数の倍率（CIでは小さく、手元の調査では大きくする）
+
+    Returns:
+        List[Tuple[str, InputSpec]]: ケース名と入力の形
+    """
+    base = InputSpec(rows=max(1, int(2000 * scale)))
+    return [
+        ('base', base),
+        ('rows_x10', replace(base, rows=base.rows * 10)),
+        ('columns_50', replace(base, columns=50)),
+        ('sheets_8', replace(base, sheets=8)),
+        ('cell_length_64', replace(base, cell_length=64)),
+        ('cjk', replace(base, cjk=True)),
+        ('code_blocks', replace(base, code_density=0.5)),
+        ('lists', replace(base, list_density=0.5)),
+    ]
+
+
+def run_suite(cases: List[Tuple[str, InputSpec]], repeat: int = 1, engine: str = 'openpyxl',
+              work_dir: Optional[Path] = None, log=None) -> dict:
+    """
+    全てのケースを両方向に変換して計測
+
+    時間は repeat 回の最小値、ピークメモリは最大値を記録する。
+
+    Args:
+        cases: ケース名と入力の形
+        repeat: 計測を繰り返す回数
+        engine: FormatConverter のエンジン
+        work_dir: 入力・出力ファイルを置くディレクトリ（Noneの場合は一時ディレクトリ）
+        log: 進捗を1行ずつ受け取る関数
+
+    Returns:
+        dict: 実行環境（meta）と計測結果（results）
+    """
+    with tempfile.TemporaryDirectory(prefix='fmtshift-bench-') as tmp:
+        work_dir = Path(work_dir or tmp)
+        work_dir.mkdir(parents=True, exist_ok=True)
+
+        results = []
+        for name, spec in cases:
+            for from_ext, to_ext in DIRECTIONS:
+                source = work_dir / f'{name}{from_ext}'
+                if not source.exists():
+                    _generate(source, spec)
+                target = work_dir / f'{name}.out{to_ext}'
+
+                record = {
+                    'case': name,
+                    'direction': f'{from_ext[1:]}->{to_ext[1:]}',
+                    'params': spec.to_dict(),
+                    'input_bytes': source.stat().st_size,
+                }
+                for _ in range(repeat):
+                    for mode in ('phases', 'convert'):
+                        _merge(record, _measure(mode, source, target, engine))
+
+                results.append(record)
+                if log is not None:
+                    log(format_record(record))
+
+    return {'meta': environment(engine, repeat), 'results': results}
+
+
+def _generate(path: Path, spec: InputSpec):
+    if path.suffix == '.xlsx':
+        generate_workbook(path, spec)
+    else:
+        generate_markdown(path, spec)
+
+
+def _measure(mode: str, source: Path, target: Path, engine: str) -> dict:
+    """ワーカープロセスで1回計測"""
+    completed = subprocess.run(
+        [sys.executable, '-m', 'bench.measure', mode, str(source), str(target), engine],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f'計測に失敗しました ({mode} {source.name}):\n{completed.stderr}')
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _merge(record: dict, measured: dict):
+    """時間は最小値、ピークメモリは最大値を残す"""
+    for key, value in measured.items():
+        if value is None:
+            record.setdefault(key, None)
+        elif record.get(key) is None:
+            record[key] = value
+        elif key == 'peak_rss_mb':
+            record[key] = max(record[key], value)
+        else:
+            record[key] = min(record[key], value)
+
+
+def environment(engine: str, repeat: int) -> dict:
+    """結果を比較するときに確認する実行環境"""
+    import openpyxl
+    from fmtshift import __version__
+
+    return {
+        'fmtshift': __version__,
+        'engine': engine,
+        'repeat': repeat,
+        'python': platform.python_version(),
+        'openpyxl': openpyxl.__version__,
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def format_record(record: dict) -> str:
+    """計測結果を1行で表示"""
+    values = ' '.join(
+        f'{metric}={record[metric]:.3f}' if record.get(metric) is not None else f'{metric}=-'
+        for metric in METRICS[:4]
+    )
+    return f"{record['case']:<16} {record['direction']:<9} {values}"
+
+
+def compare_results(base: dict, new: dict, threshold: float = 0.1,
+                    min_seconds: float = 0.05) -> List[dict]:
+    """
+    2つの計測結果を比較
+
+    Args:
+        base: 基準の結果（run_suite の戻り値）
+        new: 比較する結果
+        threshold: 悪化とみなす増加率（0.1 = 10%）
+        min_seconds: 悪化とみなす時間の最小の増加量（短い計測の揺らぎを除く）
+
+    Returns:
+        List[dict]: ケース・方向・指標ごとの比較（regressed が True のものが悪化）
+    """
+    base_records: Dict[Tuple[str, str], dict] = {
+        (r['case'], r['direction']): r for r in base['results']
+    }
+
+    rows = []
+    for record in new['results']:
+        before = base_records.get((record['case'], record['direction']))
+        if before is None:
+            continue
+        for metric in METRICS:
+            old_value, new_value = before.get(metric), record.get(metric)
+            if not old_value or new_value is None:
+                continue
+            ratio = new_value / old_value
+            regressed = ratio > 1 + threshold
+            if metric.endswith('_s') and new_value - old_value < min_seconds:
+                regressed = False
+            rows.append({
+                'case': record['case'],
+                'direction': record['direction'],
+                'metric': metric,
+                'base': old_value,
+                'new': new_value,
+                'ratio': ratio,
+                'regressed': regressed,
+            })
+    return rows
@@ -0,0 +1,91 @@
+"""
+Startup - CLIの起動時間とインポートされるモジュールの計測
+
+小さなファイルの変換と --version を実行し、起動から終了までの時間と
+-X importtime によるインポート時間を記録する。変換に不要な重いモジュール
+（Markdownだけの変換での openpyxl など）がインポートされた場合は違反として記録する。
+"""
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+from bench.generators import InputSpec, generate_markdown, generate_workbook
+from bench.runner import ROOT
+
+CLI = ROOT / 'fmtshift.py'
+
+# (ケース名, 変換元の拡張子, 変換先の拡張子, インポートしてはいけないモジュール)
+# 変換元の拡張子がNoneのケースは --version を実行する
+STARTUP_CASES: List[Tuple[str, Optional[str], Optional[str], Tuple[str, ...]]] = [
+    ('version', None, None, ('openpyxl', 'pandas', 'multiprocessing')),
+    ('md_to_md', '.md', '.md', ('openpyxl', 'pandas', 'multiprocessing')),
+    ('md_to_xlsx', '.md', '.xlsx', ('pandas',)),
+    ('xlsx_to_md', '.xlsx', '.md', ('pandas',)),
+]
+
+
+def run_startup(repeat: int = 5, log=None) -> List[dict]:
+    """
+    起動時間のケースを全て計測
+
+    Args:
+        repeat: 起動時間を計測する回数（最小値を記録）
+        log: 進捗を1行ずつ受け取る関数
+
+    Returns:
+        List[dict]: ケースごとの計測結果（run_suite の results と同じ形）
+    """
+    spec = InputSpec(rows=10, columns=3)
+    results = []
+    with tempfile.TemporaryDirectory(prefix='fmtshift-startup-') as tmp:
+        tmp = Path(tmp)
+        generate_markdown(tmp / 'small.md', spec)
+        generate_workbook(tmp / 'small.xlsx', spec)
+
+        for name, from_ext, to_ext, forbidden in STARTUP_CASES:
+            if from_ext is None:
+                args = ['--version']
+            else:
+                args = ['-f', str(tmp / f'small{from_ext}'),
+                        '-t', str(tmp / f'out_{name}{to_ext}'), '--no-cache']
+
+            elapsed = min(_run(args) for _ in range(repeat))
+            modules, import_s = _import_profile(args)
+            record = {
+                'case': name,
+                'direction': 'startup',
+                'startup_s': elapsed,
+                'import_s': import_s,
+                'modules': len(modules),
+                'forbidden_imports': sorted(set(forbidden) & modules),
+            }
+            results.append(record)
+            if log is not None:
+                violations = ', '.join(record['forbidden_imports']) or '-'
+                log(f"{name:<12} startup_s={elapsed:.3f} import_s={import_s:.3f} "
+                    f"modules={len(modules)} forbidden={violations}")
+    return results
+
+
+def _run(args: List[str]) -> float:
+    """CLIを1回実行して経過時間を返す"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, str(CLI), *args], check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def _import_profile(args: List[str]):
+    """-X importtime の出力からトップレベルのモジュール名の集合と合計インポート時間を求める"""
+    completed = subprocess.run([sys.executable, '-X', 'importtime', str(CLI), *args],
+                               check=True, capture_output=True, text=True)
+    modules = set()
+    total_us = 0
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        total_us += int(self_us)
+        modules.add(name.strip().split('.')[0])
+    return modules, total_us / 1_000_000
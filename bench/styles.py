@@ -0,0 +1,119 @@
+"""
+Styles - ExcelWriter のセルの書式の計測
+
+コードブロックの多いMarkdownを読み込んだDocumentを ExcelWriter で書き込み、
+行の書き込み（write_s）と保存（save_s）の時間、書き込み中に確保したメモリのピーク（alloc_peak_mb）、
+書式のハッシュの計算回数（style_hashes）を記録する。
+書式のハッシュはセルに書式を設定するたびにブックの書式一覧を探すために計算され、
+その都度一時的なタプル・リストを確保する。
+"""
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import replace
+from pathlib import Path
+from typing import List, Tuple
+from openpyxl.descriptors.serialisable import Serialisable
+from bench.generators import InputSpec, generate_markdown
+
+# (ケース名, ExcelWriter の write_only)
+MODES: List[Tuple[str, bool]] = [('write_only', True), ('cells', False)]
+
+
+def styles_cases(scale: float = 1.0) -> List[Tuple[str, InputSpec]]:
+    """コードブロック・テーブルのヘッダーの多いケースの一覧"""
+    base = InputSpec(rows=max(1, int(2000 * scale)), columns=4, code_density=5.0)
+    return [
+        ('code_heavy', base),
+        ('code_heavy_sheets_8', replace(base, rows=max(1, base.rows // 8), sheets=8)),
+    ]
+
+
+def run_styles(scale: float = 1.0, repeat: int = 3, log=None) -> List[dict]:
+    """
+    全てのケースを書き込み専用モード・通常モードで計測
+
+    Args:
+        scale: 行数の倍率
+        repeat: 時間を計測する回数（最小値を記録）
+        log: 進捗を1行ずつ受け取る関数
+
+    Returns:
+        List[dict]: ケースごとの計測結果（run_suite の results と同じ形）
+    """
+    from parsers.markdown_parser import MarkdownParser
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='fmtshift-styles-') as tmp:
+        tmp = Path(tmp)
+        for name, spec in styles_cases(scale):
+            source = tmp / f'{name}.md'
+            generate_markdown(source, spec)
+            document = MarkdownParser().parse(source)
+
+            for direction, write_only in MODES:
+                target = tmp / f'{name}_{direction}.xlsx'
+                record = {'case': name, 'direction': direction, 'params': spec.to_dict()}
+                times = [_timed_write(document, target, write_only) for _ in range(repeat)]
+                record['write_s'] = min(write_s for write_s, _ in times)
+                record['save_s'] = min(save_s for _, save_s in times)
+                record['alloc_peak_mb'] = _alloc_peak(document, target, write_only)
+                record['style_hashes'] = _count_style_hashes(document, target, write_only)
+                results.append(record)
+                if log is not None:
+                    log(f"{name:<20} {direction:<10} write_s={record['write_s']:.3f} "
+                        f"save_s={record['save_s']:.3f} "
+                        f"alloc_peak_mb={record['alloc_peak_mb']:.1f} "
+                        f"style_hashes={record['style_hashes']}")
+    return results
+
+
+def _write(document, target: Path, write_only: bool, profiler=None):
+    from writers.excel_writer import ExcelWriter
+
+    writer = ExcelWriter(write_only=write_only)
+    if profiler is not None:
+        writer.profiler = profiler
+    writer.write(document, target)
+
+
+def _timed_write(document, target: Path, write_only: bool) -> Tuple[float, float]:
+    """書き込みの時間を (保存以外, 保存) に分けて返す"""
+    from converters.profiling import Profiler
+
+    profiler = Profiler()
+    start = time.perf_counter()
+    _write(document, target, write_only, profiler)
+    elapsed = time.perf_counter() - start
+    save_s = profiler.phases['write.save'].wall_s
+    return elapsed - save_s, save_s
+
+
+def _alloc_peak(document, target: Path, write_only: bool) -> float:
+    """書き込み中に確保したメモリのピーク（MB、読み込み済みのDocumentは含まない）"""
+    tracemalloc.start()
+    try:
+        _write(document, target, write_only)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def _count_style_hashes(document, target: Path, write_only: bool) -> int:
+    """書き込み中に書式（Font など）のハッシュを計算した回数"""
+    code = Serialisable.__hash__.__code__
+    calls = 0
+
+    def profile(frame, event, arg):
+        nonlocal calls
+        if event == 'call' and frame.f_code is code:
+            calls += 1
+
+    sys.setprofile(profile)
+    try:
+        _write(document, target, write_only)
+    finally:
+        sys.setprofile(None)
+    return calls
@@ -0,0 +1,235 @@
+"""
+AsyncConverter - asyncio のイベントループを止めずに変換
+
+ファイルの読み書き（openpyxl の load_workbook・save を含む）と解析・書き込みは
+全て executor のジョブの中で行い、イベントループでは待つだけにする。
+標準ライブラリには非同期のファイルI/Oがないため、Markdownなどのテキスト形式も同じく
+executor で読み書きする（ジョブの外でファイルを読んでジョブに渡すと、
+プロセスの executor ではその分のコピーが増えるだけになる）。
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Union
+from converters.converter import FormatConverter
+
+
+class AsyncFormatConverter:
+    """
+    FormatConverter の非同期版
+
+    同時に実行する変換は max_concurrency までで、それを超える変換は空きを待つ。
+    タイムアウト・キャンセルした変換は結果を捨て、変換先のファイルも作らない
+    （ジョブの中で作った一時ディレクトリに書き込み、完了してから変換先に移す）。
+    実行中のジョブは途中で止められないため、終わるまで同時実行数の枠を使い続ける。
+    """
+
+    def __init__(self, max_concurrency: int = 4, timeout: Optional[float] = None,
+                 executor: Optional[Executor] = None,
+                 converter_options: Optional[dict] = None):
+        """
+        Args:
+            max_concurrency: 同時に実行する変換の数
+            timeout: 1件の変換の既定のタイムアウト（秒、空きを待つ時間を含む。Noneの場合は無制限）
+            executor: 変換を実行する executor（Noneの場合は max_concurrency スレッドの
+                ThreadPoolExecutor を作成し、close() で終了する）。
+                ProcessPoolExecutor を渡すとGILの影響を受けずに並列に変換できる
+            converter_options: 各スレッド・プロセスの FormatConverter に渡す引数
+        """
+        if max_concurrency < 1:
+            raise ValueError('max_concurrency は1以上を指定してください')
+
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.converter_options = converter_options or {}
+        self._executor = executor
+        self._owns_executor = executor is None
+        # セマフォは使うイベントループの中で作る（Python 3.9以前は作成時のループに結び付くため）
+        self._semaphore = None
+        # ワーカーの FormatConverter をこのインスタンスの設定ごとに区別する
+        self._token = uuid.uuid4().hex
+
+    async def convert(self, from_file: Union[str, Path], to_file: Union[str, Path],
+                      timeout: Optional[float] = None):
+        """
+        ファイル形式を変換
+
+        Args:
+            from_file: 変換元ファイル
+            to_file: 変換先ファイル
+            timeout: タイムアウト（秒、Noneの場合はコンストラクタの timeout）
+
+        Raises:
+            ValueError: サポートされていない形式の場合
+            asyncio.TimeoutError: タイムアウトした場合
+        """
+        from_file, to_file = Path(from_file), Path(to_file)
+        await self._wait(self._convert_file(from_file, to_file), timeout)
+
+    async def convert_bytes(self, data: Union[bytes, bytearray, memoryview],
+                            from_format: str, to_format: str,
+                            timeout: Optional[float] = None) -> bytes:
+        """
+        バイト列を変換して変換結果のバイト列を返す
+
+        Args:
+            data: 変換元の内容（テキスト形式はUTF-8）
+            from_format: 変換元の形式（例: '.md'、'md'）
+            to_format: 変換先の形式（例: '.xlsx'、'xlsx'）
+            timeout: タイムアウト（秒、Noneの場合はコンストラクタの timeout）
+
+        Returns:
+            bytes: 変換結果（テキスト形式はUTF-8）
+
+        Raises:
+            ValueError: サポートされていない形式の場合
+            asyncio.TimeoutError: タイムアウトした場合
+        """
+        return await self._wait(self._convert_bytes(bytes(data), from_format, to_format), timeout)
+
+    async def close(self):
+        """作成した executor を終了（実行中のジョブの完了を待つ）"""
+        if self._owns_executor and self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _wait(self, awaitable, timeout: Optional[float]):
+        """タイムアウトを付けて待つ"""
+        if timeout is None:
+            timeout = self.timeout
+        if timeout is None:
+            return await awaitable
+        return await asyncio.wait_for(awaitable, timeout)
+
+    async def _convert_bytes(self, data: bytes, from_format: str, to_format: str) -> bytes:
+        future = await self._submit(_convert_bytes_job, data, from_format, to_format)
+        return await asyncio.wrap_future(future)
+
+    async def _convert_file(self, from_file: Path, to_file: Path):
+        """一時ディレクトリに変換し、成功した場合だけ変換先に移す"""
+        future = await self._submit(_convert_file_job, from_file, to_file)
+        try:
+            work_dir = await asyncio.wrap_future(future)
+        except BaseException:
+            # キャンセル・タイムアウトしても実行中のジョブは続くため、終わってから片付ける
+            future.add_done_callback(_remove_work_dir)
+            raise
+
+        # 移動・削除もイベントループの外で行う（移し始めた後にキャンセルした場合は移し終える）
+        await asyncio.get_running_loop().run_in_executor(
+            None, _publish_work_dir, work_dir, to_file.parent)
+
+    async def _submit(self, function, *args):
+        """
+        同時実行数の空きを待ってジョブを投入し、concurrent.futures.Future を返す
+
+        枠はジョブが終わった時点で返す（キャンセル・タイムアウトした場合も実行中は使い続ける）。
+        """
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        semaphore = self._semaphore
+
+        await semaphore.acquire()
+        try:
+            future = self._get_executor().submit(
+                function, self._token, self.converter_options, *args)
+        except BaseException:
+            semaphore.release()
+            raise
+        future.add_done_callback(lambda _: _call_soon(loop, semaphore.release))
+        return future
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if not self._owns_executor:
+                raise RuntimeError('executor は終了しています')
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                thread_name_prefix='fmtshift')
+        return self._executor
+
+
+def _call_soon(loop: asyncio.AbstractEventLoop, callback):
+    """executor のスレッドからイベントループで callback を呼ぶ（ループが終了していれば何もしない）"""
+    if not loop.is_closed():
+        try:
+            loop.call_soon_threadsafe(callback)
+        except RuntimeError:
+            # 確認した直後にループが閉じられた場合
+            pass
+
+
+def _remove_work_dir(future):
+    """キャンセル・タイムアウトした変換の一時ディレクトリを削除（ジョブの終了時に呼ばれる）"""
+    if not future.cancelled() and future.exception() is None:
+        shutil.rmtree(future.result(), ignore_errors=True)
+
+
+def _publish_work_dir(work_dir: Path, target_dir: Path):
+    """一時ディレクトリの変換結果を変換先のディレクトリに移して一時ディレクトリを削除"""
+    try:
+        # 続きのファイル（name_2.xlsx など）も含めて移す（同じディレクトリ内の移動のみ）
+        for path in work_dir.iterdir():
+            os.replace(path, target_dir / path.name)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# スレッド（プロセスの executor ではワーカープロセスのスレッド）ごとの FormatConverter
+# パーサー・ライターのインスタンスを変換の間で使い回すが、スレッドの間では共有しない
+_local = threading.local()
+
+# 1つのスレッドで保持する FormatConverter の数（AsyncFormatConverter の設定ごとに1つ）。
+# 共有の executor で AsyncFormatConverter を作り直し続けても増え続けないよう、
+# 最近使っていないものから捨てる
+MAX_WORKER_CONVERTERS = 8
+
+
+def _worker_converter(token: str, converter_options: dict) -> FormatConverter:
+    """このスレッドで token の設定の FormatConverter を返す（初回のみ作成）"""
+    converters = getattr(_local, 'converters', None)
+    if converters is None:
+        converters = _local.converters = OrderedDict()
+    converter = converters.get(token)
+    if converter is None:
+        converter = converters[token] = FormatConverter(**converter_options)
+        while len(converters) > MAX_WORKER_CONVERTERS:
+            converters.popitem(last=False)
+    else:
+        converters.move_to_end(token)
+    return converter
+
+
+def _convert_file_job(token: str, converter_options: dict, from_file: Path, to_file: Path) -> Path:
+    """
+    変換先と同じディレクトリの一時ディレクトリにファイルを変換（executor で実行）
+
+    Returns:
+        Path: 変換結果を書き込んだ一時ディレクトリ（失敗した場合は削除する）
+    """
+    to_file.parent.mkdir(parents=True, exist_ok=True)
+    work_dir = Path(tempfile.mkdtemp(prefix='.fmtshift-', dir=to_file.parent))
+    try:
+        _worker_converter(token, converter_options).convert(from_file, work_dir / to_file.name)
+    except BaseException:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+    return work_dir
+
+
+def _convert_bytes_job(token: str, converter_options: dict, data: bytes,
+                       from_format: str, to_format: str) -> bytes:
+    """バイト列を変換（executor で実行）"""
+    return _worker_converter(token, converter_options).convert_bytes(data, from_format, to_format)
@@ -2,8 +2,12 @@
 中間データ構造の定義
 全ての変換で使用する共通のデータ形式
 """
+import sys
+from array import array
+from collections.abc import MutableSequence, Sequence
 from dataclasses import dataclass, field
-from typing import List, Any, Optional
+from types import MappingProxyType
+from typing import Dict, List, Any, Mapping, Optional, Iterable, Iterator, Callable, Union
 from enum import Enum
 
 
@@ -18,59 +22,425 @@ class ContentType(Enum):
     EMPTY = 'empty'
 
 
-@dataclass
+# メタデータのないコンテンツで共有する空のメタデータ（変更できない）
+EMPTY_METADATA: Mapping[str, Any] = MappingProxyType({})
+
+
 class Content:
-    """個別のコンテンツアイテム"""
-    type: ContentType
-    value: Any
-    metadata: dict = field(default_factory=dict)
+    """
+    個別のコンテンツアイテム
+
+    Markdownでは1行ごとに作られるため、__slots__ で属性の辞書を持たず、
+    メタデータのないコンテンツは EMPTY_METADATA を共有する。
+    同じコンテンツを共有できるよう作成後は変更できない（replace() で新しく作る）。
+    """
+    __slots__ = ('type', 'value', 'metadata')
+
+    def __init__(self, type: ContentType, value: Any,
+                 metadata: Optional[Mapping[str, Any]] = None):
+        object.__setattr__(self, 'type', type)
+        object.__setattr__(self, 'value', value)
+        object.__setattr__(self, 'metadata', metadata if metadata else EMPTY_METADATA)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'Content は変更できません（replace() を使ってください）: {name}')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'Content は変更できません: {name}')
+
+    def replace(self, **changes) -> 'Content':
+        """
+        一部の属性（type, value, metadata）を変えた新しいコンテンツを返す
+
+        Raises:
+            TypeError: 属性の名前が不明な場合
+        """
+        fields = {'type': self.type, 'value': self.value, 'metadata': self.metadata}
+        unknown = changes.keys() - fields.keys()
+        if unknown:
+            raise TypeError(f'Content に属性がありません: {", ".join(sorted(unknown))}')
+        fields.update(changes)
+        return Content(**fields)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return ((self.type, self.value, self.metadata)
+                == (other.type, other.value, other.metadata))
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # 共有の空行は読み込み側でも同じオブジェクトにする
+        if self is EMPTY_CONTENT:
+            return 'EMPTY_CONTENT'
+        # MappingProxyType はpickleできないため辞書にする
+        if self.metadata:
+            return Content, (self.type, self.value, dict(self.metadata))
+        return Content, (self.type, self.value)
     
     def __repr__(self):
         return f"Content({self.type.value}, {self.value})"
 
 
+# 空行（全ての空行で共有する）
+EMPTY_CONTENT = Content(ContentType.EMPTY, '')
+
+
 @dataclass
 class Sheet:
-    """シート（セクション）を表すデータ構造"""
+    """
+    シート（セクション）を表すデータ構造
+
+    テーブルの一覧（tables）は索引を持ち、contents の末尾に追加されたコンテンツは
+    次に参照したときに取り込む。途中のコンテンツを削除・置き換えた場合は reindex() を呼ぶ。
+    contents にはリストの代わりに ContentStore も使える。
+    """
     name: str
     contents: List[Content] = field(default_factory=list)
+    _tables: List[Content] = field(default_factory=list, init=False, repr=False, compare=False)
+    _indexed: int = field(default=0, init=False, repr=False, compare=False)
     
     def add_content(self, content: Content):
         """コンテンツを追加"""
         self.contents.append(content)
     
+    @property
+    def tables(self) -> List[Content]:
+        """テーブルのコンテンツ（contents の順）"""
+        if len(self.contents) < self._indexed:
+            self.reindex()
+        for content in self.contents[self._indexed:]:
+            if content.type == ContentType.TABLE:
+                self._tables.append(content)
+        self._indexed = len(self.contents)
+        return list(self._tables)
+    
+    def reindex(self):
+        """テーブルの索引を作り直す"""
+        self._tables = []
+        self._indexed = 0
+    
     def __repr__(self):
         return f"Sheet('{self.name}', {len(self.contents)} items)"
 
 
 @dataclass
 class Document:
-    """ドキュメント全体を表すデータ構造"""
+    """
+    ドキュメント全体を表すデータ構造
+
+    シート名の索引を持ち、sheets の末尾に追加されたシートは次の検索で取り込む。
+    シート名の変更、途中のシートの削除・置き換えの後は reindex() を呼ぶ。
+    """
     title: Optional[str] = None
     sheets: List[Sheet] = field(default_factory=list)
     metadata: dict = field(default_factory=dict)
+    _sheet_index: Dict[str, Sheet] = field(default_factory=dict, init=False, repr=False,
+                                           compare=False)
+    _indexed: int = field(default=0, init=False, repr=False, compare=False)
     
     def add_sheet(self, sheet: Sheet):
         """シートを追加"""
         self.sheets.append(sheet)
     
     def get_sheet(self, name: str) -> Optional[Sheet]:
-        """名前でシートを取得"""
-        for sheet in self.sheets:
-            if sheet.name == name:
-                return sheet
-        return None
+        """名前でシートを取得（同名のシートが複数ある場合は最初のもの）"""
+        if len(self.sheets) < self._indexed:
+            self.reindex()
+        for sheet in self.sheets[self._indexed:]:
+            self._sheet_index.setdefault(sheet.name, sheet)
+        self._indexed = len(self.sheets)
+        return self._sheet_index.get(name)
+    
+    def reindex(self):
+        """シート名の索引を作り直す"""
+        self._sheet_index = {}
+        self._indexed = 0
     
     def __repr__(self):
         return f"Document('{self.title}', {len(self.sheets)} sheets)"
 
 
+# テーブルのセルの値
+# Markdown・CSVから読み込んだセルは文字列、Excelの数値のセルは int・float のまま
+# （ExcelParser の cell_converters で変換を変えた場合はその戻り値）
+CellValue = Union[str, int, float]
+
+
 # テーブル用のヘルパークラス
 @dataclass
 class Table:
-    """テーブルデータ"""
+    """
+    テーブルデータ
+
+    ヘッダーは文字列、セルは CellValue（数値のセルがあるため、ライターは str() などで文字列にすること）。
+    parse() の Table・ColumnarTable とストリーミングで渡す Table でセルの型は同じ。
+    """
     headers: List[str]
-    rows: List[List[str]]
+    rows: List[List[CellValue]]
     
     def __repr__(self):
-        return f"Table({len(self.headers)} cols, {len(self.rows)} rows)"
+        # ストリーミング中の行はイテレータなので行数は不明
+        rows = len(self.rows) if isinstance(self.rows, list) else '?'
+        return f"Table({len(self.headers)} cols, {rows} rows)"
+
+
+class ColumnarTable:
+    """
+    列ごとに値を保持するテーブル
+
+    整数だけの列は array('q')、浮動小数点数だけの列は array('d') に格納し、
+    それ以外の列は文字列をinternしたリストで保持する。行ごとのリストは作らないため、
+    セル数の多いテーブルでもメモリ使用量を抑えられる。
+    rows は行のリストを返すシーケンスとして Table と同じように扱える。
+    """
+
+    def __init__(self, headers: List[str], columns: List[Sequence], num_rows: int):
+        self.headers = headers
+        self.columns = columns
+        self.num_rows = num_rows
+
+    @classmethod
+    def from_rows(cls, headers: List[str], rows: Iterable[List[Any]]) -> 'ColumnarTable':
+        """行のイテラブルから作成（行の長さが揃っていない場合は '' で埋める）"""
+        columns = [[] for _ in headers]
+        num_rows = 0
+        for row in rows:
+            if len(row) > len(columns):
+                columns.extend([''] * num_rows for _ in range(len(row) - len(columns)))
+            for column, value in zip(columns, row):
+                column.append(value)
+            for column in columns[len(row):]:
+                column.append('')
+            num_rows += 1
+
+        return cls(headers, [_compact_column(column) for column in columns], num_rows)
+
+    @classmethod
+    def from_columns(cls, headers: List[str], columns: Iterable[List[Any]]) -> 'ColumnarTable':
+        """列ごとの値のリストから作成（全ての列は同じ長さであること）"""
+        columns = [_compact_column(list(column)) for column in columns]
+        num_rows = len(columns[0]) if columns else 0
+        return cls(headers, columns, num_rows)
+
+    @property
+    def rows(self) -> '_ColumnarRows':
+        """行のリストを返すシーケンス"""
+        return _ColumnarRows(self)
+
+    def __eq__(self, other):
+        if not isinstance(other, (Table, ColumnarTable)):
+            return NotImplemented
+        return self.headers == other.headers and list(self.rows) == list(other.rows)
+
+    def __repr__(self):
+        return f"ColumnarTable({len(self.headers)} cols, {self.num_rows} rows)"
+
+
+class _ColumnarRows(Sequence):
+    """ColumnarTable の行ビュー"""
+
+    def __init__(self, table: ColumnarTable):
+        self._table = table
+
+    def __len__(self):
+        return self._table.num_rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('row index out of range')
+        return [column[index] for column in self._table.columns]
+
+    def __iter__(self):
+        columns = self._table.columns
+        if not columns:
+            return iter([[]] * self._table.num_rows)
+        return map(list, zip(*columns))
+
+
+def _compact_column(values: list) -> Sequence:
+    """列の値が全て整数・全て浮動小数点数なら array に、それ以外は文字列をintern"""
+    if values:
+        types = set(map(type, values))
+        if types == {int}:
+            try:
+                return array('q', values)
+            except OverflowError:
+                # 64bitに収まらない整数はそのまま保持
+                return values
+        if types == {float}:
+            return array('d', values)
+
+    return [sys.intern(value) if type(value) is str else value for value in values]
+
+
+# ContentStore に格納するコンテンツタイプの番号
+_CONTENT_TYPES = list(ContentType)
+_TYPE_CODES = {content_type: code for code, content_type in enumerate(_CONTENT_TYPES)}
+
+
+class ContentStore(MutableSequence):
+    """
+    シートのコンテンツを種類・値・メタデータの列に分けて保持するシーケンス
+
+    種類は array('B') の番号、値とメタデータはそれぞれ1つのリストに格納し、
+    コンテンツごとのオブジェクトは保持しない。要素を取り出すたびに Content を作って返す
+    （空行は EMPTY_CONTENT）。Sheet の contents の代わりに使え、
+    行数の多いドキュメントのメモリ使用量を抑えられる。
+    """
+    __slots__ = ('_types', '_values', '_metadata')
+
+    def __init__(self, contents: Iterable[Content] = ()):
+        self._types = array('B')
+        self._values = []
+        self._metadata = []
+        self.extend(contents)
+
+    def __len__(self):
+        return len(self._types)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return _stored_content(self._types[index], self._values[index], self._metadata[index])
+
+    def __iter__(self):
+        for code, value, metadata in zip(self._types, self._values, self._metadata):
+            yield _stored_content(code, value, metadata)
+
+    def __setitem__(self, index, content):
+        if isinstance(index, slice):
+            contents = list(content)
+            self._types[index] = array('B', [_TYPE_CODES[c.type] for c in contents])
+            self._values[index] = [c.value for c in contents]
+            self._metadata[index] = [c.metadata for c in contents]
+        else:
+            self._types[index] = _TYPE_CODES[content.type]
+            self._values[index] = content.value
+            self._metadata[index] = content.metadata
+
+    def __delitem__(self, index):
+        del self._types[index]
+        del self._values[index]
+        del self._metadata[index]
+
+    def insert(self, index: int, content: Content):
+        self._types.insert(index, _TYPE_CODES[content.type])
+        self._values.insert(index, content.value)
+        self._metadata.insert(index, content.metadata)
+
+    def append(self, content: Content):
+        self._types.append(_TYPE_CODES[content.type])
+        self._values.append(content.value)
+        self._metadata.append(content.metadata)
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, ContentStore)):
+            return NotImplemented
+        return len(self) == len(other) and list(self) == list(other)
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # 共有の空のメタデータ（MappingProxyType）はpickleできないため None にする
+        metadata = [dict(m) if m else None for m in self._metadata]
+        return _restore_content_store, (self._types, self._values, metadata)
+
+    def __repr__(self):
+        return f"ContentStore({len(self)} items)"
+
+
+def _stored_content(code: int, value, metadata) -> Content:
+    """ContentStore の1要素を Content にする"""
+    content_type = _CONTENT_TYPES[code]
+    if content_type is ContentType.EMPTY and value == '' and not metadata:
+        return EMPTY_CONTENT
+    return Content(content_type, value, metadata)
+
+
+def _restore_content_store(types: array, values: list, metadata: list) -> ContentStore:
+    store = ContentStore()
+    store._types = types
+    store._values = values
+    store._metadata = [m if m else EMPTY_METADATA for m in metadata]
+    return store
+
+
+# ストリーミング変換用のイベント
+class EventType(Enum):
+    """イベントタイプ"""
+    SHEET_START = 'sheet_start'
+    CONTENT = 'content'
+    SHEET_END = 'sheet_end'
+
+
+@dataclass
+class Event:
+    """
+    パーサーからライターへ順番に渡されるイベント
+
+    SHEET_START の value はシート名、CONTENT の value は Content。
+    CONTENT のテーブルは rows がイテレータの場合があり、
+    次のイベントを取り出す前に読み切る必要がある。
+    """
+    type: EventType
+    value: Any = None
+
+    def __repr__(self):
+        return f"Event({self.type.value}, {self.value!r})"
+
+
+def document_events(document: Document) -> Iterator[Event]:
+    """Documentをイベント列に変換"""
+    for sheet in document.sheets:
+        yield Event(EventType.SHEET_START, sheet.name)
+        for content in sheet.contents:
+            yield Event(EventType.CONTENT, content)
+        yield Event(EventType.SHEET_END)
+
+
+def iter_sheet_contents(events: Iterator[Event]) -> Iterator[Content]:
+    """SHEET_START の直後から呼び出し、SHEET_END までの Content を返す"""
+    for event in events:
+        if event.type == EventType.SHEET_END:
+            return
+        yield event.value
+
+
+def build_document(events: Iterable[Event], document: Document,
+                   table_factory: Optional[Callable[[List[str], Iterable], Any]] = None,
+                   content_store: bool = False) -> Document:
+    """
+    イベント列を読み込んでDocumentにシートを追加
+
+    Args:
+        events: イベント列
+        document: シートを追加するDocument
+        table_factory: ストリーミング中のテーブルを確定する関数（headers, rows を受け取る）。
+            Noneの場合は行をリストにした Table になる
+        content_store: Trueの場合、シートのコンテンツをリストではなく ContentStore に格納する
+    """
+    events = iter(events)
+    for event in events:
+        if event.type != EventType.SHEET_START:
+            continue
+
+        sheet = Sheet(name=event.value, contents=ContentStore() if content_store else [])
+        for content in iter_sheet_contents(events):
+            # ストリーミング中のテーブル行を確定
+            table = content.value
+            if (content.type == ContentType.TABLE and isinstance(table, Table)
+                    and not isinstance(table.rows, list)):
+                if table_factory is None:
+                    table.rows = list(table.rows)
+                else:
+                    content = content.replace(value=table_factory(table.headers, table.rows))
+            sheet.add_content(content)
+        document.add_sheet(sheet)
+
+    return document
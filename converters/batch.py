@@ -0,0 +1,168 @@
+"""
+Batch - 複数ファイルを1プロセスでまとめて変換
+"""
+import glob
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+from converters.converter import FormatConverter
+
+# マニフェストファイルとして読む拡張子
+MANIFEST_EXTENSIONS = ('.txt', '.lst')
+
+
+@dataclass
+class BatchResult:
+    """バッチ変換の結果"""
+    succeeded: List[Tuple[Path, Path]] = field(default_factory=list)
+    failed: List[Tuple[Path, str]] = field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        return len(self.succeeded) + len(self.failed)
+
+    def __repr__(self):
+        return f"BatchResult({len(self.succeeded)} succeeded, {len(self.failed)} failed)"
+
+
+def collect_sources(spec: str, extensions: Iterable[str]) -> List[Path]:
+    """
+    変換元ファイルの一覧を作成
+
+    Args:
+        spec: ディレクトリ、globパターン、変換元ファイル、またはマニフェストファイル
+            （拡張子 .txt・.lst、1行に1パス、#で始まる行はコメント、
+            相対パスはマニフェストの場所から解決）
+        extensions: ディレクトリ・globから拾う拡張子
+
+    Returns:
+        List[Path]: 変換元ファイルのパス
+
+    Raises:
+        ValueError: spec に該当するものがない場合、変換元・マニフェストの
+            どちらでもない拡張子のファイルの場合
+    """
+    extensions = {ext.lower() for ext in extensions}
+    path = Path(spec)
+
+    if path.is_dir():
+        return sorted(
+            p for p in path.iterdir()
+            if p.is_file() and p.suffix.lower() in extensions
+        )
+
+    if path.is_file():
+        if path.suffix.lower() in extensions:
+            return [path]
+        if path.suffix.lower() not in MANIFEST_EXTENSIONS:
+            raise ValueError(
+                f'変換元としてもマニフェストとしても読めない拡張子です: {spec} '
+                f'（マニフェストの拡張子は {", ".join(MANIFEST_EXTENSIONS)}）')
+
+        sources = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                # パスに # を含む場合があるため、コメントは # で始まる行のみ
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    source = Path(line)
+                    if not source.is_absolute():
+                        source = path.parent / source
+                    sources.append(source)
+        return sources
+
+    if glob.has_magic(spec):
+        return sorted(
+            Path(p) for p in glob.glob(spec, recursive=True)
+            if Path(p).is_file() and Path(p).suffix.lower() in extensions
+        )
+
+    raise ValueError(f'ディレクトリ・globパターン・マニフェストのいずれでもありません: {spec}')
+
+
+def convert_batch(sources: Iterable[Path], to_ext: str, out_dir: Optional[Path] = None,
+                  jobs: int = 1, converter_options: Optional[dict] = None) -> BatchResult:
+    """
+    複数ファイルを変換（1ファイルのエラーでは中断しない）
+
+    Args:
+        sources: 変換元ファイル
+        to_ext: 変換先の拡張子（例: '.xlsx'）
+        out_dir: 出力先ディレクトリ（Noneの場合は変換元と同じディレクトリ）
+        jobs: 変換を並列に行うプロセス数
+        converter_options: 各プロセスの FormatConverter に渡す引数
+
+    Returns:
+        BatchResult: 成功・失敗したファイルの一覧
+    """
+    if not to_ext.startswith('.'):
+        to_ext = f'.{to_ext}'
+    converter_options = converter_options or {}
+
+    result = BatchResult()
+    tasks = []
+    outputs = set()
+    for source in sources:
+        target = (out_dir or source.parent) / f'{source.stem}{to_ext}'
+        if target.resolve() == source.resolve():
+            result.failed.append((source, '変換元と変換先が同じファイルです'))
+            continue
+        if target in outputs:
+            # 同じ名前のファイルが別のディレクトリにある場合は上書きしない
+            result.failed.append((source, f'出力先が他のファイルと重複しています: {target}'))
+            continue
+        outputs.add(target)
+        tasks.append((source, target))
+
+    if out_dir is not None:
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+    if jobs <= 1 or len(tasks) <= 1:
+        _init_worker(converter_options)
+        outcomes = map(_convert_one, tasks)
+        _collect(result, tasks, outcomes)
+    else:
+        workers = min(jobs, len(tasks))
+        # 1タスクごとのプロセス間通信を減らすためまとめて渡す
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(converter_options,)
+        ) as executor:
+            outcomes = executor.map(_convert_one, tasks, chunksize=chunksize)
+            _collect(result, tasks, outcomes)
+
+    return result
+
+
+def _collect(result: BatchResult, tasks, outcomes):
+    """タスクの結果を BatchResult に振り分け"""
+    for (source, target), error in zip(tasks, outcomes):
+        if error is None:
+            result.succeeded.append((source, target))
+        else:
+            result.failed.append((source, error))
+
+
+# ワーカープロセスごとに1つだけ作る変換器
+_worker_converter = None
+
+
+def _init_worker(converter_options: dict):
+    """ワーカープロセスの初期化"""
+    global _worker_converter
+    _worker_converter = FormatConverter(**converter_options)
+
+
+def _convert_one(task: Tuple[Path, Path]) -> Optional[str]:
+    """1ファイルを変換し、失敗した場合はエラーメッセージを返す"""
+    source, target = task
+    try:
+        if not source.exists():
+            return f'ファイルが見つかりません: {source}'
+        _worker_converter.convert(source, target)
+        return None
+    except Exception as e:
+        return f'{type(e).__name__}: {e}'
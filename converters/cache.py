@@ -0,0 +1,439 @@
+"""
+Cache - 変換結果のディスクキャッシュと、読み込んだDocumentのキャッシュ
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import suppress
+from pathlib import Path
+from array import array
+from typing import Any, Optional, Tuple
+from converters.base import (
+    Document, Sheet, Content, ContentType, ContentStore, Table, ColumnarTable, EMPTY_CONTENT
+)
+
+
+def default_cache_dir() -> Path:
+    """OSごとの既定のキャッシュディレクトリ"""
+    env_dir = os.environ.get('FMTSHIFT_CACHE_DIR')
+    if env_dir:
+        return Path(env_dir)
+
+    if sys.platform == 'win32' and os.environ.get('LOCALAPPDATA'):
+        base = Path(os.environ['LOCALAPPDATA'])
+    else:
+        base = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache')
+    return base / 'fmtshift'
+
+
+class ConversionCache:
+    """
+    変換結果をファイル内容のハッシュをキーに保存するキャッシュ
+
+    キーは変換元ファイルのSHA-256、変換元/変換先の拡張子、fmtshiftのバージョン、
+    変換方法の違い（variant）から作る。合計サイズが上限を超えると
+    最も長く使われていないエントリから削除する（LRU、最終使用時刻はmtimeで管理）。
+    数え・削除するのはエントリの名前（64桁の16進数のキー + 拡張子）のファイルだけで、
+    cache_dir にある他のファイルには触れない。
+    """
+
+    DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    # エントリのファイル名（キー + 変換先の拡張子）
+    ENTRY_NAME = re.compile(r'[0-9a-f]{64}\.[0-9a-z]+')
+
+    def __init__(self, cache_dir: Path, version: str, max_size: int = DEFAULT_MAX_SIZE):
+        """
+        Args:
+            cache_dir: キャッシュを保存するディレクトリ
+            version: fmtshiftのバージョン（バージョンが変わると全て無効になる）
+            max_size: キャッシュの合計サイズの上限（バイト）
+        """
+        self.cache_dir = Path(cache_dir)
+        self.version = version
+        self.max_size = max_size
+        self._total_size = None
+
+    def key(self, from_file: Path, to_ext: str, variant: str = '') -> str:
+        """
+        キャッシュキーを計算
+
+        Args:
+            from_file: 変換元ファイル
+            to_ext: 変換先の拡張子
+            variant: 出力に影響する変換方法の違い
+
+        Returns:
+            str: キャッシュキー（16進数）
+        """
+        digest = hashlib.sha256()
+        with open(from_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+
+        key = hashlib.sha256()
+        for part in (digest.hexdigest(), from_file.suffix.lower(), to_ext.lower(),
+                     self.version, variant):
+            key.update(part.encode('utf-8'))
+            key.update(b'\0')
+        return key.hexdigest()
+
+    def get(self, key: str, to_file: Path) -> bool:
+        """
+        キャッシュにあれば to_file にコピー
+
+        Returns:
+            bool: キャッシュにあった場合True
+        """
+        entry = self._entry_path(key, to_file.suffix)
+        try:
+            shutil.copyfile(entry, to_file)
+            # 最終使用時刻を更新（LRU）
+            os.utime(entry)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def put(self, key: str, to_file: Path):
+        """変換結果をキャッシュに保存"""
+        self._store(key, to_file.suffix, lambda tmp: shutil.copyfile(to_file, tmp))
+
+    def _store(self, key: str, suffix: str, write):
+        """write(一時ファイルのパス) で書き込んだ内容をエントリとして保存"""
+        entry = self._entry_path(key, suffix)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        # 書きかけのエントリを読まれないよう一時ファイルから置き換える
+        tmp = self.cache_dir / f'.{key}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            write(tmp)
+            size = tmp.stat().st_size
+            # 置き換えるエントリの分は合計から除く
+            replaced_size = _file_size(entry)
+            os.replace(tmp, entry)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+        if self._total_size is None:
+            self._total_size = self._scan_size()
+        else:
+            self._total_size += size - replaced_size
+
+        if self._total_size > self.max_size:
+            self._evict()
+
+    def clear(self):
+        """キャッシュを全て削除"""
+        for entry in self._entries():
+            entry.unlink(missing_ok=True)
+        self._total_size = 0
+
+    def _entry_path(self, key: str, to_ext: str) -> Path:
+        return self.cache_dir / f'{key}{to_ext.lower()}'
+
+    def _entries(self):
+        """キャッシュエントリ（エントリの名前のファイルのみ、一時ファイル・他のファイルは除く）"""
+        if not self.cache_dir.is_dir():
+            return []
+        return [p for p in self.cache_dir.iterdir()
+                if self.ENTRY_NAME.fullmatch(p.name) and p.is_file()]
+
+    def _scan_size(self) -> int:
+        return sum(_file_size(p) for p in self._entries())
+
+    def _evict(self):
+        """古いエントリから削除して上限以下にする"""
+        entries = []
+        for p in self._entries():
+            try:
+                stat = p.stat()
+            except FileNotFoundError:
+                # 他のプロセスが削除済み
+                continue
+            entries.append((stat.st_mtime, stat.st_size, p))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in entries:
+            if total <= self.max_size:
+                break
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+        self._total_size = total
+
+    def __repr__(self):
+        return f"ConversionCache('{self.cache_dir}', max_size={self.max_size})"
+
+
+def _file_size(path: Path) -> int:
+    """ファイルのサイズ（ない場合は0）"""
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+class DocumentCache:
+    """
+    読み込んだDocumentを変換元ファイルのパス・サイズ・更新時刻をキーに保持するキャッシュ
+
+    同じファイルを複数の形式に変換する場合や、編集していないファイルを再び変換する場合に
+    読み込み（解析）を省く。プロセス内では最近使った max_entries 件を保持し（LRU）、
+    cache_dir を指定した場合はJSONにして cache_dir/documents にも保存する（合計サイズの上限を
+    超えると ConversionCache と同じく最も長く使われていないエントリから削除する）。
+    ディスクのエントリは読み込んでもコードを実行しない形式だが、書き換えられると変換結果が
+    変わるため、cache_dir は他のユーザーが書き込めない場所にすること
+    （documents ディレクトリは所有者だけが読み書きできる権限で作成する）。
+    ファイルの内容は読まないため、サイズ・更新時刻を変えずに書き換えたファイルは検出できない。
+
+    保持しているDocumentは変換のたびに同じオブジェクトを返すため、変更しないこと。
+    """
+
+    DEFAULT_MAX_ENTRIES = 8
+    DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+
+    # ディスクのエントリを保存するサブディレクトリ（ConversionCache のエントリと分ける）
+    SUBDIRECTORY = 'documents'
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, cache_dir: Optional[Path] = None,
+                 version: str = '', max_size: int = DEFAULT_MAX_SIZE):
+        """
+        Args:
+            max_entries: プロセス内に保持するDocumentの数
+            cache_dir: Documentを保存するディレクトリ（Noneの場合はディスクに保存しない）。
+                ConversionCache と同じディレクトリを指定してもよい（documents サブディレクトリに保存する）
+            version: fmtshiftのバージョン（バージョンが変わるとディスクのエントリは全て無効になる）
+            max_size: ディスクのエントリの合計サイズの上限（バイト）
+        """
+        self.max_entries = max_entries
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.version = version
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        # AsyncFormatConverter のワーカースレッドから同時に使われる場合がある
+        self._lock = threading.Lock()
+        self._disk = (ConversionCache(self.cache_dir / self.SUBDIRECTORY, version, max_size)
+                      if self.cache_dir is not None else None)
+
+    def key(self, from_file: Path, variant: str = '') -> Tuple:
+        """
+        キャッシュキーを作成（ファイルの内容は読まない）
+
+        Args:
+            from_file: 変換元ファイル
+            variant: 読み込み結果に影響する読み込み方法の違い
+
+        Returns:
+            tuple: キャッシュキー
+        """
+        stat = os.stat(from_file)
+        return (str(Path(from_file).resolve()), stat.st_size, stat.st_mtime_ns, variant)
+
+    def get(self, key: Tuple) -> Optional[Document]:
+        """
+        キャッシュにあるDocumentを返す
+
+        Returns:
+            Optional[Document]: キャッシュにない場合None
+        """
+        with self._lock:
+            document = self._entries.get(key)
+            if document is not None:
+                self._entries.move_to_end(key)
+                return document
+
+        if self._disk is None:
+            return None
+        document = self._load(key)
+        if document is not None:
+            self._remember(key, document)
+        return document
+
+    def put(self, key: Tuple, document: Document):
+        """Documentをキャッシュに保存"""
+        self._remember(key, document)
+        if self._disk is not None:
+            self._dump(key, document)
+
+    def clear(self):
+        """キャッシュを全て削除（ディスクのエントリを含む）"""
+        with self._lock:
+            self._entries.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def _remember(self, key: Tuple, document: Document):
+        """プロセス内に保持（上限を超えた分は最も長く使われていないものから捨てる）"""
+        with self._lock:
+            self._entries[key] = document
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _disk_key(self, key: Tuple) -> str:
+        """ディスクのエントリ名（キーとバージョンのハッシュ）"""
+        digest = hashlib.sha256()
+        for part in (*key, self.version):
+            digest.update(str(part).encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _load(self, key: Tuple) -> Optional[Document]:
+        entry = self._disk._entry_path(self._disk_key(key), '.json')
+        try:
+            with open(entry, 'r', encoding='utf-8') as f:
+                document = _document_from_data(json.load(f))
+            # 最終使用時刻を更新（LRU）
+            os.utime(entry)
+        except OSError:
+            return None
+        except (ValueError, TypeError, KeyError, IndexError):
+            # 壊れたエントリ・読み込めない古い形式のエントリは捨てる
+            with suppress(OSError):
+                entry.unlink(missing_ok=True)
+            return None
+        return document
+
+    def _dump(self, key: Tuple, document: Document):
+        """JSONにしてディスクに保存（保存できなくても変換は続ける）"""
+        try:
+            data = _document_data(document)
+        except TypeError:
+            # JSONにできない値（拡張のパーサーが作ったものなど）を含む場合は保存しない
+            return
+
+        def write(tmp: Path):
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+        try:
+            # 他のユーザーに読み書きさせない（親のディレクトリは通常の権限で作る）
+            self._disk.cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+            self._disk._store(self._disk_key(key), '.json', write)
+        except (OSError, TypeError, ValueError):
+            pass
+
+    def __repr__(self):
+        return (f"DocumentCache(max_entries={self.max_entries}, "
+                f"cache_dir={str(self.cache_dir) if self.cache_dir else None!r})")
+
+
+# ディスクに保存するDocumentの形式（変えた場合は番号を上げ、古いエントリは読み込まない）
+_DOCUMENT_FORMAT = 1
+
+# JSONにそのまま保存できるセル・メタデータの値
+_JSON_SCALARS = (str, int, float, bool, type(None))
+
+
+def _document_data(document: Document) -> dict:
+    """
+    DocumentをJSONにできる値に変換
+
+    Raises:
+        TypeError: JSONにできない値を含む場合
+    """
+    return {
+        'format': _DOCUMENT_FORMAT,
+        'title': document.title,
+        'metadata': _metadata_data(document.metadata),
+        'sheets': [
+            {'name': sheet.name,
+             'store': isinstance(sheet.contents, ContentStore),
+             'contents': [_content_data(content) for content in sheet.contents]}
+            for sheet in document.sheets
+        ],
+    }
+
+
+def _metadata_data(metadata) -> dict:
+    for value in metadata.values():
+        if type(value) not in _JSON_SCALARS:
+            raise TypeError(f'JSONにできないメタデータの値です: {type(value).__name__}')
+    return dict(metadata)
+
+
+def _content_data(content: Content) -> list:
+    if content.type == ContentType.TABLE:
+        value = _table_data(content.value)
+    elif type(content.value) is str:
+        value = content.value
+    else:
+        raise TypeError(f'JSONにできないコンテンツの値です: {type(content.value).__name__}')
+
+    if content.metadata:
+        return [content.type.value, value, _metadata_data(content.metadata)]
+    return [content.type.value, value]
+
+
+def _table_data(table) -> dict:
+    if isinstance(table, ColumnarTable):
+        # 数値の配列の列も値のリストにする（読み込むときに同じく配列に戻る）
+        columns = [column.tolist() if isinstance(column, array) else _cells_data(column)
+                   for column in table.columns]
+        return {'headers': list(table.headers), 'columns': columns, 'num_rows': table.num_rows}
+    if isinstance(table, Table):
+        return {'headers': list(table.headers),
+                'rows': [_cells_data(row) for row in table.rows]}
+    raise TypeError(f'JSONにできないテーブルです: {type(table).__name__}')
+
+
+def _cells_data(values) -> list:
+    values = list(values)
+    for value in values:
+        if type(value) not in _JSON_SCALARS:
+            raise TypeError(f'JSONにできないセルの値です: {type(value).__name__}')
+    return values
+
+
+def _document_from_data(data: dict) -> Document:
+    """
+    _document_data の値からDocumentを作成
+
+    Raises:
+        ValueError: 形式が異なる・壊れている場合（KeyError・TypeError・IndexError の場合もある）
+    """
+    if data.get('format') != _DOCUMENT_FORMAT:
+        raise ValueError(f'Documentの形式が異なります: {data.get("format")!r}')
+
+    document = Document(title=data['title'], metadata=dict(data['metadata']))
+    for sheet_data in data['sheets']:
+        contents = [_content_from_data(item) for item in sheet_data['contents']]
+        if sheet_data['store']:
+            contents = ContentStore(contents)
+        document.add_sheet(Sheet(name=sheet_data['name'], contents=contents))
+    return document
+
+
+def _content_from_data(item: list) -> Content:
+    content_type = ContentType(item[0])
+    metadata = dict(item[2]) if len(item) > 2 else None
+    value: Any = item[1]
+    if content_type == ContentType.TABLE:
+        value = _table_from_data(value)
+    elif type(value) is not str:
+        raise ValueError(f'コンテンツの値が文字列ではありません: {type(value).__name__}')
+    elif content_type == ContentType.EMPTY and not value and metadata is None:
+        # 空行は全ての空行で共有する
+        return EMPTY_CONTENT
+    return Content(content_type, value, metadata)
+
+
+def _table_from_data(data: dict):
+    headers = list(data['headers'])
+    if 'columns' in data:
+        if not data['columns']:
+            return ColumnarTable(headers, [], int(data['num_rows']))
+        # 読み込み時と同じく数値だけの列は配列にし、文字列はinternする
+        return ColumnarTable.from_columns(headers, data['columns'])
+    return Table(headers=headers, rows=[list(row) for row in data['rows']])
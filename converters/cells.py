@@ -0,0 +1,120 @@
+"""
+Cells - Excelのセルの値を中間形式の値（数値はそのまま、それ以外は文字列）に変換
+"""
+import datetime
+from typing import Any, Callable, Dict, Iterable, Optional
+
+CellConverter = Callable[[Any], Any]
+
+
+def keep(value):
+    """変換しない"""
+    return value
+
+
+def _empty(value) -> str:
+    return ''
+
+
+# セルの型ごとの変換（型は完全一致で引き、ない場合は str() で文字列にする）
+# bool は int のサブクラスだが、数値ではなく 'True'/'False' にする
+# 日付・時刻は ISO 8601 形式（日付と時刻の間は空白: 2024-01-02 03:04:05）
+DEFAULT_CONVERTERS: Dict[type, CellConverter] = {
+    type(None): _empty,
+    str: keep,
+    int: keep,
+    float: keep,
+    bool: str,
+    datetime.datetime: str,
+    datetime.date: str,
+    datetime.time: str,
+}
+
+# 空白かどうかを文字列に変換せずに判定できる型（数値は空白にならない）
+_NEVER_BLANK = frozenset({int, float, bool, datetime.datetime, datetime.date, datetime.time})
+
+
+def is_blank(value) -> bool:
+    """セルが空か（None、または文字列にすると空白だけになる値）"""
+    if value is None:
+        return True
+    value_type = type(value)
+    if value_type is str:
+        return not value or value.isspace()
+    if value_type in _NEVER_BLANK:
+        return False
+    text = str(value)
+    return not text or text.isspace()
+
+
+class RowNormalizer:
+    """
+    行のセルを型ごとの変換表で1回ずつ変換し、空行を除く
+
+    変換表は register() で型ごとに追加・変更できる。
+    並列に読み込む場合はワーカープロセスに渡すため、変換はpickleできる関数にする。
+    """
+
+    def __init__(self, converters: Optional[Dict[type, CellConverter]] = None):
+        """
+        Args:
+            converters: 既定の変換表に追加・上書きする型ごとの変換
+        """
+        self.converters: Dict[type, CellConverter] = dict(DEFAULT_CONVERTERS)
+        self._update()
+        for cell_type, converter in (converters or {}).items():
+            self.register(cell_type, converter)
+
+    def register(self, cell_type: type, converter: CellConverter):
+        """型の変換を追加・上書き（サブクラスには適用されない）"""
+        self.converters[cell_type] = converter
+        self._update()
+
+    def _update(self):
+        # 変換しない型は関数を呼ばずにそのまま使う
+        self._passthrough = frozenset(
+            cell_type for cell_type, converter in self.converters.items() if converter is keep
+        )
+        self._none_value = self.converters[type(None)](None)
+
+    def convert(self, value):
+        """セルの値を1つ変換"""
+        return self.converters.get(type(value), str)(value)
+
+    def normalize(self, row: Iterable, width: int = 0) -> Optional[list]:
+        """
+        行を変換したリストを返す（空行の場合はNone）
+
+        空行の判定ではリスト・文字列を作らず、空でないセルが見つかった時点で打ち切る。
+
+        Args:
+            row: セルの値の並び（None は空のセル）
+            width: 行の長さがこれより短い場合、空のセルで埋める
+
+        Returns:
+            Optional[list]: 変換した値のリスト
+        """
+        for value in row:
+            if value is None:
+                continue
+            value_type = type(value)
+            if value_type is str:
+                if value and not value.isspace():
+                    break
+            elif value_type in _NEVER_BLANK or not is_blank(value):
+                break
+        else:
+            return None
+
+        passthrough = self._passthrough
+        none_value = self._none_value
+        get = self.converters.get
+        values = [
+            none_value if value is None
+            else value if type(value) in passthrough
+            else get(type(value), str)(value)
+            for value in row
+        ]
+        if len(values) < width:
+            values.extend([none_value] * (width - len(values)))
+        return values
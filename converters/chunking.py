@@ -0,0 +1,222 @@
+"""
+Chunking - 行数の多いシートを続きのシート・ファイルに分割
+"""
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+from converters.base import Content, ContentType, ColumnarTable, Table, Event, EventType
+
+# Excelの1シートあたりの最大行数
+EXCEL_MAX_ROWS = 1048576
+
+_END = object()
+
+
+class SheetPart(NamedTuple):
+    """分割した続きのシート（SHEET_START の value、part は2から）"""
+    name: str
+    part: int
+
+
+def content_rows(content: Content) -> int:
+    """コンテンツが占めるシートの行数（テーブルはヘッダーの1行、データ行は別に数える）"""
+    if content.type == ContentType.CODE_BLOCK:
+        return content.value.count('\n') + 1
+    return 1
+
+
+def split_sheets(events: Iterable[Event], max_rows: int,
+                 row_count: Callable[[Content], int] = content_rows) -> Iterator[Event]:
+    """
+    1シートの行数が max_rows を超えないよう、続きのシートに分けたイベント列を返す
+
+    上限を超えるテーブルは途中で分け、続きのシートの先頭でヘッダーを繰り返す。
+    1つで max_rows を超えるコードブロックは行の区切りで複数のコードブロックに分ける。
+    続きのシートの SHEET_START の value は SheetPart になる。
+    テーブルの行がイテレータの場合もそのまま読み込みながら分けるため、
+    メモリに保持する行は増えない。
+
+    Args:
+        events: 元のイベント列
+        max_rows: 1シートの最大行数（ヘッダーを含む、2以上）
+        row_count: テーブル以外のコンテンツが占める行数を返す関数
+
+    Yields:
+        Event: 分割後のイベント
+
+    Raises:
+        ValueError: max_rows が2未満の場合、コードブロック以外の1つのコンテンツが
+            max_rows を超える行数を占める場合（row_count を指定した場合のみ）
+    """
+    if max_rows < 2:
+        raise ValueError(f'1シートの最大行数は2以上で指定してください: {max_rows}')
+
+    events = iter(events)
+    for event in events:
+        if event.type != EventType.SHEET_START:
+            yield event
+            continue
+
+        yield event
+        yield from _split_sheet(event.value, _iter_contents(events), max_rows, row_count)
+        yield Event(EventType.SHEET_END)
+
+
+def _iter_contents(events: Iterator[Event]) -> Iterator[Content]:
+    """SHEET_END までの Content を返す"""
+    for event in events:
+        if event.type == EventType.SHEET_END:
+            return
+        yield event.value
+
+
+def _split_sheet(name: str, contents: Iterator[Content], max_rows: int,
+                 row_count: Callable[[Content], int]) -> Iterator[Event]:
+    """1シート分のコンテンツを、上限に達するたびに続きのシートへ分けて返す"""
+    part = 1
+    used = 0
+
+    def next_part():
+        nonlocal part, used
+        part += 1
+        used = 0
+        yield Event(EventType.SHEET_END)
+        yield Event(EventType.SHEET_START, SheetPart(name, part))
+
+    for content in contents:
+        if content.type != ContentType.TABLE:
+            rows = row_count(content)
+            if rows > max_rows:
+                if content.type != ContentType.CODE_BLOCK:
+                    raise ValueError(
+                        f'シート {name} のコンテンツ（{content.type.value}）が1シートの最大行数 '
+                        f'{max_rows} を超える {rows} 行を占めるため分割できません')
+                # 1シートに収まらないコードブロックは行の区切りで分ける
+                lines = content.value.split('\n')
+                while lines:
+                    available = max_rows - used
+                    if available < 1:
+                        yield from next_part()
+                        continue
+                    chunk, lines = lines[:available], lines[available:]
+                    yield Event(EventType.CONTENT, content.replace(value='\n'.join(chunk)))
+                    used += len(chunk)
+                continue
+            if used > 0 and used + rows > max_rows:
+                yield from next_part()
+            yield Event(EventType.CONTENT, content)
+            used += rows
+            continue
+
+        table_rows = _TableRows(content.value)
+        while True:
+            available = max_rows - used - 1
+            if available < 1:
+                # ヘッダーしか入らない場合はテーブルごと次のシートへ
+                yield from next_part()
+                continue
+
+            chunk = table_rows.take(available)
+            yield Event(EventType.CONTENT, Content(
+                type=ContentType.TABLE, value=chunk, metadata=content.metadata
+            ))
+            more = table_rows.has_more()
+            used += 1 + table_rows.last_taken
+            if not more:
+                break
+            yield from next_part()
+
+
+class _TableRows:
+    """分割中のテーブルの残りの行"""
+
+    def __init__(self, table):
+        self.table = table
+        self.last_taken = 0
+        self._offset = 0
+        if isinstance(table, ColumnarTable):
+            self._size = table.num_rows
+        elif isinstance(table.rows, list):
+            self._size = len(table.rows)
+        else:
+            # 行数が分からないイテレータは1行先読みして残りがあるか判定する
+            self._size = None
+            self._rows = iter(table.rows)
+            self._next = next(self._rows, _END)
+            self._chunk = iter(())
+
+    def has_more(self) -> bool:
+        """残りの行があるか（前のチャンクの読み切られていない行は読み飛ばす）"""
+        if self._size is None:
+            for _ in self._chunk:
+                pass
+            return self._next is not _END
+        return self._offset < self._size
+
+    def take(self, limit: int):
+        """次の最大 limit 行のテーブルを返す（分割が不要な場合は元のテーブル）"""
+        if self._size is None:
+            self._chunk = self._take_lazy(limit)
+            return Table(headers=self.table.headers, rows=self._chunk)
+
+        start = self._offset
+        stop = min(start + limit, self._size)
+        self._offset = stop
+        self.last_taken = stop - start
+        if start == 0 and stop == self._size:
+            return self.table
+        if isinstance(self.table, ColumnarTable):
+            return ColumnarTable(self.table.headers,
+                                 [column[start:stop] for column in self.table.columns],
+                                 stop - start)
+        return Table(headers=self.table.headers, rows=self.table.rows[start:stop])
+
+    def _take_lazy(self, limit: int) -> Iterator[list]:
+        self.last_taken = 0
+        while self.last_taken < limit and self._next is not _END:
+            yield self._next
+            self.last_taken += 1
+            self._next = next(self._rows, _END)
+
+
+def continued_sheet_names(events: Iterable[Event]) -> Iterator[Event]:
+    """続きのシートを 'Data_2' のような名前の通常のシートにする"""
+    for event in events:
+        if event.type == EventType.SHEET_START and isinstance(event.value, SheetPart):
+            event = Event(EventType.SHEET_START, f'{event.value.name}_{event.value.part}')
+        yield event
+
+
+def split_files(events: Iterable[Event]) -> Iterator[Iterator[Event]]:
+    """
+    split_sheets のイベント列を続きのシートの位置で分け、ファイルごとのイベント列を返す
+
+    続きのシートは元のシート名で次のファイルの先頭になる。
+    ファイルごとのイベント列は、次を取り出す前に読み切る必要がある。
+    """
+    events = iter(events)
+    carry: Optional[Event] = None
+
+    def file_events(first: Optional[Event]) -> Iterator[Event]:
+        nonlocal carry
+        if first is not None:
+            yield first
+        for event in events:
+            if event.type == EventType.SHEET_START and isinstance(event.value, SheetPart):
+                carry = Event(EventType.SHEET_START, event.value.name)
+                return
+            yield event
+
+    first = None
+    while True:
+        yield file_events(first)
+        if carry is None:
+            return
+        first, carry = carry, None
+
+
+def part_path(file_path: Path, index: int) -> Path:
+    """分割したファイルのパス（1つ目は元のパス、2つ目以降は name_2.md のように番号を付ける）"""
+    file_path = Path(file_path)
+    if index == 1:
+        return file_path
+    return file_path.with_name(f'{file_path.stem}_{index}{file_path.suffix}')
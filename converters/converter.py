@@ -1,28 +1,91 @@
 """
 Converter - 形式間の変換を調整
 """
+import io
 from pathlib import Path
-from parsers.excel_parser import ExcelParser
-from parsers.markdown_parser import MarkdownParser
-from writers.excel_writer import ExcelWriter
-from writers.markdown_writer import MarkdownWriter
+from typing import IO, Iterable, Union
+from converters.profiling import NULL_PROFILER, count_document, profile_events
+from converters.registry import ComponentRegistry
+from converters.streams import is_path
 
 
 class FormatConverter:
     """形式変換のコーディネーター"""
     
-    def __init__(self):
-        self.parsers = {
-            '.xlsx': ExcelParser(),
-            '.xls': ExcelParser(),
-            '.md': MarkdownParser(),
-        }
+    ENGINES = ('openpyxl', 'pandas')
+
+    def __init__(self, jobs: int = 1, cache=None, engine: str = 'openpyxl', profiler=None,
+                 selection=None, max_sheet_rows=None, split_files: bool = False,
+                 pretty: bool = False, document_cache=None):
+        """
+        Args:
+            jobs: Excelのシートを並列に読み込むプロセス数（1の場合は並列化しない）。
+                並列に読み込む場合はストリーミングせずDocumentを経由する
+            cache: 変換結果のキャッシュ（converters.cache.ConversionCache、Noneの場合は使わない）
+            engine: Excelの読み込みの実装。'pandas' の場合、シートを pandas.read_excel で
+                まとめて読み込み、列形式のテーブルにする
+            profiler: フェーズごとの時間・件数を記録するプロファイラー
+                （converters.profiling.Profiler、Noneの場合は計測しない）
+            selection: Excelから読み込むシート・セル範囲・行数
+                （converters.selection.SheetSelection、Noneの場合は全て）
+            max_sheet_rows: 出力の1シートの最大行数。超えた分は続きのシート（Data_2, …）に
+                書き込む（Noneの場合、Excelはその上限、Markdownは分割しない）
+            split_files: Trueの場合、続きのシートを別のファイル（name_2.xlsx, …）に書き込む。
+                キャッシュは使わない
+            pretty: Trueの場合、Markdownのテーブルの列幅を揃えて出力する
+            document_cache: 読み込んだDocumentのキャッシュ（converters.cache.DocumentCache、
+                Noneの場合は使わない）。使う場合、ファイルの変換はストリーミングせずに
+                Document全体を読み込む
+
+        Raises:
+            ValueError: engine が不明な場合、max_sheet_rows なしで split_files を指定した場合
+        """
+        if engine not in self.ENGINES:
+            raise ValueError(f'不明なエンジン: {engine}')
+        if split_files and max_sheet_rows is None:
+            raise ValueError('ファイルへの分割には1シートの最大行数の指定が必要です')
+
+        self.jobs = jobs
+        self.cache = cache
+        self.engine = engine
+        self.profiler = profiler or NULL_PROFILER
+        self.selection = selection
+        self.max_sheet_rows = max_sheet_rows
+        self.split_files = split_files
+        self.pretty = pretty
+        self.document_cache = document_cache
+
+        # モジュールのインポートとインスタンスの作成は拡張子が使われるまで行わない
+        self.parsers = ComponentRegistry(on_create=self._attach_profiler)
+        if engine == 'pandas':
+            self.parsers.register('.xlsx', 'parsers.pandas_excel_parser', 'PandasExcelParser',
+                                  selection=selection)
+            self.parsers.register('.xls', 'parsers.pandas_excel_parser', 'PandasExcelParser',
+                                  selection=selection)
+        else:
+            self.parsers.register('.xlsx', 'parsers.excel_parser', 'ExcelParser', jobs=jobs,
+                                  selection=selection)
+            self.parsers.register('.xls', 'parsers.excel_parser', 'ExcelParser', jobs=jobs,
+                                  selection=selection)
+        self.parsers.register('.md', 'parsers.markdown_parser', 'MarkdownParser')
+        self.parsers.register('.csv', 'parsers.csv_parser', 'CsvParser')
+        self.parsers.register('.tsv', 'parsers.csv_parser', 'CsvParser', delimiter='\t')
         
-        self.writers = {
-            '.xlsx': ExcelWriter(),
-            '.xls': ExcelWriter(),
-            '.md': MarkdownWriter(),
-        }
+        # 分割の指定がない場合はライターの既定値を使う
+        split_options = {}
+        if max_sheet_rows is not None:
+            split_options = {'max_sheet_rows': max_sheet_rows, 'split_files': split_files}
+
+        self.writers = ComponentRegistry(on_create=self._attach_profiler)
+        self.writers.register('.xlsx', 'writers.excel_writer', 'ExcelWriter', **split_options)
+        self.writers.register('.xls', 'writers.excel_writer', 'ExcelWriter', **split_options)
+        self.writers.register('.md', 'writers.markdown_writer', 'MarkdownWriter', pretty=pretty,
+                              **split_options)
+        # CSVはシートごとに別のファイルに書き込むため、続きのシートも常に別のファイルになる
+        csv_options = {'max_sheet_rows': max_sheet_rows} if max_sheet_rows is not None else {}
+        self.writers.register('.csv', 'writers.csv_writer', 'CsvWriter', **csv_options)
+        self.writers.register('.tsv', 'writers.csv_writer', 'CsvWriter', delimiter='\t',
+                              **csv_options)
     
     def convert(self, from_file: Path, to_file: Path):
         """
@@ -35,10 +98,112 @@ class FormatConverter:
         Raises:
             ValueError: サポートされていない形式の場合
         """
-        from_ext = from_file.suffix.lower()
-        to_ext = to_file.suffix.lower()
+        parser, writer = self._get_components(from_file.suffix, to_file.suffix)
+        
+        with self.profiler.phase('convert'):
+            self._write_cached(parser, writer, from_file, to_file,
+                               lambda: self._convert(parser, writer, from_file, to_file))
+    
+    def convert_many(self, from_file: Path, to_files: Iterable[Path]):
+        """
+        1つのファイルを複数のファイルに変換（読み込みは1回だけ）
+
+        Args:
+            from_file: 変換元ファイル
+            to_files: 変換先ファイル（形式は拡張子から判定する）
+
+        Raises:
+            ValueError: サポートされていない形式の場合（変換を始める前に全ての変換先を確認する）
+        """
+        targets = [(to_file, *self._get_components(from_file.suffix, to_file.suffix))
+                   for to_file in to_files]
+        document = None
+
+        def write(parser, writer, to_file):
+            nonlocal document
+            if document is None:
+                document = self._parse(parser, from_file)
+            with self.profiler.phase('write'):
+                writer.write(document, to_file)
+
+        with self.profiler.phase('convert'):
+            for to_file, parser, writer in targets:
+                # 全ての変換先が変換結果のキャッシュにある場合は読み込まない
+                self._write_cached(parser, writer, from_file, to_file,
+                                   lambda: write(parser, writer, to_file))
+    
+    def _write_cached(self, parser, writer, from_file: Path, to_file: Path, write):
+        """変換結果のキャッシュにあればコピーし、なければ write() で変換して保存"""
+        # 同じ内容のファイルを変換済みならキャッシュからコピーするだけ
+        # （複数のファイルに書き込む場合、キャッシュは1ファイルしか保持できないため使わない）
+        use_cache = self.cache is not None and not self._writes_parts(parser, writer)
+        if use_cache:
+            with self.profiler.phase('cache.get'):
+                cache_key = self.cache.key(from_file, to_file.suffix.lower(),
+                                           self._cache_variant(parser, writer))
+                hit = self.cache.get(cache_key, to_file)
+            if hit:
+                self.profiler.count('cache_hits')
+                return
+        
+        write()
+        
+        if use_cache:
+            try:
+                with self.profiler.phase('cache.put'):
+                    self.cache.put(cache_key, to_file)
+            except OSError:
+                # キャッシュに保存できなくても変換自体は成功している
+                pass
+    
+    def convert_stream(self, source: Union[bytes, bytearray, memoryview, IO],
+                       target: IO, from_format: str, to_format: str):
+        """
+        ストリーム（またはバイト列）の内容を変換してストリームに書き込み
+
+        一時ファイルを使わずメモリ上で変換する。形式はファイル名がないため明示する。
+        キャッシュは使わない。
+
+        Args:
+            source: 変換元のバイト列、バイナリストリーム、
+                またはテキストストリーム（テキスト形式の場合）
+            target: 書き込み先のバイナリストリーム、
+                またはテキストストリーム（テキスト形式の場合）
+            from_format: 変換元の形式（例: '.md'、'md'）
+            to_format: 変換先の形式（例: '.xlsx'、'xlsx'）
+
+        Raises:
+            ValueError: サポートされていない形式の場合
+        """
+        parser, writer = self._get_components(from_format, to_format)
+        with self.profiler.phase('convert'):
+            self._convert(parser, writer, source, target)
+
+    def convert_bytes(self, data: Union[bytes, bytearray, memoryview],
+                      from_format: str, to_format: str) -> bytes:
+        """
+        バイト列を変換して変換結果のバイト列を返す
+
+        Args:
+            data: 変換元の内容（テキスト形式はUTF-8）
+            from_format: 変換元の形式（例: '.md'、'md'）
+            to_format: 変換先の形式（例: '.xlsx'、'xlsx'）
+
+        Returns:
+            bytes: 変換結果（テキスト形式はUTF-8）
+
+        Raises:
+            ValueError: サポートされていない形式の場合
+        """
+        output = io.BytesIO()
+        self.convert_stream(data, output, from_format, to_format)
+        return output.getvalue()
+
+    def _get_components(self, from_format: str, to_format: str):
+        """形式に対応するパーサーとライターを取得"""
+        from_ext = _normalize_format(from_format)
+        to_ext = _normalize_format(to_format)
         
-        # パーサーとライターを取得
         parser = self.parsers.get(from_ext)
         writer = self.writers.get(to_ext)
         
@@ -48,12 +213,87 @@ class FormatConverter:
         if writer is None:
             raise ValueError(f'サポートされていない出力形式: {to_ext}')
         
-        # 変換実行
+        if self.selection is not None and not hasattr(parser, 'selection'):
+            raise ValueError(f'シート・範囲・行数の指定はExcelの読み込みでのみ使えます: {from_ext}')
+        
+        return parser, writer
+
+    def _convert(self, parser, writer, from_file, to_file):
+        """パーサーとライターで変換を実行"""
+        # 両方がイベントに対応している場合はDocument全体を作らずに
+        # 読み込みながら書き込む（ストリーミング）
+        # パーサーがシートを並列に読み込む場合は、シート単位で結果をまとめるためDocumentを経由する
+        # Documentのキャッシュを使う場合は、次の変換で使えるようDocument全体を読み込む
+        streaming = hasattr(parser, 'iter_events') and hasattr(writer, 'write_events')
+        parallel = self._parses_in_parallel(parser, from_file)
+        cached = self.document_cache is not None and is_path(from_file)
+        if streaming and not parallel and not cached:
+            events = parser.iter_events(from_file)
+            if self.profiler.enabled:
+                # 読み込みは書き込みの途中で進むため、イベントを取り出す時間を parse とする
+                events = profile_events(events, self.profiler)
+            with self.profiler.phase('write'):
+                writer.write_events(events, to_file)
+            return
+        
         # 1. 読み込み（パース）
-        document = parser.parse(from_file)
+        document = self._parse(parser, from_file)
         
         # 2. 書き込み
-        writer.write(document, to_file)
+        with self.profiler.phase('write'):
+            writer.write(document, to_file)
+    
+    def _parses_in_parallel(self, parser, from_file) -> bool:
+        """parse() がシートを別プロセスで並列に読み込むか（ExcelParser の jobs、ファイルの場合のみ）"""
+        return getattr(parser, 'jobs', 1) > 1 and is_path(from_file)
+
+    def _parse(self, parser, from_file):
+        """Document全体を読み込み（キャッシュがあればキャッシュから）"""
+        use_cache = self.document_cache is not None and is_path(from_file)
+        if use_cache:
+            with self.profiler.phase('document_cache.get'):
+                cache_key = self.document_cache.key(from_file, self._document_variant(parser))
+                document = self.document_cache.get(cache_key)
+            if document is not None:
+                self.profiler.count('document_cache_hits')
+                return document
+
+        with self.profiler.phase('parse'):
+            document = parser.parse(from_file)
+        if self.profiler.enabled:
+            count_document(document, self.profiler)
+
+        if use_cache:
+            with self.profiler.phase('document_cache.put'):
+                self.document_cache.put(cache_key, document)
+        return document
+    
+    def _writes_parts(self, parser, writer) -> bool:
+        """変換結果が複数のファイル（name_2.xlsx など）になる場合があるか"""
+        if self.split_files:
+            return True
+        if getattr(writer, 'FILE_PER_SHEET', False):
+            # シートごとにファイルを分けるライター（CSV）は、入力が1シートで分割しない場合のみ1ファイル
+            return self.max_sheet_rows is not None or not getattr(parser, 'SINGLE_SHEET', False)
+        return False
+    
+    def _cache_variant(self, parser, writer) -> str:
+        """キャッシュキーに含める変換方法（パーサー・ライターの実装）"""
+        variant = f'{type(parser).__qualname__}/{type(writer).__qualname__}'
+        if self.selection is not None:
+            variant += f'/{self.selection.key()}'
+        if self.max_sheet_rows is not None:
+            variant += f'/max_sheet_rows={self.max_sheet_rows}'
+        if self.pretty:
+            variant += '/pretty'
+        return variant
+    
+    def _document_variant(self, parser) -> str:
+        """Documentのキャッシュキーに含める読み込み方法（パーサーの実装・シートの選択）"""
+        variant = type(parser).__qualname__
+        if self.selection is not None:
+            variant += f'/{self.selection.key()}'
+        return variant
     
     def get_supported_formats(self):
         """サポートされている形式のリストを返す"""
@@ -67,5 +307,20 @@ class FormatConverter:
         self.parsers[extension] = parser
     
     def add_writer(self, extension: str, writer):
-        """新しいライターを追加（拡張用）"""
+        """
+        新しいライターを追加（拡張用）
+
+        テーブルのセルは文字列とは限らない（Excelの数値は int・float、converters.base.CellValue）。
+        """
         self.writers[extension] = writer
+    
+    def _attach_profiler(self, component):
+        """計測する場合はパーサー・ライターにもプロファイラーを設定（内部のフェーズ用）"""
+        if self.profiler.enabled:
+            component.profiler = self.profiler
+
+
+def _normalize_format(format_name: str) -> str:
+    """形式名を拡張子の形（小文字、先頭に '.'）にする"""
+    format_name = format_name.lower()
+    return format_name if format_name.startswith('.') or not format_name else f'.{format_name}'
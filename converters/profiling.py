@@ -0,0 +1,281 @@
+"""
+Profiling - 変換のフェーズごとの時間・メモリ・件数の計測
+"""
+import json
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from converters.base import ContentType, Document, Event, EventType, Table
+
+try:
+    import resource
+except ImportError:
+    # Windowsでは resource がないためピークメモリは記録しない
+    resource = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """このプロセスのピークメモリ（MB）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOSはバイト、Linuxはキロバイト単位
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+@dataclass
+class PhaseStats:
+    """フェーズごとの集計（self_* は内側のフェーズの時間を除いたもの）"""
+    name: str
+    parent: Optional[str] = None
+    calls: int = 0
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    self_wall_s: float = 0.0
+    self_cpu_s: float = 0.0
+    peak_rss_mb: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class _Frame:
+    """実行中のフェーズ"""
+    __slots__ = ('stats', 'wall', 'cpu', 'child_wall', 'child_cpu')
+
+    def __init__(self, stats: PhaseStats):
+        self.stats = stats
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        self.child_wall = 0.0
+        self.child_cpu = 0.0
+
+
+class Profiler:
+    """
+    変換のフェーズごとに経過時間・CPU時間・ピークメモリを、また行数などの件数を記録
+
+    フェーズは入れ子にでき、同じ名前のフェーズは最初に現れた位置にまとめて集計する。
+    ストリーミング変換では書き込み中に読み込みが進むため、
+    各フェーズの self_wall_s・self_cpu_s は内側のフェーズの時間を除いて集計する。
+
+    フック（add_hook）はフェーズの終了・変換の終了ごとにイベントの辞書を受け取る。
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.phases: Dict[str, PhaseStats] = {}
+        self.counters: Counter = Counter()
+        self._stack: List[_Frame] = []
+        self._hooks: List[Callable[[dict], None]] = []
+
+    def add_hook(self, hook: Callable[[dict], None]):
+        """イベントを受け取る関数を追加"""
+        self._hooks.append(hook)
+
+    def emit(self, event: dict):
+        """イベントをフックに渡す"""
+        for hook in self._hooks:
+            hook(event)
+
+    @contextmanager
+    def phase(self, name: str, emit: bool = True):
+        """
+        フェーズを計測するコンテキストマネージャー
+
+        Args:
+            name: フェーズ名
+            emit: 終了時にフックへイベントを渡すか（細かく繰り返すフェーズではFalse）
+        """
+        frame = self._enter(name)
+        try:
+            yield
+        finally:
+            elapsed = self._exit(frame)
+            if emit:
+                event = {'event': 'phase', 'elapsed_s': elapsed}
+                event.update(frame.stats.to_dict())
+                self.emit(event)
+
+    def count(self, name: str, n: int = 1):
+        """件数を加算"""
+        self.counters[name] += n
+
+    def timed(self, iterable: Iterable, name: str) -> Iterator:
+        """イテレータから値を取り出す時間を name のフェーズとして計測"""
+        iterator = iter(iterable)
+        while True:
+            frame = self._enter(name)
+            try:
+                value = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._exit(frame)
+            yield value
+
+    def finish(self) -> dict:
+        """集計結果を返し、フックに 'summary' イベントを渡す"""
+        summary = {
+            'event': 'summary',
+            'phases': [stats.to_dict() for stats in self.phases.values()],
+            'counters': dict(self.counters),
+            'peak_rss_mb': peak_rss_mb(),
+        }
+        self.emit(summary)
+        return summary
+
+    def report(self) -> str:
+        """人が読むための集計表"""
+        lines = [f'{"phase":<30}{"calls":>8}{"wall(s)":>10}{"cpu(s)":>10}'
+                 f'{"self(s)":>10}{"peak(MB)":>12}']
+        for stats, depth in self._walk(None, 0):
+            indent = '  ' * depth
+            peak = f'{stats.peak_rss_mb:.1f}' if stats.peak_rss_mb is not None else '-'
+            lines.append(f'{indent + stats.name:<30}{stats.calls:>8}{stats.wall_s:>10.3f}'
+                         f'{stats.cpu_s:>10.3f}{stats.self_wall_s:>10.3f}{peak:>12}')
+        if self.counters:
+            lines.append('counters: ' + ', '.join(f'{name}={value}'
+                                                for name, value in self.counters.items()))
+        peak = peak_rss_mb()
+        if peak is not None:
+            lines.append(f'peak RSS: {peak:.1f} MB')
+        return '\n'.join(lines)
+
+    def _walk(self, parent: Optional[str], depth: int):
+        """フェーズを (集計, 深さ) として親子の順に返す"""
+        for stats in self.phases.values():
+            if stats.parent == parent:
+                yield stats, depth
+                yield from self._walk(stats.name, depth + 1)
+
+    def _enter(self, name: str) -> _Frame:
+        stats = self.phases.get(name)
+        if stats is None:
+            parent = self._stack[-1].stats.name if self._stack else None
+            stats = self.phases[name] = PhaseStats(name, parent)
+        frame = _Frame(stats)
+        self._stack.append(frame)
+        return frame
+
+    def _exit(self, frame: _Frame) -> float:
+        """フェーズを終了して集計に加え、今回の経過時間を返す"""
+        wall = time.perf_counter() - frame.wall
+        cpu = time.process_time() - frame.cpu
+        self._stack.pop()
+
+        stats = frame.stats
+        stats.calls += 1
+        stats.wall_s += wall
+        stats.cpu_s += cpu
+        stats.self_wall_s += wall - frame.child_wall
+        stats.self_cpu_s += cpu - frame.child_cpu
+
+        if self._stack:
+            parent = self._stack[-1]
+            parent.child_wall += wall
+            parent.child_cpu += cpu
+        else:
+            # ピークメモリは外側のフェーズの終了時のみ取得（繰り返し呼ばない）
+            stats.peak_rss_mb = peak_rss_mb()
+        return wall
+
+
+class _NullProfiler:
+    """計測しない場合のプロファイラー（何もしない）"""
+
+    enabled = False
+
+    def add_hook(self, hook):
+        pass
+
+    def emit(self, event: dict):
+        pass
+
+    def phase(self, name: str, emit: bool = True):
+        return nullcontext()
+
+    def count(self, name: str, n: int = 1):
+        pass
+
+    def timed(self, iterable: Iterable, name: str) -> Iterable:
+        return iterable
+
+    def finish(self) -> dict:
+        return {}
+
+
+# パーサー・ライターの既定のプロファイラー
+NULL_PROFILER = _NullProfiler()
+
+
+def profile_events(events: Iterable[Event], profiler: Profiler,
+                   name: str = 'parse') -> Iterator[Event]:
+    """
+    パーサーのイベント列を計測しながら返す
+
+    イベントとテーブルの行を取り出す時間を name のフェーズとし、
+    シート数・コンテンツ数・テーブル数・行数・セル数を数える。
+    """
+    for event in profiler.timed(events, name):
+        if event.type == EventType.SHEET_START:
+            profiler.count('sheets')
+        elif event.type == EventType.CONTENT:
+            profiler.count('contents')
+            content = event.value
+            if content.type == ContentType.TABLE:
+                profiler.count('tables')
+                table = content.value
+                if isinstance(table, Table) and not isinstance(table.rows, list):
+                    table.rows = _count_rows(profiler.timed(table.rows, name), profiler)
+                else:
+                    _count_table(table, profiler)
+        yield event
+
+
+def _count_rows(rows: Iterable[list], profiler: Profiler) -> Iterator[list]:
+    for row in rows:
+        profiler.count('rows')
+        profiler.count('cells', len(row))
+        yield row
+
+
+def _count_table(table, profiler: Profiler):
+    if isinstance(table, Table):
+        profiler.count('rows', len(table.rows))
+        profiler.count('cells', sum(map(len, table.rows)))
+    else:
+        # ColumnarTable（行の長さは揃っている）
+        profiler.count('rows', table.num_rows)
+        profiler.count('cells', table.num_rows * len(table.columns))
+
+
+def count_document(document: Document, profiler: Profiler):
+    """Documentのシート数・コンテンツ数・テーブル数・行数・セル数を数える"""
+    for sheet in document.sheets:
+        profiler.count('sheets')
+        profiler.count('contents', len(sheet.contents))
+        for content in sheet.tables:
+            profiler.count('tables')
+            _count_table(content.value, profiler)
+
+
+class JsonLinesHook:
+    """イベントを1行1つのJSONとして書き出すフック"""
+
+    def __init__(self, stream):
+        """
+        Args:
+            stream: 書き込み先（テキストモードのファイルオブジェクト）
+        """
+        self.stream = stream
+
+    def __call__(self, event: dict):
+        self.stream.write(json.dumps(event, ensure_ascii=False) + '\n')
+        self.stream.flush()
@@ -0,0 +1,76 @@
+"""
+Registry - 拡張子ごとのパーサー・ライターを必要になった時点で作成
+"""
+import importlib
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Optional
+
+
+class _LazySpec(NamedTuple):
+    """まだ作成していないパーサー・ライター"""
+    module: str
+    class_name: str
+    options: dict
+
+
+class ComponentRegistry(MutableMapping):
+    """
+    拡張子からパーサー（またはライター）を引く辞書
+
+    register() ではモジュール名とクラス名だけを登録し、その拡張子が
+    初めて使われたときにモジュールをインポートしてインスタンスを作る。
+    openpyxl・pandas などの重いライブラリは変換に必要な場合のみ読み込まれる。
+    作成したインスタンスはそれ以降使い回す。
+    """
+
+    def __init__(self, on_create: Optional[Callable[[Any], None]] = None):
+        """
+        Args:
+            on_create: インスタンスを作成・追加したときに呼ぶ関数
+        """
+        self._entries: Dict[str, Any] = {}
+        self._on_create = on_create
+
+    def register(self, extension: str, module: str, class_name: str, **options):
+        """
+        拡張子にパーサー・ライターのクラスを登録（インポートはしない）
+
+        Args:
+            extension: 拡張子（例: '.xlsx'）
+            module: クラスを定義しているモジュール名
+            class_name: クラス名
+            **options: インスタンスを作るときの引数
+        """
+        self._entries[extension] = _LazySpec(module, class_name, options)
+
+    def is_loaded(self, extension: str) -> bool:
+        """インスタンスを作成済みか"""
+        return extension in self._entries and not isinstance(self._entries[extension], _LazySpec)
+
+    def __getitem__(self, extension: str):
+        entry = self._entries[extension]
+        if isinstance(entry, _LazySpec):
+            cls = getattr(importlib.import_module(entry.module), entry.class_name)
+            entry = cls(**entry.options)
+            self[extension] = entry
+        return entry
+
+    def __setitem__(self, extension: str, instance):
+        self._entries[extension] = instance
+        if self._on_create is not None:
+            self._on_create(instance)
+
+    def __delitem__(self, extension: str):
+        del self._entries[extension]
+
+    def __contains__(self, extension) -> bool:
+        return extension in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"ComponentRegistry({list(self._entries)})"
@@ -0,0 +1,116 @@
+"""
+Selection - Excelの読み込み対象（シート・セル範囲・行数）の指定
+"""
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+# A1:F1000、A:F、1:1000、A1 の形式
+_RANGE = re.compile(r'^([A-Z]{1,3})?([1-9][0-9]*)?(?::([A-Z]{1,3})?([1-9][0-9]*)?)?$')
+
+
+def column_index(letters: str) -> int:
+    """列記号を列番号（1始まり）に変換（A → 1、AA → 27）"""
+    index = 0
+    for char in letters:
+        index = index * 26 + ord(char) - ord('A') + 1
+    return index
+
+
+def column_letters(index: int) -> str:
+    """列番号（1始まり）を列記号に変換"""
+    letters = ''
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+@dataclass(frozen=True)
+class SheetSelection:
+    """
+    読み込むシート・セル範囲・行数
+
+    指定のないものは全て読み込む。範囲の行・列番号は1始まりで、両端を含む。
+    """
+    sheets: Optional[Tuple[str, ...]] = None
+    min_row: Optional[int] = None
+    max_row: Optional[int] = None
+    min_col: Optional[int] = None
+    max_col: Optional[int] = None
+    max_rows: Optional[int] = None
+
+    @classmethod
+    def create(cls, sheets: Optional[Sequence[str]] = None, cell_range: Optional[str] = None,
+               max_rows: Optional[int] = None) -> Optional['SheetSelection']:
+        """
+        オプションから作成（何も指定がない場合はNone）
+
+        Args:
+            sheets: 読み込むシート名（指定した順に出力する）
+            cell_range: 各シートで読み込むセル範囲（例: 'A1:F1000'、'A:F'、'1:1000'）
+            max_rows: 各シートで読み込むヘッダーを除いた行数の上限（空行は数えない）
+
+        Returns:
+            Optional[SheetSelection]: 読み込む対象
+
+        Raises:
+            ValueError: 範囲の形式が正しくない場合、max_rows が負の場合
+        """
+        if not sheets and not cell_range and max_rows is None:
+            return None
+
+        if max_rows is not None and max_rows < 0:
+            raise ValueError(f'最大行数は0以上で指定してください: {max_rows}')
+
+        bounds = cls._parse_range(cell_range) if cell_range else (None,) * 4
+        return cls(tuple(sheets) if sheets else None, *bounds, max_rows=max_rows)
+
+    @staticmethod
+    def _parse_range(cell_range: str) -> Tuple[Optional[int], ...]:
+        """セル範囲を (min_row, max_row, min_col, max_col) に変換"""
+        match = _RANGE.match(cell_range.strip().upper())
+        if match is None or not any(match.groups()):
+            raise ValueError(f'セル範囲の形式が正しくありません: {cell_range}')
+
+        start_col, start_row, end_col, end_row = match.groups()
+        if ':' not in cell_range:
+            # 単一のセル
+            end_col, end_row = start_col, start_row
+        if (start_col is None) != (end_col is None) or (start_row is None) != (end_row is None):
+            raise ValueError(f'セル範囲の形式が正しくありません: {cell_range}')
+
+        min_row = int(start_row) if start_row else None
+        max_row = int(end_row) if end_row else None
+        min_col = column_index(start_col) if start_col else None
+        max_col = column_index(end_col) if end_col else None
+        if (min_row or 0) > (max_row or 0) or (min_col or 0) > (max_col or 0):
+            raise ValueError(f'セル範囲の始点が終点より後ろにあります: {cell_range}')
+        return min_row, max_row, min_col, max_col
+
+    def select_sheets(self, sheet_names: Sequence[str]) -> List[str]:
+        """
+        ブックのシート名から読み込むシートを選ぶ
+
+        Raises:
+            ValueError: 指定したシートがブックにない場合
+        """
+        if self.sheets is None:
+            return list(sheet_names)
+
+        available = set(sheet_names)
+        missing = [name for name in self.sheets if name not in available]
+        if missing:
+            raise ValueError(f'シートが見つかりません: {", ".join(missing)}'
+                             f'（シート: {", ".join(sheet_names)}）')
+        return list(self.sheets)
+
+    @property
+    def row_limit(self) -> Optional[int]:
+        """ヘッダーを含めて読み込む行数の上限"""
+        return None if self.max_rows is None else self.max_rows + 1
+
+    def key(self) -> str:
+        """キャッシュキーに含める文字列"""
+        return (f'sheets={self.sheets!r};rows={self.min_row}-{self.max_row};'
+                f'cols={self.min_col}-{self.max_col};max_rows={self.max_rows}')
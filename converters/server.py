@@ -0,0 +1,426 @@
+"""
+Server - 変換を常駐プロセスで受け付けるHTTPサーバー
+
+変換のたびにプロセスを起動する代わりに、ライブラリをインポート済みの
+ワーカープロセスを保持し、HTTP（TCPの127.0.0.1またはUnixソケット）で変換を受け付ける。
+
+    POST /convert                      {"from": "in.md", "to": "out.xlsx"}  パスで変換
+                                       （Content-Type: application/json が必要）
+    POST /convert?from=.md&to=.xlsx    本文に変換元のバイト列  → 変換結果のバイト列
+    GET  /stats                        キューの深さ・処理件数・レイテンシ
+    GET  /health
+
+ブラウザから（DNSリバインディングなどで）変換を実行されないよう、/convert は
+Host が待ち受けているアドレスでない場合と、別のオリジンの Origin が付いている場合は 403 を返す。
+"""
+import asyncio
+import ipaddress
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from converters.converter import FormatConverter
+
+# ヘッダーの最大サイズ
+MAX_HEADER_SIZE = 64 * 1024
+
+_REASONS = {
+    200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found',
+    405: 'Method Not Allowed', 411: 'Length Required', 413: 'Payload Too Large',
+    415: 'Unsupported Media Type', 500: 'Internal Server Error', 503: 'Service Unavailable',
+}
+
+# ループバックで待ち受ける場合に Host として受け付ける名前
+_LOOPBACK_NAMES = ('localhost', '127.0.0.1', '::1')
+# 全てのアドレスで待ち受ける場合の待ち受けアドレス
+_ANY_ADDRESSES = ('', '0.0.0.0', '::')
+
+
+class _HttpError(Exception):
+    """HTTPのエラー応答"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class LatencyStats:
+    """直近の処理時間の統計（件数・平均・パーセンタイル）"""
+
+    def __init__(self, window: int = 1000):
+        self._samples = deque(maxlen=window)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def summary(self) -> dict:
+        samples = sorted(self._samples)
+        if not samples:
+            return {'count': 0}
+
+        def percentile(p):
+            return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+        return {
+            'count': len(samples),
+            'mean': sum(samples) / len(samples),
+            'p50': percentile(0.50),
+            'p95': percentile(0.95),
+            'p99': percentile(0.99),
+            'max': samples[-1],
+        }
+
+
+class ConversionServer:
+    """
+    変換ジョブを受け付けてワーカープロセスで実行するサーバー
+
+    同時に受け付けるジョブ（実行中＋待機中）が max_pending に達すると、
+    新しいジョブには 503（Retry-After付き）を返して呼び出し側に待ってもらう。
+    """
+
+    def __init__(self, jobs: int = 1, max_pending: Optional[int] = None,
+                 max_body_size: int = 256 * 1024 * 1024,
+                 converter_options: Optional[dict] = None):
+        """
+        Args:
+            jobs: ワーカープロセス数
+            max_pending: 同時に受け付けるジョブ数の上限（Noneの場合はワーカー数の4倍）
+            max_body_size: アップロードできる変換元の最大サイズ（バイト）
+            converter_options: 各ワーカーの FormatConverter に渡す引数
+        """
+        self.jobs = max(1, jobs)
+        self.max_pending = max_pending or self.jobs * 4
+        self.max_body_size = max_body_size
+        self.converter_options = converter_options or {}
+
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.latency = LatencyStats()
+        self.queue_wait = LatencyStats()
+        self._started = time.time()
+        self._executor = None
+        self._server = None
+        self._unix_socket = None
+        # 受け付ける Host の (名前, ポート)（Unixソケットの場合はNone）
+        self._bound = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8765,
+                    unix_socket: Optional[str] = None):
+        """
+        ワーカーを起動して接続の受け付けを開始
+
+        Args:
+            host: 待ち受けるアドレス（既定はローカルのみ）
+            port: 待ち受けるポート（0の場合は空いているポート）
+            unix_socket: 指定した場合はTCPの代わりにこのUnixソケットで待ち受ける
+        """
+        self._executor = self._create_executor()
+        # 最初のジョブがインポートを待たないよう全てのワーカーを起動しておく
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self._executor, _warm_up) for _ in range(self.jobs)
+        ))
+
+        if unix_socket:
+            self._unix_socket = unix_socket
+            self._server = await asyncio.start_unix_server(
+                self._handle, path=unix_socket, limit=MAX_HEADER_SIZE)
+        else:
+            self._server = await asyncio.start_server(
+                self._handle, host, port, limit=MAX_HEADER_SIZE)
+            self._bound = (host or '', self.addresses[0][1])
+
+    @property
+    def addresses(self) -> list:
+        """待ち受けているアドレス"""
+        return [sock.getsockname() for sock in self._server.sockets]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """受け付けを止めてワーカーを終了"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._unix_socket is not None and os.path.exists(self._unix_socket):
+            os.unlink(self._unix_socket)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        """キューの深さと処理件数・レイテンシ"""
+        running = min(self.pending, self.jobs)
+        return {
+            'uptime_s': time.time() - self._started,
+            'workers': self.jobs,
+            'max_pending': self.max_pending,
+            'pending': self.pending,
+            'running': running,
+            'queued': self.pending - running,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'latency_s': self.latency.summary(),
+            'queue_wait_s': self.queue_wait.summary(),
+        }
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.jobs,
+            initializer=_init_worker,
+            initargs=(self.converter_options,)
+        )
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """1つの接続（1リクエスト）を処理"""
+        try:
+            try:
+                method, target, headers = await self._read_head(reader)
+                status, content_type, body = await self._dispatch(method, target, headers, reader)
+            except _HttpError as e:
+                status, content_type, body = e.status, 'application/json', _json({'error': str(e)})
+
+            head = [
+                f'HTTP/1.1 {status} {_REASONS.get(status, "")}',
+                f'Content-Type: {content_type}',
+                f'Content-Length: {len(body)}',
+                'Connection: close',
+            ]
+            if status == 503:
+                head.append('Retry-After: 1')
+            writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+            writer.write(body)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_head(self, reader: asyncio.StreamReader) -> Tuple[str, str, dict]:
+        """リクエスト行とヘッダーを読み込み"""
+        try:
+            data = await reader.readuntil(b'\r\n\r\n')
+        except (asyncio.LimitOverrunError, ValueError):
+            raise _HttpError(413, 'ヘッダーが大きすぎます')
+
+        lines = data.decode('latin-1').split('\r\n')
+        try:
+            method, target, _ = lines[0].split(' ', 2)
+        except ValueError:
+            raise _HttpError(400, f'不正なリクエスト行: {lines[0]!r}')
+
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        return method.upper(), target, headers
+
+    async def _read_body(self, reader: asyncio.StreamReader, headers: dict) -> bytes:
+        """Content-Length の分だけ本文を読み込み"""
+        if 'content-length' not in headers:
+            raise _HttpError(411, 'Content-Length が必要です')
+        try:
+            length = int(headers['content-length'])
+        except ValueError:
+            raise _HttpError(400, f"不正な Content-Length: {headers['content-length']!r}")
+        if length < 0 or length > self.max_body_size:
+            raise _HttpError(413, f'本文が大きすぎます（上限 {self.max_body_size} バイト）')
+        return await reader.readexactly(length)
+
+    async def _dispatch(self, method: str, target: str, headers: dict, reader):
+        """パスに応じて処理し (ステータス, Content-Type, 本文) を返す"""
+        url = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+
+        if url.path == '/health':
+            return 200, 'application/json', _json({'status': 'ok'})
+
+        if url.path == '/stats':
+            return 200, 'application/json', _json(self.stats())
+
+        if url.path != '/convert':
+            raise _HttpError(404, f'不明なパス: {url.path}')
+        if method != 'POST':
+            raise _HttpError(405, '/convert は POST のみ受け付けます')
+        self._check_origin(headers)
+
+        if 'from' not in query and _media_type(headers) != 'application/json':
+            raise _HttpError(415, 'パスでの変換は Content-Type: application/json で指定してください')
+        body = await self._read_body(reader, headers)
+        if 'from' in query:
+            # バイト列のアップロード
+            if 'to' not in query:
+                raise _HttpError(400, 'to（変換先の拡張子）を指定してください')
+            task = (_convert_bytes, body, _extension(query['from']), _extension(query['to']))
+            result = await self._submit(task)
+            return 200, 'application/octet-stream', result
+
+        try:
+            request = json.loads(body)
+            task = (_convert_path, request['from'], request['to'])
+        except (ValueError, KeyError, TypeError):
+            raise _HttpError(400, '本文は {"from": ..., "to": ...} のJSONで指定してください')
+        result = await self._submit(task)
+        return 200, 'application/json', _json(result)
+
+    def _check_origin(self, headers: dict):
+        """
+        Host が待ち受けているアドレスで、Origin が付いている場合は同じオリジンであることを確認
+
+        Raises:
+            _HttpError: 403（別のホスト・オリジンからのリクエストの場合）
+        """
+        if self._bound is None:
+            # Unixソケットにはブラウザから接続できない
+            return
+        host = headers.get('host', '')
+        if not self._is_bound_host(host):
+            raise _HttpError(403, f'Host が待ち受けているアドレスではありません: {host!r}')
+        origin = headers.get('origin')
+        if origin is not None and origin.lower() != f'http://{host.lower()}':
+            raise _HttpError(403, f'別のオリジンからのリクエストは受け付けません: {origin!r}')
+
+    def _is_bound_host(self, host: str) -> bool:
+        """Host ヘッダー（名前:ポート）が待ち受けているアドレスを指しているか"""
+        name, port = _split_host(host)
+        bound_host, bound_port = self._bound
+        if name is None or port != bound_port:
+            return False
+        if bound_host in _ANY_ADDRESSES:
+            # 全てのアドレスで待ち受ける場合はIPアドレスと localhost のみ
+            return name == 'localhost' or _is_ip_address(name)
+        if bound_host in _LOOPBACK_NAMES:
+            return name in _LOOPBACK_NAMES
+        return name == bound_host.lower()
+
+    async def _submit(self, task: tuple):
+        """ジョブをワーカーで実行（上限を超える場合は受け付けない）"""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise _HttpError(503, f'処理中のジョブが上限（{self.max_pending}）に達しています')
+
+        self.pending += 1
+        submitted = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            function, *args = task
+            executor = self._executor
+            try:
+                started, ok, result = await loop.run_in_executor(
+                    executor, _run_job, function, *args
+                )
+            except BrokenProcessPool:
+                # ワーカーが異常終了した場合はプールを作り直す（同じプールで失敗した
+                # 他のジョブが既に作り直していれば何もしない）
+                if self._executor is executor:
+                    self._executor = self._create_executor()
+                    executor.shutdown(wait=False)
+                self.failed += 1
+                raise _HttpError(500, 'ワーカープロセスが異常終了しました')
+        finally:
+            self.pending -= 1
+
+        self.queue_wait.add(max(0.0, started - submitted))
+        self.latency.add(time.time() - submitted)
+        if not ok:
+            self.failed += 1
+            status, message = result
+            raise _HttpError(status, message)
+
+        self.completed += 1
+        return result
+
+
+def _json(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False).encode('utf-8')
+
+
+def _media_type(headers: dict) -> str:
+    """Content-Type のメディアタイプ（パラメーターを除き小文字）"""
+    return headers.get('content-type', '').split(';', 1)[0].strip().lower()
+
+
+def _split_host(host: str) -> Tuple[Optional[str], Optional[int]]:
+    """Host ヘッダーを (名前, ポート) に分ける（ポートがない場合は80、不正な場合は名前がNone）"""
+    host = host.strip().lower()
+    if host.startswith('['):
+        name, _, rest = host[1:].partition(']')
+        port = rest[1:] if rest.startswith(':') else rest
+    else:
+        name, _, port = host.partition(':')
+    if not name or (port and not port.isdigit()):
+        return None, None
+    return name, int(port) if port else 80
+
+
+def _is_ip_address(name: str) -> bool:
+    try:
+        ipaddress.ip_address(name)
+    except ValueError:
+        return False
+    return True
+
+
+def _extension(value: str) -> str:
+    value = value.lower()
+    return value if value.startswith('.') else f'.{value}'
+
+
+# ワーカープロセスごとに1つだけ作る変換器
+_worker_converter = None
+
+
+def _init_worker(converter_options: dict):
+    """ワーカープロセスの初期化（全てのパーサー・ライターをインポートしておく）"""
+    global _worker_converter
+    _worker_converter = FormatConverter(**converter_options)
+    for extension in _worker_converter.parsers:
+        _worker_converter.parsers[extension]
+    for extension in _worker_converter.writers:
+        _worker_converter.writers[extension]
+
+
+def _warm_up():
+    """ワーカープロセスを起動させるための空のジョブ"""
+    return os.getpid()
+
+
+def _run_job(function, *args):
+    """ジョブを実行し (開始時刻, 成功したか, 結果またはエラー) を返す"""
+    started = time.time()
+    try:
+        return started, True, function(*args)
+    except FileNotFoundError as e:
+        return started, False, (404, f'ファイルが見つかりません: {e.filename}')
+    except ValueError as e:
+        return started, False, (400, str(e))
+    except Exception as e:
+        return started, False, (500, f'{type(e).__name__}: {e}')
+
+
+def _convert_path(from_file: str, to_file: str) -> dict:
+    """パスで指定されたファイルを変換"""
+    from_path, to_path = Path(from_file), Path(to_file)
+    if not from_path.exists():
+        raise FileNotFoundError(2, 'No such file', str(from_path))
+
+    started = time.perf_counter()
+    _worker_converter.convert(from_path, to_path)
+    return {'from': str(from_path), 'to': str(to_path),
+            'elapsed_s': time.perf_counter() - started}
+
+
+def _convert_bytes(data: bytes, from_ext: str, to_ext: str) -> bytes:
+    """アップロードされたバイト列をメモリ上で変換"""
+    return _worker_converter.convert_bytes(data, from_ext, to_ext)
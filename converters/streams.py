@@ -0,0 +1,149 @@
+"""
+Streams - ファイルパス・バイト列・ストリームを同じように読み書きするためのヘルパー
+
+パーサーとライターは、ファイルパスの代わりに次のものを受け付ける。
+
+    読み込み元: bytes / bytearray / memoryview、バイナリストリーム（BytesIOなど）、
+               テキストストリーム（StringIOなど、Markdown・CSVのみ）
+    書き込み先: バイナリストリーム、テキストストリーム（Markdown・CSVのみ）
+
+ストリームは呼び出し元のものなので閉じない。
+"""
+import io
+import os
+import shutil
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator, Optional, Union
+
+# パーサーが受け付ける読み込み元
+Source = Union[str, os.PathLike, bytes, bytearray, memoryview, IO]
+
+# ライターが受け付ける書き込み先
+Target = Union[str, os.PathLike, IO]
+
+_BYTES_TYPES = (bytes, bytearray, memoryview)
+
+
+def is_path(obj) -> bool:
+    """ファイルパスか（ストリーム・バイト列ではないか）"""
+    return isinstance(obj, (str, os.PathLike))
+
+
+def source_name(source: Source) -> Optional[str]:
+    """
+    ドキュメントのタイトルに使う名前（ファイル名から拡張子を除いたもの）
+
+    名前のないストリーム・バイト列の場合はNone。
+    """
+    if is_path(source):
+        return Path(source).stem
+
+    name = getattr(source, 'name', None)
+    if isinstance(name, str) and name and not name.startswith('<'):
+        return Path(name).stem
+    return None
+
+
+def binary_source(source: Source):
+    """
+    バイナリ形式の読み込み元を openpyxl・pandas が受け付ける形（パスまたはバイナリストリーム）にする
+
+    Raises:
+        ValueError: テキストストリームの場合
+    """
+    if isinstance(source, _BYTES_TYPES):
+        return io.BytesIO(source)
+    if isinstance(source, io.TextIOBase):
+        raise ValueError('Excelの読み込みにはバイナリのストリーム（BytesIOなど）が必要です')
+    return source
+
+
+def binary_target(target: Target):
+    """
+    バイナリ形式の書き込み先を確認（パスまたはバイナリストリーム）
+
+    Raises:
+        ValueError: テキストストリームの場合
+    """
+    if isinstance(target, io.TextIOBase):
+        raise ValueError('Excelの書き込みにはバイナリのストリーム（BytesIOなど）が必要です')
+    return target
+
+
+@contextmanager
+def open_text_source(source: Source, encoding: str = 'utf-8',
+                     newline: Optional[str] = None) -> Iterator[IO[str]]:
+    """
+    テキスト形式の読み込み元をテキストストリームとして開く
+
+    改行の扱いはファイルを open() で開いた場合と同じ（\\r\\n は \\n になる）。
+    newline は open() と同じ（CSVは '' を指定して改行を変換しない）。
+    テキストストリームはそのまま返すため、encoding・newline は使わない。
+    """
+    if is_path(source):
+        with open(source, 'r', encoding=encoding, newline=newline) as f:
+            yield f
+    elif isinstance(source, _BYTES_TYPES):
+        with io.TextIOWrapper(io.BytesIO(source), encoding=encoding, newline=newline) as f:
+            yield f
+    elif isinstance(source, io.TextIOBase):
+        yield source
+    else:
+        wrapper = io.TextIOWrapper(source, encoding=encoding, newline=newline)
+        try:
+            yield wrapper
+        finally:
+            # 呼び出し元のストリームを閉じないよう切り離す
+            wrapper.detach()
+
+
+@contextmanager
+def open_text_target(target: Target, encoding: str = 'utf-8',
+                     newline: Optional[str] = None) -> Iterator[IO[str]]:
+    """
+    テキスト形式の書き込み先をテキストストリームとして開く
+
+    newline は open() と同じ（CSVは '' を指定して改行を変換しない）。
+    """
+    if is_path(target):
+        with open(target, 'w', encoding=encoding, newline=newline) as f:
+            yield f
+    elif isinstance(target, io.TextIOBase):
+        yield target
+    else:
+        wrapper = io.TextIOWrapper(target, encoding=encoding, newline=newline)
+        try:
+            yield wrapper
+        finally:
+            # 書き込んだ内容を渡してから、呼び出し元のストリームを閉じないよう切り離す
+            wrapper.flush()
+            wrapper.detach()
+
+
+@contextmanager
+def replace_on_success(target: Target) -> Iterator[Target]:
+    """
+    ファイルパスの書き込み先は同じディレクトリの一時ファイルに書き込ませ、
+    成功した場合だけ書き込み先に置き換える
+
+    途中で失敗した場合（読み込み元のエラーなど）は一時ファイルを削除し、
+    書き込み先にある元のファイルはそのまま残す。ストリームはそのまま返す。
+    """
+    if not is_path(target):
+        yield target
+        return
+
+    path = Path(target)
+    # open() で作成するため、権限は通常のファイルと同じ（umaskに従う）
+    tmp = path.with_name(f'.{path.name}.{uuid.uuid4().hex[:12]}.tmp')
+    try:
+        yield tmp
+        if path.exists():
+            # 既存のファイルの権限を引き継ぐ
+            shutil.copymode(path, tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
@@ -7,6 +7,7 @@ Version 2.0 - リファクタリング版
 """
 import argparse
 import sys
+from contextlib import contextmanager
 from pathlib import Path
 
 # スクリプトのディレクトリをパスに追加
@@ -21,6 +22,10 @@ __version__ = '0.2'
 
 def main():
     """CLIエントリーポイント"""
+    if sys.argv[1:2] == ['serve']:
+        serve(sys.argv[2:])
+        return
+    
     parser = argparse.ArgumentParser(
         description=f'fmtshift - 複数フォーマット変換ツール (v{__version__})',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -28,27 +33,97 @@ def main():
 使用例:
   fmtshift -f test.xlsx -t test.md      # Excel → Markdown
   fmtshift -f test.md -t test.xlsx      # Markdown → Excel
+  fmtshift -f data.csv -t data.xlsx     # CSV → Excel (文字コード・区切り文字は自動判定)
   fmtshift -f input.xlsx -t output.md   # ファイル名を指定
+  fmtshift -f big.xlsx -t big.md -j 4   # シートを4プロセスで並列に読み込み
+  fmtshift -f big.xlsx -t big.md --engine pandas  # pandasでシートをまとめて読み込む
+  fmtshift -f big.xlsx -t head.md --sheets 売上 --max-rows 100  # 1シートの先頭100行だけ
+  fmtshift -f big.md -t big.xlsx --max-sheet-rows 100000 --split-files  # 10万行ごとに別ファイル
+  fmtshift -b docs/ --to-ext .xlsx -o out/ -j 4     # ディレクトリ内を一括変換
+  fmtshift -b "specs/**/*.md" --to-ext .xlsx -o out/ # globパターンで一括変換
+  fmtshift -b files.txt --to-ext .md -o out/        # マニフェスト(1行1パス)で一括変換
+  fmtshift serve -j 4                                # 変換サーバーを起動 (fmtshift serve -h)
   
 サポート形式:
-  入力: .xlsx, .xls, .md
-  出力: .xlsx, .xls, .md
+  入力: .xlsx, .xls, .md, .csv, .tsv
+  出力: .xlsx, .xls, .md, .csv, .tsv
   
 今後追加予定:
   - PDF (.pdf)
-  - CSV (.csv)
         '''
     )
     
-    parser.add_argument('-f', '--from', dest='from_file', required=True,
+    parser.add_argument('-f', '--from', dest='from_file',
                         help='変換元ファイル')
-    parser.add_argument('-t', '--to', dest='to_file', required=True,
+    parser.add_argument('-t', '--to', dest='to_file',
                         help='変換先ファイル')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='並列処理するプロセス数 (単体: シート単位, バッチ: ファイル単位, '
+                             '0: CPUコア数, 既定: 1)')
+    parser.add_argument('--engine', choices=FormatConverter.ENGINES, default='openpyxl',
+                        help='Excelの読み込みの実装 (pandas: pandas.read_excel でシートを'
+                             'まとめて読み込む, 既定: openpyxl)')
+    parser.add_argument('--pretty', action='store_true',
+                        help='Markdownのテーブルの列幅を揃えて出力 (全角文字は2文字分)')
+    parser.add_argument('--profile', action='store_true',
+                        help='フェーズごとの時間・メモリ・件数を標準エラー出力に表示')
+    parser.add_argument('--profile-json', dest='profile_json', metavar='PATH',
+                        help='計測結果をJSON Lines形式で書き出す (-: 標準エラー出力)')
     parser.add_argument('-v', '--version', action='version', 
                         version=f'fmtshift {__version__}')
     
+    add_cache_arguments(parser)
+    
+    select = parser.add_argument_group('Excelの読み込み範囲')
+    select.add_argument('--sheets',
+                        help='読み込むシート名 (カンマ区切り, 指定した順に出力, 既定: 全シート)')
+    select.add_argument('--range', dest='cell_range', metavar='RANGE',
+                        help='各シートで読み込むセル範囲 (例: A1:F1000, A:F, 1:1000)')
+    select.add_argument('--max-rows', dest='max_rows', type=int,
+                        help='各シートで読み込む行数の上限 (ヘッダーと空行を除く)')
+    
+    split = parser.add_argument_group('出力の分割')
+    split.add_argument('--max-sheet-rows', dest='max_sheet_rows', type=int,
+                       help='出力の1シートの最大行数 (超えた分は Data_2 などの続きのシートに'
+                            '書き込む, 既定: Excelは1048576, Markdownは分割しない)')
+    split.add_argument('--split-files', dest='split_files', action='store_true',
+                       help='続きのシートを別のファイル (name_2.xlsx など) に書き込む')
+    
+    batch = parser.add_argument_group('バッチ変換')
+    batch.add_argument('-b', '--batch', dest='batch_source',
+                       help='変換元のディレクトリ、globパターン、またはマニフェストファイル')
+    batch.add_argument('--to-ext', dest='to_ext',
+                       help='バッチ変換の変換先拡張子 (例: .xlsx)')
+    batch.add_argument('-o', '--out-dir', dest='out_dir',
+                       help='バッチ変換の出力先ディレクトリ (既定: 変換元と同じ場所)')
+    
     args = parser.parse_args()
     
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    
+    try:
+        selection = create_selection(args)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.max_sheet_rows is not None and args.max_sheet_rows < 2:
+        parser.error('--max-sheet-rows は2以上で指定してください')
+    if args.split_files and args.max_sheet_rows is None:
+        parser.error('--split-files には --max-sheet-rows が必要です')
+    
+    if args.batch_source:
+        if args.from_file or args.to_file:
+            parser.error('-b/--batch と -f/-t は同時に指定できません')
+        if not args.to_ext:
+            parser.error('バッチ変換には --to-ext が必要です')
+        if jobs > 1 and (args.profile or args.profile_json):
+            parser.error('バッチ変換の --profile は -j 1 の場合のみ使えます')
+        with create_profiler(args) as profiler:
+            run_batch(args, jobs, create_cache(args), profiler, selection)
+        return
+    
+    if not args.from_file or not args.to_file:
+        parser.error('-f/--from と -t/--to を指定してください（一括変換は -b/--batch）')
+    
     # ファイルパスを取得
     from_path = Path(args.from_file)
     to_path = Path(args.to_file)
@@ -60,8 +135,13 @@ def main():
     
     # 変換実行
     try:
-        converter = FormatConverter()
-        converter.convert(from_path, to_path)
+        with create_profiler(args) as profiler:
+            converter = FormatConverter(jobs=jobs, cache=create_cache(args), engine=args.engine,
+                                        profiler=profiler, selection=selection,
+                                        max_sheet_rows=args.max_sheet_rows,
+                                        split_files=args.split_files,
+                                        pretty=args.pretty)
+            converter.convert(from_path, to_path)
         print(f'✓ 変換完了: {from_path.name} → {to_path.name}')
     
     except ValueError as e:
@@ -79,5 +159,168 @@ def main():
         sys.exit(1)
 
 
+def add_cache_arguments(parser):
+    """キャッシュのオプションを追加"""
+    cache = parser.add_argument_group('キャッシュ（指定した場合のみ使う）')
+    cache.add_argument('--cache', dest='use_cache', action='store_true',
+                       help='変換結果を既定のキャッシュ先にキャッシュする (~/.cache/fmtshift, '
+                            '環境変数 FMTSHIFT_CACHE_DIR で変更可)')
+    cache.add_argument('--cache-dir', dest='cache_dir',
+                       help='変換結果を指定したディレクトリにキャッシュする')
+    cache.add_argument('--no-cache', dest='no_cache', action='store_true',
+                       help='キャッシュを使わない (--cache・--cache-dir より優先)')
+    cache.add_argument('--cache-max-size', dest='cache_max_size', type=int, default=512,
+                       help='キャッシュの上限サイズ (MB, 既定: 512)')
+
+
+def create_cache(args):
+    """
+    オプションに従って変換結果のキャッシュを作成
+
+    --cache・--cache-dir を指定しなかった場合と --no-cache の場合はNone。
+    """
+    if args.no_cache or not (args.use_cache or args.cache_dir):
+        return None
+    
+    from converters.cache import ConversionCache, default_cache_dir
+    cache_dir = Path(args.cache_dir) if args.cache_dir else default_cache_dir()
+    return ConversionCache(cache_dir, version=__version__,
+                           max_size=args.cache_max_size * 1024 * 1024)
+
+
+def create_selection(args):
+    """オプションに従ってExcelの読み込み範囲を作成（指定がない場合はNone）"""
+    if not args.sheets and not args.cell_range and args.max_rows is None:
+        return None
+    
+    from converters.selection import SheetSelection
+    sheets = [name.strip() for name in args.sheets.split(',')] if args.sheets else None
+    return SheetSelection.create(sheets, args.cell_range, args.max_rows)
+
+
+@contextmanager
+def create_profiler(args):
+    """
+    オプションに従ってプロファイラーを作成（計測しない場合はNone）
+
+    終了時に --profile の集計表を表示し、--profile-json のファイルを閉じる。
+    """
+    if not args.profile and not args.profile_json:
+        yield None
+        return
+    
+    from converters.profiling import Profiler, JsonLinesHook
+    profiler = Profiler()
+    json_file = None
+    if args.profile_json == '-':
+        profiler.add_hook(JsonLinesHook(sys.stderr))
+    elif args.profile_json:
+        json_file = open(args.profile_json, 'w', encoding='utf-8')
+        profiler.add_hook(JsonLinesHook(json_file))
+    
+    try:
+        yield profiler
+    finally:
+        profiler.finish()
+        if json_file is not None:
+            json_file.close()
+        if args.profile:
+            print(profiler.report(), file=sys.stderr)
+
+
+def run_batch(args, jobs: int, cache=None, profiler=None, selection=None):
+    """バッチ変換を実行して結果の集計を表示"""
+    from converters.batch import collect_sources, convert_batch
+    
+    converter = FormatConverter()
+    supported = converter.get_supported_formats()
+    to_ext = args.to_ext if args.to_ext.startswith('.') else f'.{args.to_ext}'
+    if to_ext.lower() not in supported['output']:
+        print(f'✗ エラー: サポートされていない出力形式: {to_ext}', file=sys.stderr)
+        print(f'  出力: {", ".join(supported["output"])}', file=sys.stderr)
+        sys.exit(1)
+    
+    try:
+        sources = collect_sources(args.batch_source, supported['input'])
+    except ValueError as e:
+        print(f'✗ エラー: {e}', file=sys.stderr)
+        sys.exit(1)
+    
+    out_dir = Path(args.out_dir) if args.out_dir else None
+    result = convert_batch(sources, to_ext, out_dir, jobs=jobs,
+                           converter_options={'cache': cache, 'engine': args.engine,
+                                              'profiler': profiler, 'selection': selection,
+                                              'max_sheet_rows': args.max_sheet_rows,
+                                              'split_files': args.split_files,
+                                              'pretty': args.pretty})
+    
+    for source, error in result.failed:
+        print(f'✗ {source}: {error}', file=sys.stderr)
+    print(f'一括変換: 成功 {len(result.succeeded)} 件 / 失敗 {len(result.failed)} 件 '
+          f'(合計 {result.total} 件)')
+    
+    if result.failed:
+        sys.exit(1)
+
+
+def serve(argv):
+    """変換サーバーを起動（Ctrl+C で終了）"""
+    parser = argparse.ArgumentParser(
+        prog='fmtshift serve',
+        description='ライブラリを読み込んだワーカーを常駐させ、HTTPで変換を受け付ける',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='''
+エンドポイント:
+  POST /convert                    {"from": "in.md", "to": "out.xlsx"} (パスで変換)
+  POST /convert?from=.md&to=.xlsx  本文に変換元のバイト列 (変換結果を返す)
+  GET  /stats                      キューの深さ・処理件数・レイテンシ
+  GET  /health
+        '''
+    )
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='待ち受けるアドレス (既定: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765,
+                        help='待ち受けるポート (既定: 8765)')
+    parser.add_argument('--socket', dest='unix_socket', metavar='PATH',
+                        help='TCPの代わりにUnixソケットで待ち受ける')
+    parser.add_argument('-j', '--jobs', type=int, default=0,
+                        help='ワーカープロセス数 (0: CPUコア数, 既定: 0)')
+    parser.add_argument('--max-pending', dest='max_pending', type=int,
+                        help='同時に受け付けるジョブ数の上限、超えると503を返す '
+                             '(既定: ワーカー数の4倍)')
+    parser.add_argument('--engine', choices=FormatConverter.ENGINES, default='openpyxl',
+                        help='Excelの読み込みの実装 (既定: openpyxl)')
+    add_cache_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    import asyncio
+    from converters.server import ConversionServer
+    
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    server = ConversionServer(jobs=jobs, max_pending=args.max_pending,
+                              converter_options={'cache': create_cache(args),
+                                                 'engine': args.engine})
+    
+    async def run():
+        await server.start(args.host, args.port, args.unix_socket)
+        if sys.platform != 'win32':
+            # SIGTERM でも Ctrl+C と同じように終了する
+            import signal
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, asyncio.current_task().cancel)
+        for address in server.addresses:
+            print(f'fmtshift serve: {address} で待ち受け中 (ワーカー {server.jobs}, '
+                  f'上限 {server.max_pending} ジョブ)', file=sys.stderr)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+    
+    try:
+        asyncio.run(run())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+
 if __name__ == '__main__':
     main()
@@ -2,4 +2,4 @@
 Parsers for reading various file formats
 """
 
-__all__ = ['excel_parser', 'markdown_parser']
+__all__ = ['excel_parser', 'markdown_parser', 'csv_parser']
@@ -0,0 +1,194 @@
+"""
+CSV パーサー - CSV・TSVファイルを中間形式に変換
+"""
+import codecs
+import csv
+import io
+from contextlib import contextmanager
+from itertools import chain
+from typing import IO, Iterator, Optional, Sequence, Union
+from converters.base import (
+    Document, Content, ContentType, Table, ColumnarTable, Event, EventType, build_document
+)
+from converters.profiling import NULL_PROFILER
+from converters.streams import Source, is_path, open_text_source, source_name
+
+# 文字コードの候補（先頭から順に、読み込んだ先頭部分を変換できるものを使う）
+# utf-8-sig はBOMがあれば取り除き、なければ utf-8 と同じ
+DEFAULT_ENCODINGS = ('utf-8-sig', 'cp932')
+
+# 区切り文字の候補（delimiter を指定しない場合に先頭部分から判定する）
+DEFAULT_DELIMITERS = ',\t;|'
+
+# 文字コード・区切り文字の判定に読み込む先頭部分のバイト数
+SNIFF_SIZE = 64 * 1024
+
+# ファイルを読み込む単位（バイト）
+READ_BUFFER_SIZE = 1024 * 1024
+
+
+class CsvParser:
+    """CSV・TSVファイルを読み込んで中間形式に変換"""
+
+    # CSVはシートが1つなので、シート単位の並列化はしない
+    SINGLE_SHEET = True
+
+    # フェーズの計測（FormatConverter が設定する）
+    profiler = NULL_PROFILER
+
+    def __init__(self, encoding: Optional[str] = None,
+                 encodings: Sequence[str] = DEFAULT_ENCODINGS,
+                 dialect: Union[str, csv.Dialect, None] = None,
+                 delimiter: Optional[str] = None,
+                 delimiters: str = DEFAULT_DELIMITERS,
+                 sniff_size: int = SNIFF_SIZE, columnar: bool = True):
+        """
+        Args:
+            encoding: 文字コード（Noneの場合は encodings から判定する）
+            encodings: 判定する文字コードの候補（先頭から順に試す）。
+                BOMのあるUTF-16は候補に関係なく判定する
+            dialect: csv モジュールのダイアレクト（名前または csv.Dialect、既定は 'excel'）
+            delimiter: 区切り文字（Noneの場合は delimiters から判定する）
+            delimiters: 判定する区切り文字の候補
+            sniff_size: 文字コード・区切り文字の判定に使う先頭部分のバイト数
+            columnar: Trueの場合、parse() のテーブルを列形式（ColumnarTable）で保持する
+        """
+        self.encoding = encoding
+        self.encodings = tuple(encodings)
+        self.dialect = dialect
+        self.delimiter = delimiter
+        self.delimiters = delimiters
+        self.sniff_size = sniff_size
+        self.columnar = columnar
+
+    def parse(self, file_path: Source) -> Document:
+        """
+        CSVファイルを解析してDocumentオブジェクトに変換
+
+        Args:
+            file_path: CSVファイルのパス、バイト列またはストリーム
+
+        Returns:
+            Document: 中間形式のドキュメント（1シート・1テーブル）
+        """
+        table_factory = ColumnarTable.from_rows if self.columnar else None
+        return build_document(self.iter_events(file_path),
+                              Document(title=source_name(file_path)),
+                              table_factory=table_factory)
+
+    def iter_events(self, file_path: Source) -> Iterator[Event]:
+        """
+        CSVファイルを読み込みながらイベントを順に返す
+
+        1行目をヘッダーとし、2行目以降はテーブルの行のイテレータとして返す。
+        ファイルは READ_BUFFER_SIZE ずつ読み込み、保持するのは判定に使う先頭部分だけ。
+        空行は読み飛ばす。
+
+        Args:
+            file_path: CSVファイルのパス、バイト列またはストリーム
+                （バイナリ、またはテキスト。テキストの場合は文字コードを判定しない）
+
+        Yields:
+            Event: シート開始・コンテンツ・シート終了のイベント
+
+        Raises:
+            ValueError: 文字コードを判定できない場合
+        """
+        with self._open(file_path) as f:
+            sample = ''
+            delimiter = self.delimiter
+            if delimiter is None:
+                # 判定に使った先頭部分は、行の途中で切れないよう行末まで読んでから戻す
+                sample = f.read(self.sniff_size)
+                if sample and not sample.endswith(('\n', '\r')):
+                    sample += f.readline()
+                delimiter = self._sniff_delimiter(sample)
+
+            lines = chain(io.StringIO(sample, newline=''), f) if sample else f
+            reader = csv.reader(lines, self.dialect or 'excel', delimiter=delimiter)
+            # 空行（[]）を除く
+            rows = filter(None, reader)
+
+            yield Event(EventType.SHEET_START, source_name(file_path) or 'Sheet1')
+            headers = next(rows, None)
+            if headers is not None:
+                content = Content(
+                    type=ContentType.TABLE,
+                    value=Table(headers=headers, rows=rows),
+                    metadata={'source': 'csv', 'delimiter': delimiter}
+                )
+                yield Event(EventType.CONTENT, content)
+            yield Event(EventType.SHEET_END)
+
+    @contextmanager
+    def _open(self, file_path: Source) -> Iterator[IO[str]]:
+        """文字コードを判定してテキストストリームとして開く（改行は変換しない）"""
+        if isinstance(file_path, io.TextIOBase):
+            yield file_path
+            return
+
+        encoding = self.encoding or self._detect_encoding(file_path)
+        if is_path(file_path):
+            # 大きなファイルは読み込みの回数を減らす
+            with open(file_path, 'r', encoding=encoding, newline='',
+                      buffering=READ_BUFFER_SIZE) as f:
+                yield f
+        else:
+            with open_text_source(file_path, encoding=encoding, newline='') as f:
+                yield f
+
+    def _detect_encoding(self, file_path: Source) -> str:
+        """
+        先頭部分を読んで文字コードを判定
+
+        Raises:
+            ValueError: どの候補でも変換できない場合
+        """
+        with self.profiler.phase('parse.detect_encoding'):
+            sample = self._read_sample(file_path)
+            if sample is None:
+                # 先頭部分を読み戻せないストリームは最初の候補で読む
+                return self.encodings[0]
+
+            if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+                return 'utf-16'
+
+            # 先頭部分の末尾で切れた文字は次の読み込みに続くものとして扱う
+            final = len(sample) < self.sniff_size
+            for encoding in self.encodings:
+                try:
+                    codecs.getincrementaldecoder(encoding)().decode(sample, final=final)
+                except UnicodeDecodeError:
+                    continue
+                return encoding
+
+        raise ValueError(
+            f'文字コードを判定できません（候補: {", ".join(self.encodings)}）。'
+            'encoding を指定してください'
+        )
+
+    def _read_sample(self, file_path: Source) -> Optional[bytes]:
+        """読み込み位置を変えずに先頭部分のバイト列を読む（読めない場合はNone）"""
+        if is_path(file_path):
+            with open(file_path, 'rb') as f:
+                return f.read(self.sniff_size)
+        if isinstance(file_path, (bytes, bytearray, memoryview)):
+            return bytes(file_path[:self.sniff_size])
+        if file_path.seekable():
+            position = file_path.tell()
+            try:
+                return file_path.read(self.sniff_size)
+            finally:
+                file_path.seek(position)
+        if hasattr(file_path, 'peek'):
+            return file_path.peek(self.sniff_size)[:self.sniff_size]
+        return None
+
+    def _sniff_delimiter(self, sample: str) -> str:
+        """先頭部分から区切り文字を判定（判定できない場合はダイアレクトの区切り文字）"""
+        with self.profiler.phase('parse.sniff'):
+            try:
+                return csv.Sniffer().sniff(sample, delimiters=self.delimiters).delimiter
+            except csv.Error:
+                dialect = self.dialect or 'excel'
+                return (csv.get_dialect(dialect) if isinstance(dialect, str) else dialect).delimiter
@@ -1,62 +1,308 @@
 """
 Excel パーサー - Excelファイルを中間形式に変換
 """
+import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from itertools import islice
+from typing import Dict, Iterator, Optional
 import openpyxl
-from converters.base import Document, Sheet, Content, ContentType, Table
+from openpyxl.utils import column_index_from_string
+from converters.base import (
+    Document, Sheet, Content, ContentType, Table, ColumnarTable, Event, EventType,
+    build_document
+)
+from converters.cells import CellConverter, RowNormalizer
+from converters.profiling import NULL_PROFILER
+from converters.selection import SheetSelection
+from converters.streams import Source, binary_source, is_path, source_name
+
+try:
+    # 読み取り専用モードでブックを速く開くための openpyxl の内部API
+    # （動作を確認した版は requirements.txt の範囲。ない版では公開APIで読み込む）
+    from openpyxl.reader.excel import ExcelReader
+    from openpyxl.worksheet._read_only import ReadOnlyWorksheet
+    from openpyxl.worksheet._reader import DATA_TAG, DIMENSION_TAG
+    from openpyxl.worksheet.dimensions import SheetDimension
+    from openpyxl.xml.functions import iterparse
+except ImportError:
+    ExcelReader = ReadOnlyWorksheet = None
+
+
+# シートXMLのセル要素から列記号を取り出す
+_CELL_REF = re.compile(rb'<(?:\w+:)?c r="([A-Z]{1,3})[0-9]')
+SCAN_CHUNK_SIZE = 1024 * 1024
 
 
 class ExcelParser:
     """Excelファイルを読み込んで中間形式に変換"""
-    
-    def parse(self, file_path: Path) -> Document:
+
+    # フェーズの計測（FormatConverter が設定する）
+    profiler = NULL_PROFILER
+
+    def __init__(self, read_only: bool = True, data_only: bool = False, jobs: int = 1,
+                 columnar: bool = True, selection: Optional[SheetSelection] = None,
+                 cell_converters: Optional[Dict[type, CellConverter]] = None):
+        """
+        Args:
+            read_only: Trueの場合、読み取り専用（ストリーミング）モードで読み込む。
+                セルオブジェクトを全て生成しないため、大きなブックでもメモリ使用量がほぼ一定になる
+            data_only: Trueの場合、数式ではなく保存されている計算結果を読み込む
+            jobs: parse() でシートを並列に読み込むプロセス数
+            columnar: Trueの場合、parse() のテーブルを列形式（ColumnarTable）で保持する
+            selection: 読み込むシート・セル範囲・行数（Noneの場合は全て）。
+                読み取り専用モードでは選ばなかったシートのXMLは読まず、
+                範囲・行数の上限に達した時点でシートの読み込みを止める
+            cell_converters: セルの型ごとの変換（既定の converters.cells.DEFAULT_CONVERTERS に
+                追加・上書きする。例: {datetime.datetime: lambda v: v.strftime('%Y/%m/%d')}）
+        """
+        self.read_only = read_only
+        self.data_only = data_only
+        self.jobs = jobs
+        self.columnar = columnar
+        self.selection = selection or SheetSelection()
+        self.cell_converters = cell_converters
+        self.normalizer = RowNormalizer(cell_converters)
+
+    def parse(self, file_path: Source) -> Document:
         """
         Excelファイルを解析してDocumentオブジェクトに変換
-        
+
         Args:
-            file_path: Excelファイルのパス
-            
+            file_path: Excelファイルのパス、バイト列またはバイナリストリーム
+
         Returns:
             Document: 中間形式のドキュメント
         """
-        wb = openpyxl.load_workbook(file_path)
+        # ワーカープロセスはブックをパスから開くため、並列化はファイルの場合のみ
+        if self.jobs > 1 and is_path(file_path):
+            return self._parse_parallel(Path(file_path))
+
+        return self._build_document(self.iter_events(file_path),
+                                    Document(title=source_name(file_path)))
+
+    def _build_document(self, events, doc: Document) -> Document:
+        """イベントからDocumentを作成（テーブルは設定に応じて列形式で保持）"""
+        table_factory = ColumnarTable.from_rows if self.columnar else None
+        return build_document(events, doc, table_factory=table_factory)
+
+    def _parse_parallel(self, file_path: Path) -> Document:
+        """シートごとに別プロセスで読み込み、元の順番で結合"""
+        wb = self._load_workbook(file_path, read_only=True)
+        sheet_names = self.selection.select_sheets(wb.sheetnames)
+        wb.close()
+
         doc = Document(title=file_path.stem)
-        
-        for sheet_name in wb.sheetnames:
-            ws = wb[sheet_name]
-            sheet = Sheet(name=sheet_name)
-            
-            # シートからデータを抽出
-            data = []
-            for row in ws.iter_rows(values_only=True):
-                # 空行をスキップ
-                if all(cell is None or str(cell).strip() == '' for cell in row):
-                    continue
-                # None を空文字列に変換
-                data.append([str(cell) if cell is not None else '' for cell in row])
-            
-            if data:
-                # テーブルとして処理（1行目をヘッダー）
-                if len(data) > 1:
-                    headers = data[0]
-                    rows = data[1:]
-                    table = Table(headers=headers, rows=rows)
-                    content = Content(
-                        type=ContentType.TABLE,
-                        value=table,
-                        metadata={'source': 'excel'}
-                    )
-                    sheet.add_content(content)
-                elif len(data) == 1:
-                    # ヘッダーのみの場合
-                    table = Table(headers=data[0], rows=[])
-                    content = Content(
-                        type=ContentType.TABLE,
-                        value=table,
-                        metadata={'source': 'excel'}
-                    )
-                    sheet.add_content(content)
-            
-            doc.add_sheet(sheet)
-        
+        workers = min(self.jobs, len(sheet_names))
+        if workers <= 1:
+            return self._build_document(self.iter_events(file_path), doc)
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(file_path, self.read_only, self.data_only, self.columnar, self.selection,
+                      self.cell_converters)
+        ) as executor:
+            # map は投入順に結果を返すのでシートの順番は保たれる
+            for sheet in executor.map(_parse_sheet_worker, sheet_names):
+                doc.add_sheet(sheet)
+
         return doc
+
+    def iter_events(self, file_path: Source) -> Iterator[Event]:
+        """
+        Excelファイルを読み込みながらイベントを順に返す
+
+        テーブルの行は読み取り専用ワークシートから1行ずつ読み込まれる。
+
+        Args:
+            file_path: Excelファイルのパス、バイト列またはバイナリストリーム
+
+        Yields:
+            Event: シート開始・コンテンツ・シート終了のイベント
+        """
+        wb = self._load_workbook(file_path)
+        try:
+            # wb[名前] はシートを先頭から探すため、シート数が多い場合に備えて名前の辞書を作る
+            sheets = _sheets_by_name(wb)
+            for sheet_name in self.selection.select_sheets(wb.sheetnames):
+                yield from self._iter_sheet_events(sheets[sheet_name])
+        finally:
+            # 読み取り専用モードではファイルハンドルを開いたままなので閉じる
+            wb.close()
+
+    def _load_workbook(self, file_path: Source, read_only: Optional[bool] = None):
+        """設定に従ってブックを開く"""
+        if read_only is None:
+            read_only = self.read_only
+        with self.profiler.phase('parse.load_workbook'):
+            if read_only and _PRIVATE_READER:
+                wb = self._load_read_only(file_path)
+                if wb is not None:
+                    return wb
+            return openpyxl.load_workbook(
+                binary_source(file_path), read_only=read_only, data_only=self.data_only
+            )
+
+    def _load_read_only(self, file_path: Source):
+        """
+        内部APIを使う _ReadOnlyExcelReader でブックを開く
+
+        openpyxl の内部の属性が変わって開けない場合はNone（公開APIで開き直す）。
+        """
+        source = binary_source(file_path)
+        seekable = not is_path(source) and source.seekable()
+        position = source.tell() if seekable else None
+        try:
+            reader = _ReadOnlyExcelReader(source, read_only=True, data_only=self.data_only)
+            reader.read()
+            return reader.wb
+        except AttributeError:
+            if not is_path(source) and not seekable:
+                # 読み込んだ分を戻せないストリームは開き直せない
+                raise
+            if seekable:
+                source.seek(position)
+            return None
+
+    def _iter_sheet_events(self, ws) -> Iterator[Event]:
+        """ワークシート1枚分のイベントを返す"""
+        yield Event(EventType.SHEET_START, ws.title)
+
+        # テーブルとして処理（1行目をヘッダー）
+        rows = self._iter_rows(ws)
+        if self.selection.row_limit is not None:
+            # 上限に達したらシートの残りは読まない
+            rows = islice(rows, self.selection.row_limit)
+        headers = next(rows, None)
+        if headers is not None:
+            table = Table(headers=[str(value) for value in headers], rows=rows)
+            content = Content(
+                type=ContentType.TABLE,
+                value=table,
+                metadata={'source': 'excel'}
+            )
+            yield Event(EventType.CONTENT, content)
+
+        yield Event(EventType.SHEET_END)
+
+    def _parse_sheet(self, ws) -> Sheet:
+        """ワークシート1枚をSheetに変換"""
+        return self._build_document(self._iter_sheet_events(ws), Document()).sheets[0]
+
+    def _iter_rows(self, ws):
+        """空行を除いた行をリストとして1行ずつ返す（数値はそのまま、それ以外は文字列）"""
+        selection = self.selection
+        width = 0
+        if ws.max_column is None and selection.max_col is None:
+            # dimension情報のないファイル（書き込み専用モードで作成されたものなど）は
+            # 行ごとに幅が異なるため、最大列数まで埋めて全行の幅を揃える
+            # （列の範囲を指定した場合は openpyxl がその幅に揃える）
+            width = self._scan_max_column(ws)
+
+        rows = ws.iter_rows(min_row=selection.min_row, max_row=selection.max_row,
+                            min_col=selection.min_col, max_col=selection.max_col,
+                            values_only=True)
+        normalize = self.normalizer.normalize
+        for row in rows:
+            # 空行（None を返す）をスキップし、セルは型ごとに1回だけ変換する
+            values = normalize(row, width)
+            if values is not None:
+                yield values
+
+    def _scan_max_column(self, ws) -> int:
+        """シートXMLのセル参照（r属性）から最大列番号を求める（セルの値は解析しない）"""
+        if not hasattr(ws, '_get_source'):
+            # 内部APIがない場合は公開APIで全てのセルを読んで大きさを求める
+            ws.calculate_dimension(force=True)
+            return ws.max_column or 0
+
+        letters = set()
+        tail = b''
+        with ws._get_source() as src:
+            while True:
+                chunk = src.read(SCAN_CHUNK_SIZE)
+                if not chunk:
+                    break
+                # チャンク境界で分断された参照も拾えるよう前チャンクの末尾を重ねる
+                data = tail + chunk
+                letters.update(_CELL_REF.findall(data))
+                tail = data[-16:]
+
+        return max((column_index_from_string(col.decode('ascii')) for col in letters), default=0)
+
+
+def _private_reader_available() -> bool:
+    """_ReadOnlyExcelReader が使う openpyxl の内部APIがあるか"""
+    return (ExcelReader is not None
+            and all(hasattr(ExcelReader, name)
+                    for name in ('read', 'read_worksheets', 'read_chartsheet'))
+            and all(hasattr(ReadOnlyWorksheet, name) for name in ('_get_size', '_get_source')))
+
+
+_PRIVATE_READER = _private_reader_available()
+
+if _PRIVATE_READER:
+    class _ReadOnlyWorksheet(ReadOnlyWorksheet):
+        """
+        シートの大きさを <sheetData> の手前までで判定する読み取り専用ワークシート
+
+        openpyxl は <dimension> のないシート（書き込み専用モードで作成されたものなど）の
+        大きさを調べるとき、終了タグを待つため <sheetData> 全体を解析してしまう。
+        開始タグで判定し、ブックを開く時点ではシートの行を読まないようにする。
+        """
+
+        def _get_size(self):
+            with self._get_source() as src:
+                for _, element in iterparse(src, events=('start',)):
+                    if element.tag == DIMENSION_TAG:
+                        dimensions = SheetDimension.from_tree(element).boundaries
+                        if dimensions is not None:
+                            (self._min_column, self._min_row,
+                             self._max_column, self._max_row) = dimensions
+                        return
+                    if element.tag == DATA_TAG:
+                        # dimension情報なし
+                        return
+
+    class _ReadOnlyExcelReader(ExcelReader):
+        """読み取り専用モードでワークシートを _ReadOnlyWorksheet として開く"""
+
+        def read_worksheets(self):
+            for sheet, rel in self.parser.find_sheets():
+                if rel.target not in self.valid_files:
+                    continue
+
+                if 'chartsheet' in rel.Type:
+                    self.read_chartsheet(sheet, rel)
+                    continue
+
+                ws = _ReadOnlyWorksheet(self.wb, sheet.name, rel.target, self.shared_strings)
+                ws.sheet_state = sheet.state
+                self.wb._sheets.append(ws)
+
+
+def _sheets_by_name(wb) -> dict:
+    """シート名からワークシート（グラフシートを含む）への辞書"""
+    return {sheet.title: sheet for sheet in wb.worksheets + wb.chartsheets}
+
+
+# 並列読み込み用のワーカープロセスの状態（プロセスごとにブックを1回だけ開く）
+_worker_parser = None
+_worker_wb = None
+_worker_sheets = None
+
+
+def _init_worker(file_path: Path, read_only: bool, data_only: bool, columnar: bool,
+                 selection: SheetSelection, cell_converters: Optional[dict]):
+    """ワーカープロセスの初期化"""
+    global _worker_parser, _worker_wb, _worker_sheets
+    _worker_parser = ExcelParser(read_only=read_only, data_only=data_only, columnar=columnar,
+                                 selection=selection, cell_converters=cell_converters)
+    _worker_wb = _worker_parser._load_workbook(file_path)
+    _worker_sheets = _sheets_by_name(_worker_wb)
+
+
+def _parse_sheet_worker(sheet_name: str) -> Sheet:
+    """ワーカープロセスでシートを1枚読み込む"""
+    return _worker_parser._parse_sheet(_worker_sheets[sheet_name])
@@ -1,39 +1,267 @@
 """
 Markdown パーサー - Markdownファイルを中間形式に変換
 """
-from pathlib import Path
-from converters.base import Document, Sheet, Content, ContentType, Table
+import codecs
+import mmap
+import os
+import re
+from collections import deque
+from types import MappingProxyType
+from typing import Callable, Iterable, Iterator, List
+from converters.base import (
+    Document, Content, ContentType, Table, Event, EventType, EMPTY_CONTENT, build_document
+)
+from converters.streams import Source, is_path, open_text_source, source_name
+
+# テーブルのメタデータ（全てのテーブルで共有する）
+_TABLE_METADATA = MappingProxyType({'source': 'markdown'})
+
+
+class _LineReader:
+    """行を1行ずつ返し、読み過ぎた1行を戻せるイテレータ"""
+
+    def __init__(self, lines: Iterable[str]):
+        self._lines = iter(lines)
+        self._pushed = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if self._pushed is not None:
+            line, self._pushed = self._pushed, None
+            return line
+        return next(self._lines)
+
+    def push_back(self, line: str):
+        """次に返す行として戻す"""
+        self._pushed = line
+
+    def table_rows(self, split_cells: Callable[[str], List[str]]) -> Iterator[List[str]]:
+        """テーブルの2行目以降を返し、テーブル外の最初の行は読み戻す"""
+        for line in self:
+            stripped = line.strip()
+            if stripped.startswith('|') and '---' not in stripped:
+                yield split_cells(stripped)
+            elif '---' in stripped:
+                # 区切り行
+                continue
+            else:
+                self.push_back(line)
+                return
+
+
+# テーブルの行（先頭の空白の後が '|'）または区切り行（'---' を含む）が続く部分。
+# ここに含まれる行は全て MarkdownParser がテーブルの続きとして扱う行なので、まとめて分割できる
+# （Unicodeの空白で始まる行などは含まれないが、その行は1行ずつ判定する）
+_TABLE_RUN = re.compile(rb'(?:[ \t\x0b\x0c\x1c-\x1f]*\|[^\n]*\n|[^\n]*---[^\n]*\n)*')
+
+class _MappedLineReader(_LineReader):
+    """
+    メモリマップしたUTF-8のファイルから行を返す _LineReader
+
+    CHUNK_SIZE ずつまとめてデコードし、読み込み済みの行の後に続くテーブルの行は
+    table_rows() でバイト列のまま範囲を求めてまとめて分割する。
+    改行の扱いはテキストモードで開いた場合と同じ（\\r\\n は \\n）だが、
+    単独の \\r を改行として扱わないため、そのようなファイルには使わない（usable() で確認）。
+    """
+
+    # まとめてデコード・分割する最大のバイト数
+    # （分割した行のリストを一度に保持するため、大きすぎると却って遅くなる）
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, mm: mmap.mmap):
+        super().__init__(())
+        self._mm = mm
+        self._view = memoryview(mm)
+        self._size = len(mm)
+        self._pos = 0
+        self._lines = deque()
+        self._crlf = mm.find(b'\r') != -1
+        # str.split('\n') と同じく、末尾の改行の後（空のファイルを含む）に空行を1つ返す
+        self._final_line = self._size == 0 or mm[self._size - 1] == ord('\n')
+
+    @staticmethod
+    def usable(mm: mmap.mmap) -> bool:
+        """改行が \\n または \\r\\n だけのファイルか"""
+        return mm.find(b'\r') == -1 or re.search(rb'\r(?!\n)', mm) is None
+
+    def close(self):
+        """メモリマップを閉じられるようバッファの参照を解放"""
+        self._view.release()
+
+    def __next__(self) -> str:
+        if self._pushed is not None:
+            line, self._pushed = self._pushed, None
+            return line
+        if not self._lines:
+            self._read_block()
+            if not self._lines:
+                raise StopIteration
+        return self._lines.popleft()
+
+    def _read_block(self):
+        """CHUNK_SIZE 程度（行の途中では切らない）をデコードして行に分ける"""
+        pos = self._pos
+        if pos >= self._size:
+            if self._final_line:
+                self._final_line = False
+                self._lines.append('')
+            return
+
+        limit = pos + self.CHUNK_SIZE
+        if limit >= self._size:
+            end = self._size
+        else:
+            newline = self._mm.rfind(b'\n', pos, limit)
+            if newline == -1:
+                # CHUNK_SIZE より長い行
+                newline = self._mm.find(b'\n', limit)
+            end = self._size if newline == -1 else newline + 1
+
+        text = self._decode(pos, end)
+        self._pos = end
+        lines = text.split('\n')
+        if text.endswith('\n'):
+            lines.pop()
+        self._lines.extend(lines)
+
+    def _decode(self, start: int, end: int) -> str:
+        """ファイルの一部をコピーせずにデコード"""
+        with self._view[start:end] as view:
+            text = codecs.utf_8_decode(view, 'strict', True)[0]
+        return text.replace('\r\n', '\n') if self._crlf else text
+
+    def table_rows(self, split_cells: Callable[[str], List[str]]) -> Iterator[List[str]]:
+        """
+        テーブルの2行目以降を返し、テーブル外の最初の行は読み戻す
+
+        テーブルの行・区切り行が続く部分はバイト列のまま範囲を求め、
+        まとめてデコード・分割する。それ以外の行は1行ずつ判定する。
+        """
+        while True:
+            if self._pushed is None and not self._lines:
+                yield from self._scan_rows()
+
+            line = next(self, None)
+            if line is None:
+                return
+            stripped = line.strip()
+            if stripped.startswith('|') and '---' not in stripped:
+                yield split_cells(stripped)
+            elif '---' not in stripped:
+                self.push_back(line)
+                return
+
+    def _scan_rows(self) -> Iterator[List[str]]:
+        """現在の位置から続くテーブルの行を CHUNK_SIZE ずつまとめて分割"""
+        while self._pos < self._size:
+            start = self._pos
+            end = _TABLE_RUN.match(self._mm, start, min(start + self.CHUNK_SIZE, self._size)).end()
+            if end == start:
+                return
+            self._pos = end
+            # 区切り行以外は空白と '|' で始まるため、最初と最後の '|' の外側を除けば
+            # 行の strip() は不要（_split_cells と同じ結果）
+            lines = self._decode(start, end).split('\n')
+            lines.pop()
+            yield from [[cell.strip() for cell in line.split('|')[1:-1]]
+                        for line in lines if '---' not in line]
 
 
 class MarkdownParser:
     """Markdownファイルを読み込んで中間形式に変換"""
-    
-    def parse(self, file_path: Path) -> Document:
+
+    def __init__(self, content_store: bool = False, memory_map: bool = True):
+        """
+        Args:
+            content_store: Trueの場合、parse() のシートのコンテンツを ContentStore に格納する。
+                コンテンツごとのオブジェクトを保持しないため、行数の多いファイルでメモリ使用量を抑えられる
+            memory_map: Trueの場合、ファイルパスはメモリマップして読み込み、
+                テーブルの行をまとめて分割する（単独の \\r を改行に使うファイルは通常の読み込み）
+        """
+        self.content_store = content_store
+        self.memory_map = memory_map
+
+    def parse(self, file_path: Source) -> Document:
         """
         Markdownファイルを解析してDocumentオブジェクトに変換
-        
+
         Args:
-            file_path: Markdownファイルのパス
-            
+            file_path: Markdownファイルのパス、バイト列またはストリーム
+
         Returns:
             Document: 中間形式のドキュメント
         """
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        doc = Document(title=file_path.stem)
-        lines = content.split('\n')
-        
-        current_sheet = Sheet(name='Sheet1')
+        default_title = source_name(file_path)
+        doc = Document(title=default_title)
+
+        def events():
+            for event in self.iter_events(file_path):
+                # 見出し（#）- ドキュメントタイトル
+                if event.type == EventType.CONTENT and event.value.type == ContentType.TITLE:
+                    if not doc.title or doc.title == default_title:
+                        doc.title = event.value.value
+                yield event
+
+        return build_document(events(), doc, content_store=self.content_store)
+
+    def iter_events(self, file_path: Source) -> Iterator[Event]:
+        """
+        Markdownファイルを1行ずつ読み込みながらイベントを順に返す
+
+        ファイル全体は読み込まず、保持するのは処理中のブロック
+        （コードブロックの行）だけ。テーブルの行はイテレータとして返す。
+        内容のないシートはイベントを出力しない。
+
+        Args:
+            file_path: Markdownファイルのパス、バイト列（UTF-8）またはストリーム
+
+        Yields:
+            Event: シート開始・コンテンツ・シート終了のイベント
+        """
+        if self.memory_map and is_path(file_path) and os.path.getsize(file_path) > 0:
+            with open(file_path, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if _MappedLineReader.usable(mm):
+                    reader = _MappedLineReader(mm)
+                    try:
+                        yield from self._tokenize(reader)
+                    finally:
+                        reader.close()
+                    return
+
+        with open_text_source(file_path) as f:
+            yield from self._tokenize(_LineReader(self._iter_lines(f)))
+
+    def _iter_lines(self, f) -> Iterator[str]:
+        """改行を除いた行を返す（str.split('\n') と同じく末尾の改行の後に空行を1つ返す）"""
+        last = '\n'
+        for line in f:
+            last = line
+            yield line[:-1] if line.endswith('\n') else line
+        if last.endswith('\n'):
+            yield ''
+
+    def _tokenize(self, reader: _LineReader) -> Iterator[Event]:
+        """行を順に解析してイベントを返す"""
+        sheet_name = 'Sheet1'
+        sheet_started = False
         in_code_block = False
         code_lines = []
         code_lang = ''
-        
-        i = 0
-        while i < len(lines):
-            line = lines[i]
+
+        def emit(content):
+            """シート開始イベントは最初のコンテンツの直前に出力"""
+            nonlocal sheet_started
+            if not sheet_started:
+                sheet_started = True
+                yield Event(EventType.SHEET_START, sheet_name)
+            yield Event(EventType.CONTENT, content)
+
+        for line in reader:
             stripped = line.strip()
-            
+
             # コードブロックの開始/終了
             if stripped.startswith('```'):
                 if not in_code_block:
@@ -50,69 +278,47 @@ class MarkdownParser:
                         value=code_content,
                         metadata={'language': code_lang}
                     )
-                    current_sheet.add_content(content)
+                    yield from emit(content)
                     code_lines = []
                     code_lang = ''
-                i += 1
                 continue
-            
+
             # コードブロック内
             if in_code_block:
                 code_lines.append(line)
-                i += 1
                 continue
-            
+
             # シート名（##見出し）
             if stripped.startswith('##') and not stripped.startswith('###'):
-                # 前のシートを保存
-                if current_sheet.contents:
-                    doc.add_sheet(current_sheet)
-                
+                # 前のシートを終了
+                if sheet_started:
+                    yield Event(EventType.SHEET_END)
+
                 sheet_name = stripped.lstrip('#').strip()
-                current_sheet = Sheet(name=sheet_name)
-                i += 1
+                sheet_started = False
                 continue
-            
+
             # テーブル行
             if stripped.startswith('|'):
                 # 区切り行の場合
                 if '---' in stripped:
-                    i += 1
                     continue
-                
-                # テーブルヘッダーまたはデータ行
-                cells = [cell.strip() for cell in stripped.split('|')[1:-1]]
-                
-                # 次の行がテーブルかチェック
-                table_rows = [cells]
-                j = i + 1
-                while j < len(lines):
-                    next_line = lines[j].strip()
-                    if next_line.startswith('|') and '---' not in next_line:
-                        next_cells = [cell.strip() for cell in next_line.split('|')[1:-1]]
-                        table_rows.append(next_cells)
-                        j += 1
-                    elif '---' in next_line:
-                        j += 1
-                    else:
-                        break
-                
-                # テーブルを作成
-                if len(table_rows) > 1:
-                    table = Table(headers=table_rows[0], rows=table_rows[1:])
-                else:
-                    table = Table(headers=table_rows[0], rows=[])
-                
+
+                # 1行目をヘッダーとし、2行目以降は読み込みながら返す
+                rows = reader.table_rows(self._split_cells)
+                table = Table(headers=self._split_cells(stripped), rows=rows)
                 content = Content(
                     type=ContentType.TABLE,
                     value=table,
-                    metadata={'source': 'markdown'}
+                    metadata=_TABLE_METADATA
                 )
-                current_sheet.add_content(content)
-                
-                i = j
+                yield from emit(content)
+
+                # 読み切られなかった行を読み飛ばしてテーブルの後ろから再開
+                for _ in rows:
+                    pass
                 continue
-            
+
             # リスト
             if stripped.startswith('- ') or stripped.startswith('* '):
                 list_text = stripped[2:]
@@ -120,10 +326,9 @@ class MarkdownParser:
                     type=ContentType.LIST_ITEM,
                     value=list_text
                 )
-                current_sheet.add_content(content)
-                i += 1
+                yield from emit(content)
                 continue
-            
+
             # 番号付きリスト
             if stripped and stripped[0].isdigit() and '. ' in stripped[:4]:
                 list_text = stripped.split('. ', 1)[1] if '. ' in stripped else stripped
@@ -131,42 +336,34 @@ class MarkdownParser:
                     type=ContentType.NUMBERED_LIST,
                     value=list_text
                 )
-                current_sheet.add_content(content)
-                i += 1
+                yield from emit(content)
                 continue
-            
+
             # 見出し（#）- ドキュメントタイトル
             if stripped.startswith('#') and not stripped.startswith('##'):
                 title_text = stripped.lstrip('#').strip()
-                if not doc.title or doc.title == file_path.stem:
-                    doc.title = title_text
                 content = Content(
                     type=ContentType.TITLE,
                     value=title_text
                 )
-                current_sheet.add_content(content)
-                i += 1
+                yield from emit(content)
                 continue
-            
+
             # 通常のテキスト
             if stripped:
                 content = Content(
                     type=ContentType.TEXT,
                     value=stripped
                 )
-                current_sheet.add_content(content)
-            elif current_sheet.contents:
-                # 空行（内容がある場合のみ）
-                content = Content(
-                    type=ContentType.EMPTY,
-                    value=''
-                )
-                current_sheet.add_content(content)
-            
-            i += 1
-        
-        # 最後のシートを保存
-        if current_sheet.contents:
-            doc.add_sheet(current_sheet)
-        
-        return doc
+                yield from emit(content)
+            elif sheet_started:
+                # 空行（内容がある場合のみ、全ての空行で同じオブジェクトを使う）
+                yield from emit(EMPTY_CONTENT)
+
+        # 最後のシートを終了
+        if sheet_started:
+            yield Event(EventType.SHEET_END)
+
+    def _split_cells(self, stripped: str) -> List[str]:
+        """テーブル行をセルに分割"""
+        return [cell.strip() for cell in stripped.split('|')[1:-1]]
@@ -0,0 +1,189 @@
+"""
+pandas Excel パーサー - 表形式のシートをまとめて DataFrame に読み込む
+"""
+import importlib.util
+from typing import Callable, Iterator, List, Optional, Tuple
+import pandas as pd
+from converters.base import (
+    Document, Content, ContentType, ColumnarTable, Event, EventType, build_document
+)
+from converters.cells import RowNormalizer
+from converters.profiling import NULL_PROFILER
+from converters.selection import SheetSelection
+from converters.streams import Source, binary_source, source_name
+
+# calamine は数値を全て浮動小数点数で返すため、この範囲の整数値は int にする
+# （openpyxl が整数として読み込むセルと同じ型になる）
+_EXACT_INT_LIMIT = 2 ** 53
+
+# (シート名, シートの行を読み込む関数)
+SheetRows = Tuple[str, Callable[[], List[list]]]
+
+
+def default_engine() -> str:
+    """読み込みのエンジン（python-calamine があれば calamine、なければ openpyxl）"""
+    if importlib.util.find_spec('python_calamine') is not None:
+        return 'calamine'
+    return 'openpyxl'
+
+
+class PandasExcelParser:
+    """
+    シートを DataFrame にまとめて読み込んでExcelファイルを中間形式に変換
+
+    セルを1つずつ処理せず、シート全体を DataFrame として読み込んでから
+    列単位で ColumnarTable に変換する。全てのシートを表として扱う点は
+    ExcelParser と同じだが、数式セルは常に保存されている計算結果になる。
+
+    pandas.read_excel は同じ列の True/False と 1/0 を同じ値にまとめ、整数値の
+    浮動小数点数（1e+20 など）を int にするため使わない。エンジンが返したセルの値から
+    型を推測せずに DataFrame を作り、ExcelParser と同じ型のまま変換する。
+    """
+
+    # フェーズの計測（FormatConverter が設定する）
+    profiler = NULL_PROFILER
+
+    def __init__(self, engine: Optional[str] = None,
+                 selection: Optional[SheetSelection] = None):
+        """
+        Args:
+            engine: 読み込みのエンジン（'calamine' または 'openpyxl'、Noneの場合は自動選択）
+            selection: 読み込むシート・セル範囲・行数（Noneの場合は全て）。
+                選ばなかったシートは読み込まず、範囲外の行はエンジンから受け取らない
+
+        Raises:
+            ValueError: サポートされていないエンジンの場合
+        """
+        self.engine = engine or default_engine()
+        if self.engine not in ('calamine', 'openpyxl'):
+            raise ValueError(f'サポートされていないエンジンです: {self.engine}')
+        self.selection = selection or SheetSelection()
+        # 数値・文字列以外のセル（日付など）は ExcelParser と同じ変換表で変換する
+        self.normalizer = RowNormalizer()
+
+    def parse(self, file_path: Source) -> Document:
+        """
+        Excelファイルを解析してDocumentオブジェクトに変換
+
+        Args:
+            file_path: Excelファイルのパス、バイト列またはバイナリストリーム
+
+        Returns:
+            Document: 中間形式のドキュメント
+        """
+        return build_document(self.iter_events(file_path),
+                              Document(title=source_name(file_path)))
+
+    def iter_events(self, file_path: Source) -> Iterator[Event]:
+        """
+        Excelファイルをシート単位で読み込みながらイベントを順に返す
+
+        メモリに保持するのは処理中のシート1枚分のみ。
+
+        Args:
+            file_path: Excelファイルのパス、バイト列またはバイナリストリーム
+
+        Yields:
+            Event: シート開始・コンテンツ・シート終了のイベント
+        """
+        if self.engine == 'calamine':
+            sheets = self._iter_calamine_sheets(binary_source(file_path))
+        else:
+            sheets = self._iter_openpyxl_sheets(binary_source(file_path))
+
+        for sheet_name, read_rows in sheets:
+            yield Event(EventType.SHEET_START, sheet_name)
+
+            with self.profiler.phase('parse.read_excel'):
+                # object型のまま作り、セルの型を推測・変換させない
+                frame = pd.DataFrame(read_rows(), dtype=object)
+            with self.profiler.phase('parse.to_table'):
+                table = self._frame_to_table(frame)
+            if table is not None:
+                content = Content(
+                    type=ContentType.TABLE,
+                    value=table,
+                    metadata={'source': 'excel'}
+                )
+                yield Event(EventType.CONTENT, content)
+
+            yield Event(EventType.SHEET_END)
+
+    def _iter_openpyxl_sheets(self, source) -> Iterator[SheetRows]:
+        """openpyxl で選んだシートを読み込む（数式セルは保存されている計算結果）"""
+        import openpyxl
+
+        selection = self.selection
+        wb = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        try:
+            for sheet_name in selection.select_sheets(wb.sheetnames):
+                ws = wb[sheet_name]
+
+                def read_rows(ws=ws) -> List[list]:
+                    rows = ws.iter_rows(min_row=selection.min_row or 1,
+                                        max_row=selection.max_row, values_only=True)
+                    return [['' if value is None else value for value in row] for row in rows]
+
+                yield sheet_name, read_rows
+        finally:
+            wb.close()
+
+    def _iter_calamine_sheets(self, source) -> Iterator[SheetRows]:
+        """python-calamine で選んだシートを読み込む（空セルは '' になる）"""
+        from python_calamine import load_workbook
+
+        selection = self.selection
+        wb = load_workbook(source)
+        try:
+            for sheet_name in selection.select_sheets(wb.sheet_names):
+                sheet = wb.get_sheet_by_name(sheet_name)
+
+                def read_rows(sheet=sheet) -> List[list]:
+                    # 範囲の最終行までを読み、開始行より前の行は捨てる
+                    rows = sheet.to_python(skip_empty_area=False, nrows=selection.max_row)
+                    if selection.min_row is not None:
+                        rows = rows[selection.min_row - 1:]
+                    return [[_calamine_value(value) for value in row] for row in rows]
+
+                yield sheet_name, read_rows
+        finally:
+            close = getattr(wb, 'close', None)
+            if close is not None:
+                close()
+
+    def _frame_to_table(self, frame: pd.DataFrame) -> Optional[ColumnarTable]:
+        """DataFrameを表に変換（1行目をヘッダー、空行は除く。データがない場合はNone）"""
+        if self.selection.min_col is not None:
+            # ExcelParser と同じく、シートの列数が範囲より少ない場合も範囲の幅に揃える
+            frame = frame.reindex(
+                columns=range(self.selection.min_col - 1, self.selection.max_col), fill_value=''
+            )
+
+        # 空セルは読み込み時に '' にしている（行の長さが揃っていない分は None になる）
+        frame = frame.fillna('')
+        blank = frame.apply(lambda column: column.astype(str).str.strip().eq(''))
+        frame = frame[~blank.all(axis=1)]
+        if self.selection.row_limit is not None:
+            frame = frame.iloc[:self.selection.row_limit]
+        if frame.empty:
+            return None
+
+        headers = [str(value) for value in frame.iloc[0]]
+        body = frame.iloc[1:]
+        columns = [self._normalize_column(body[label]) for label in body.columns]
+        return ColumnarTable.from_columns(headers, columns)
+
+    def _normalize_column(self, column: pd.Series) -> list:
+        """列の値を ExcelParser と同じ型にする（数値はそのまま、それ以外は文字列）"""
+        kind = pd.api.types.infer_dtype(column, skipna=False)
+        if kind in ('string', 'integer', 'floating', 'mixed-integer-float', 'empty'):
+            return column.tolist()
+        convert = self.normalizer.convert
+        return [convert(value) for value in column.tolist()]
+
+
+def _calamine_value(value):
+    """calamine のセルの値を openpyxl で読み込んだ場合と同じ型にする（整数値の数値は int）"""
+    if type(value) is float and value.is_integer() and -_EXACT_INT_LIMIT < value < _EXACT_INT_LIMIT:
+        return int(value)
+    return value
@@ -19,12 +19,13 @@ setup(
     url='https://github.com/adreamer1074/fmtshift.git',
     
     # パッケージ構成
-    packages=find_packages(),  # converters, parsers, writers を自動検出
+    packages=find_packages(exclude=['bench']),  # converters, parsers, writers を自動検出
     py_modules=['fmtshift'],   # fmtshift.py
     
     # 依存パッケージ
     install_requires=[
-        'openpyxl>=3.1.2',
+        # 内部APIを使うため動作を確認した 3.1 系に固定（requirements.txt を参照）
+        'openpyxl>=3.1.2,<3.2',
         'pandas>=2.0.0',
     ],
     
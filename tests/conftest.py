@@ -0,0 +1,59 @@
+"""
+テスト共通のフィクスチャ・ヘルパー
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# リポジトリ直下のパッケージ（converters, parsers, writers）をインポートできるようにする
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# 往復変換で内容が変わらないMarkdown（テーブルだけのシートが複数）
+SAMPLE_MARKDOWN = """## Sales
+
+| id | name | price |
+| --- | --- | --- |
+| 1 | apple | 1.5 |
+| 2 | 日本語 | 3 |
+
+## Other
+
+| a | b |
+| --- | --- |
+| x | y |
+| | z |
+"""
+
+
+@pytest.fixture
+def sample_md(tmp_path) -> Path:
+    path = tmp_path / 'sample.md'
+    path.write_text(SAMPLE_MARKDOWN, encoding='utf-8')
+    return path
+
+
+def table_values(document):
+    """Documentのテーブルを (シート名, ヘッダー, 行) のリストにする（セルは文字列にそろえる）"""
+    from converters.base import ContentType
+    result = []
+    for sheet in document.sheets:
+        for content in sheet.contents:
+            if content.type == ContentType.TABLE:
+                table = content.value
+                rows = [[str(value) for value in row] for row in table.rows]
+                result.append((sheet.name, list(table.headers), rows))
+    return result
+
+
+def xlsx_values(path):
+    """Excelファイルのシートごとのセルの値"""
+    import openpyxl
+    wb = openpyxl.load_workbook(path, read_only=True)
+    try:
+        return [(ws.title, [list(row) for row in ws.iter_rows(values_only=True)])
+                for ws in wb.worksheets]
+    finally:
+        wb.close()
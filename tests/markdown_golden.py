@@ -0,0 +1,67 @@
+"""
+Markdownパーサーの回帰テスト用の期待値（tests/data/markdown/*.jsonl）を作成
+
+期待値は行単位の解析に書き換える前のパーサー（baseline のコミット）の出力から作る。
+test_markdown_corpus.py は現在のパーサーの出力をこの期待値と比較する。
+
+    git worktree add /tmp/fmtshift-baseline <baselineのコミット>
+    python tests/markdown_golden.py --root /tmp/fmtshift-baseline
+
+--root を省略した場合は現在のツリーのパーサーで作る（出力を意図して変えた場合のみ）。
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List
+
+DATA_DIR = Path(__file__).resolve().parent / 'data' / 'markdown'
+
+
+def document_lines(document) -> List[dict]:
+    """
+    Documentを比較用のJSONにできる値の行に変換
+
+    1行目はドキュメント、続いてシートごとにシート名の行とコンテンツ1件ずつの行になる
+    （差分を行単位で読めるようにするため）。
+    テーブルはクラス（Table・ColumnarTable）によらずヘッダーと行のリストにする。
+    """
+    lines = [{'title': document.title, 'metadata': dict(document.metadata)}]
+    for sheet in document.sheets:
+        lines.append({'sheet': sheet.name})
+        lines.extend(_content_data(content) for content in sheet.contents)
+    return lines
+
+
+def _content_data(content) -> dict:
+    value = content.value
+    if content.type.value == 'table':
+        value = {'headers': list(value.headers), 'rows': [list(row) for row in value.rows]}
+    return {'type': content.type.value, 'value': value, 'metadata': dict(content.metadata)}
+
+
+def golden_path(source: Path) -> Path:
+    return source.with_suffix('.jsonl')
+
+
+def dump_lines(lines: List[dict]) -> str:
+    return ''.join(json.dumps(line, ensure_ascii=False) + '\n' for line in lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Markdownパーサーの期待値を作成')
+    parser.add_argument('--root', type=Path, default=Path(__file__).resolve().parent.parent,
+                        help='期待値の作成に使うパーサーのツリー')
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(args.root.resolve()))
+    from parsers.markdown_parser import MarkdownParser
+
+    for source in sorted(DATA_DIR.glob('*.md')):
+        lines = document_lines(MarkdownParser().parse(source))
+        golden_path(source).write_text(dump_lines(lines), encoding='utf-8')
+        print(f'{source.name}: {len(lines)} lines')
+
+
+if __name__ == '__main__':
+    main()
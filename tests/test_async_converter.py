@@ -0,0 +1,50 @@
+"""
+AsyncFormatConverter のファイルの変換とワーカーの FormatConverter の保持
+"""
+import asyncio
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from converters import async_converter
+from converters.async_converter import AsyncFormatConverter
+
+
+def test_convert_file_does_file_io_outside_event_loop(sample_md, tmp_path, monkeypatch):
+    threads = []
+    mkdtemp = tempfile.mkdtemp
+
+    def recording_mkdtemp(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return mkdtemp(*args, **kwargs)
+
+    monkeypatch.setattr(tempfile, 'mkdtemp', recording_mkdtemp)
+    target = tmp_path / 'new' / 'dir' / 'out.xlsx'
+
+    async def run():
+        async with AsyncFormatConverter(max_concurrency=1) as converter:
+            await converter.convert(sample_md, target)
+            return threading.current_thread()
+
+    loop_thread = asyncio.run(run())
+    assert threads and loop_thread not in threads
+    assert target.exists()
+    # 一時ディレクトリは残らない
+    assert [path.name for path in target.parent.iterdir()] == ['out.xlsx']
+
+
+def test_worker_converters_are_bounded_per_thread(sample_md, tmp_path):
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    async def run():
+        for index in range(async_converter.MAX_WORKER_CONVERTERS + 3):
+            converter = AsyncFormatConverter(executor=executor)
+            await converter.convert(sample_md, tmp_path / f'out{index}.xlsx')
+            await converter.close()
+
+    try:
+        asyncio.run(run())
+        count = executor.submit(lambda: len(async_converter._local.converters)).result()
+    finally:
+        executor.shutdown()
+    assert count == async_converter.MAX_WORKER_CONVERTERS
@@ -0,0 +1,67 @@
+"""
+バッチ変換の変換元の一覧（ディレクトリ・glob・マニフェスト）と変換
+"""
+import pytest
+
+from converters.batch import collect_sources, convert_batch
+
+EXTENSIONS = ['.md', '.xlsx', '.csv']
+
+
+@pytest.fixture
+def sources(tmp_path):
+    for name in ['a.md', 'b#1.md', 'c.xlsx', 'notes.txt', 'data.json']:
+        (tmp_path / name).write_bytes(b'')
+    return tmp_path
+
+
+def test_directory_collects_supported_files(sources):
+    assert [p.name for p in collect_sources(str(sources), EXTENSIONS)] == [
+        'a.md', 'b#1.md', 'c.xlsx']
+
+
+def test_glob_collects_supported_files(sources):
+    assert [p.name for p in collect_sources(str(sources / '*.md'), EXTENSIONS)] == [
+        'a.md', 'b#1.md']
+
+
+def test_source_file_is_returned_as_is(sources):
+    assert collect_sources(str(sources / 'a.md'), EXTENSIONS) == [sources / 'a.md']
+
+
+@pytest.mark.parametrize('name', ['files.txt', 'files.lst'])
+def test_manifest(sources, tmp_path, name):
+    manifest = tmp_path / name
+    absolute = sources / 'c.xlsx'
+    manifest.write_text(
+        '# 変換するファイル\n'
+        'a.md\n'
+        '\n'
+        '  b#1.md  \n'
+        '   # 字下げしたコメント\n'
+        f'{absolute}\n',
+        encoding='utf-8')
+    assert collect_sources(str(manifest), EXTENSIONS) == [
+        sources / 'a.md', sources / 'b#1.md', absolute]
+
+
+def test_unsupported_extension_is_not_read_as_manifest(sources):
+    with pytest.raises(ValueError, match='マニフェスト'):
+        collect_sources(str(sources / 'data.json'), EXTENSIONS)
+
+
+def test_missing_spec(tmp_path):
+    with pytest.raises(ValueError):
+        collect_sources(str(tmp_path / 'missing'), EXTENSIONS)
+
+
+def test_convert_batch_reports_each_file(sample_md, tmp_path):
+    broken = tmp_path / 'broken.xlsx'
+    broken.write_bytes(b'not a workbook')
+    out_dir = tmp_path / 'out'
+
+    result = convert_batch([sample_md, broken], '.xlsx', out_dir)
+
+    assert result.succeeded == [(sample_md, out_dir / 'sample.xlsx')]
+    assert [source for source, _ in result.failed] == [broken]
+    assert (out_dir / 'sample.xlsx').exists()
@@ -0,0 +1,203 @@
+"""
+変換結果のキャッシュ（ConversionCache）
+"""
+import os
+import sys
+
+import pytest
+
+from converters.cache import ConversionCache
+from converters.converter import FormatConverter
+from converters.profiling import Profiler
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return tmp_path / 'cache'
+
+
+def _entry_count(cache_dir):
+    return len([p for p in cache_dir.iterdir() if not p.name.startswith('.')])
+
+
+def test_miss_then_hit(sample_md, tmp_path, cache_dir):
+    profiler = Profiler()
+    converter = FormatConverter(cache=ConversionCache(cache_dir, version='test'),
+                                profiler=profiler)
+    first, second = tmp_path / 'first.xlsx', tmp_path / 'second.xlsx'
+
+    converter.convert(sample_md, first)
+    assert profiler.counters['cache_hits'] == 0
+    assert _entry_count(cache_dir) == 1
+
+    converter.convert(sample_md, second)
+    assert profiler.counters['cache_hits'] == 1
+    assert second.read_bytes() == first.read_bytes()
+
+
+def test_changed_source_misses(sample_md, tmp_path, cache_dir):
+    cache = ConversionCache(cache_dir, version='test')
+    key = cache.key(sample_md, '.md')
+    sample_md.write_text(sample_md.read_text(encoding='utf-8') + 'more\n', encoding='utf-8')
+
+    assert cache.key(sample_md, '.md') != key
+    assert not cache.get(key, tmp_path / 'out.md')
+
+
+def test_version_is_part_of_key(sample_md, cache_dir):
+    assert (ConversionCache(cache_dir, version='1').key(sample_md, '.md')
+            != ConversionCache(cache_dir, version='2').key(sample_md, '.md'))
+
+
+def _put(cache, tmp_path, key, size):
+    output = tmp_path / 'output.md'
+    output.write_bytes(b'x' * size)
+    cache.put(key, output)
+
+
+def test_eviction_removes_least_recently_used(tmp_path, cache_dir):
+    cache = ConversionCache(cache_dir, version='test', max_size=250)
+    keys = [f'{index:064x}' for index in range(3)]
+    _put(cache, tmp_path, keys[0], 100)
+    _put(cache, tmp_path, keys[1], 100)
+    # keys[0] を使うと最も長く使われていないのは keys[1] になる
+    old = os.stat(cache_dir / f'{keys[1]}.md').st_mtime - 10
+    os.utime(cache_dir / f'{keys[1]}.md', (old, old))
+    _put(cache, tmp_path, keys[2], 100)
+
+    assert (cache_dir / f'{keys[0]}.md').exists()
+    assert not (cache_dir / f'{keys[1]}.md').exists()
+    assert (cache_dir / f'{keys[2]}.md').exists()
+
+
+def test_eviction_keeps_other_files(tmp_path, cache_dir):
+    cache_dir.mkdir()
+    notes = cache_dir / 'notes.txt'
+    notes.write_bytes(b'n' * 1000)
+    cache = ConversionCache(cache_dir, version='test', max_size=0)
+
+    _put(cache, tmp_path, 'a' * 64, 10)
+    cache.clear()
+
+    assert notes.read_bytes() == b'n' * 1000
+    assert _entry_count(cache_dir) == 1
+
+
+def test_replacing_entry_does_not_grow_total_size(tmp_path, cache_dir):
+    cache = ConversionCache(cache_dir, version='test', max_size=150)
+    _put(cache, tmp_path, 'a' * 64, 100)
+    for _ in range(5):
+        _put(cache, tmp_path, 'a' * 64, 100)
+
+    assert cache._total_size == 100
+    assert (cache_dir / f'{"a" * 64}.md').exists()
+
+
+def test_cli_does_not_cache_by_default(sample_md, tmp_path, monkeypatch):
+    import fmtshift
+    monkeypatch.setenv('FMTSHIFT_CACHE_DIR', str(tmp_path / 'default-cache'))
+
+    monkeypatch.setattr(sys, 'argv', ['fmtshift', '-f', str(sample_md),
+                                      '-t', str(tmp_path / 'out.xlsx')])
+    fmtshift.main()
+    assert not (tmp_path / 'default-cache').exists()
+
+    monkeypatch.setattr(sys, 'argv', ['fmtshift', '-f', str(sample_md),
+                                      '-t', str(tmp_path / 'out.xlsx'), '--cache'])
+    fmtshift.main()
+    assert _entry_count(tmp_path / 'default-cache') == 1
+
+
+def _document_cache(cache_dir, **options):
+    from converters.cache import DocumentCache
+    return DocumentCache(cache_dir=cache_dir, version='test', **options)
+
+
+def _json_entries(cache_dir):
+    return sorted((cache_dir / 'documents').glob('*.json'))
+
+
+@pytest.mark.parametrize('content_store', [False, True])
+def test_document_cache_round_trips_markdown_through_disk(sample_md, cache_dir, content_store):
+    from converters.base import ContentStore
+    from parsers.markdown_parser import MarkdownParser
+
+    document = MarkdownParser(content_store=content_store).parse(sample_md)
+    key = _document_cache(cache_dir).key(sample_md)
+    _document_cache(cache_dir).put(key, document)
+
+    # 別のインスタンス（別のプロセス）ではディスクから読み込む
+    loaded = _document_cache(cache_dir).get(key)
+    assert loaded is not None and loaded is not document
+    assert loaded.title == document.title
+    assert [(s.name, list(s.contents)) for s in loaded.sheets] == [
+        (s.name, list(s.contents)) for s in document.sheets]
+    assert all(isinstance(s.contents, ContentStore) == content_store for s in loaded.sheets)
+
+
+def test_document_cache_keeps_columnar_numbers(tmp_path, cache_dir):
+    from array import array
+    import openpyxl
+    from parsers.excel_parser import ExcelParser
+
+    source = tmp_path / 'numbers.xlsx'
+    wb = openpyxl.Workbook()
+    wb.active.append(['id', 'price', 'name'])
+    wb.active.append([1, 1.5, 'apple'])
+    wb.active.append([2, 3.25, 'x'])
+    wb.save(source)
+
+    document = ExcelParser().parse(source)
+    key = _document_cache(cache_dir).key(source)
+    _document_cache(cache_dir).put(key, document)
+    table = _document_cache(cache_dir).get(key).sheets[0].contents[0].value
+
+    original = document.sheets[0].contents[0].value
+    assert [type(column) for column in table.columns] == [type(c) for c in original.columns]
+    assert isinstance(table.columns[0], array) and table.columns[0].typecode == 'q'
+    assert list(table.columns[0]) == [1, 2]
+    assert table.columns[1].typecode == 'd' and list(table.columns[1]) == [1.5, 3.25]
+    assert table.columns[2] == ['apple', 'x']
+
+
+def test_document_cache_discards_broken_entries(sample_md, cache_dir):
+    from parsers.markdown_parser import MarkdownParser
+
+    cache = _document_cache(cache_dir)
+    key = cache.key(sample_md)
+    cache.put(key, MarkdownParser().parse(sample_md))
+    [entry] = _json_entries(cache_dir)
+
+    # pickleなど、JSONとして読めない内容は実行せずに捨てる
+    entry.write_bytes(b'\x80\x04\x95 not json')
+    assert _document_cache(cache_dir).get(key) is None
+    assert not entry.exists()
+
+
+def test_document_cache_skips_values_it_cannot_store(cache_dir, tmp_path):
+    from converters.base import Content, ContentType, Document, Sheet
+
+    source = tmp_path / 'src.md'
+    source.write_text('x', encoding='utf-8')
+    sheet = Sheet('S')
+    sheet.add_content(Content(ContentType.TEXT, object()))
+    cache = _document_cache(cache_dir)
+    key = cache.key(source)
+
+    cache.put(key, Document(sheets=[sheet]))
+    assert not (cache_dir / 'documents').exists() or _json_entries(cache_dir) == []
+    assert cache.get(key) is not None  # プロセス内には保持する
+
+
+def test_document_and_conversion_caches_share_a_directory(sample_md, tmp_path, cache_dir):
+    from parsers.markdown_parser import MarkdownParser
+
+    documents = _document_cache(cache_dir)
+    documents.put(documents.key(sample_md), MarkdownParser().parse(sample_md))
+    conversions = ConversionCache(cache_dir, version='test', max_size=0)
+    _put(conversions, tmp_path, 'b' * 64, 10)
+
+    # 変換結果のキャッシュの削除は Document のエントリに触れない
+    assert len(_json_entries(cache_dir)) == 1
+    if sys.platform != 'win32':
+        assert (cache_dir / 'documents').stat().st_mode & 0o777 == 0o700
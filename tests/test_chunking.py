@@ -0,0 +1,85 @@
+"""
+行数の多いシートの続きのシートへの分割
+"""
+import pytest
+
+from converters.base import Content, ContentType, Event, EventType, Table
+from converters.chunking import SheetPart, split_sheets
+
+
+def _sheet_events(name, contents):
+    yield Event(EventType.SHEET_START, name)
+    for content in contents:
+        yield Event(EventType.CONTENT, content)
+    yield Event(EventType.SHEET_END)
+
+
+def _parts(events):
+    """シートごとの (名前, [(種類, 値)]) のリスト"""
+    parts = []
+    for event in events:
+        if event.type == EventType.SHEET_START:
+            parts.append((event.value, []))
+        elif event.type == EventType.CONTENT:
+            value = event.value.value
+            if event.value.type == ContentType.TABLE:
+                value = (list(value.headers), [list(row) for row in value.rows])
+            parts[-1][1].append((event.value.type, value))
+    return parts
+
+
+def test_table_is_split_with_repeated_header():
+    table = Table(headers=['h'], rows=[[str(i)] for i in range(5)])
+    events = _sheet_events('Data', [Content(ContentType.TABLE, table)])
+
+    assert _parts(split_sheets(events, 3)) == [
+        ('Data', [(ContentType.TABLE, (['h'], [['0'], ['1']]))]),
+        (SheetPart('Data', 2), [(ContentType.TABLE, (['h'], [['2'], ['3']]))]),
+        (SheetPart('Data', 3), [(ContentType.TABLE, (['h'], [['4']]))]),
+    ]
+
+
+def test_code_block_that_fits_moves_to_next_sheet():
+    code = Content(ContentType.CODE_BLOCK, 'a\nb', {'language': 'py'})
+    events = _sheet_events('Data', [Content(ContentType.TEXT, 'x'), code])
+
+    assert _parts(split_sheets(events, 2)) == [
+        ('Data', [(ContentType.TEXT, 'x')]),
+        (SheetPart('Data', 2), [(ContentType.CODE_BLOCK, 'a\nb')]),
+    ]
+
+
+def test_oversized_code_block_is_split_by_lines():
+    code = Content(ContentType.CODE_BLOCK, '\n'.join(str(i) for i in range(7)),
+                   {'language': 'py'})
+    events = list(split_sheets(_sheet_events('Data', [Content(ContentType.TEXT, 'x'), code]), 3))
+
+    assert _parts(events) == [
+        ('Data', [(ContentType.TEXT, 'x'), (ContentType.CODE_BLOCK, '0\n1')]),
+        (SheetPart('Data', 2), [(ContentType.CODE_BLOCK, '2\n3\n4')]),
+        (SheetPart('Data', 3), [(ContentType.CODE_BLOCK, '5\n6')]),
+    ]
+    # 分けたコードブロックは元の言語を引き継ぐ
+    assert all(event.value.metadata == {'language': 'py'} for event in events
+               if event.type == EventType.CONTENT and event.value.type == ContentType.CODE_BLOCK)
+
+
+def test_oversized_other_content_raises():
+    events = _sheet_events('Data', [Content(ContentType.TEXT, 'long')])
+    with pytest.raises(ValueError, match='最大行数'):
+        list(split_sheets(events, 2, row_count=lambda content: 10))
+
+
+def test_excel_sheets_stay_within_max_rows_for_long_code_block(tmp_path):
+    import openpyxl
+    from converters.converter import FormatConverter
+
+    source = tmp_path / 'code.md'
+    source.write_text('```\n' + '\n'.join(f'line {i}' for i in range(25)) + '\n```\n',
+                      encoding='utf-8')
+    target = tmp_path / 'code.xlsx'
+    FormatConverter(max_sheet_rows=10).convert(source, target)
+
+    wb = openpyxl.load_workbook(target)
+    assert [ws.max_row for ws in wb.worksheets] == [10, 10, 5]
+    assert [ws.cell(1, 1).value for ws in wb.worksheets] == ['line 0', 'line 10', 'line 20']
@@ -0,0 +1,120 @@
+"""
+FormatConverter の変換方法の選択（ストリーミング・Document経由）
+"""
+import pytest
+
+from converters.converter import FormatConverter
+from writers.excel_writer import ExcelWriter
+from writers.markdown_writer import MarkdownWriter
+
+
+def _fail_document_write(self, document, file_path):
+    raise AssertionError('ストリーミングで変換するはずが write() が呼ばれた')
+
+
+@pytest.mark.parametrize('to_name, writer_class', [
+    ('out.md', MarkdownWriter),
+    ('out.xlsx', ExcelWriter),
+])
+def test_jobs_keep_streaming_when_parser_is_not_parallel(sample_md, tmp_path, monkeypatch,
+                                                         to_name, writer_class):
+    # Markdownの読み込みは並列化しないため、jobs を指定してもDocumentを経由しない
+    expected = tmp_path / f'serial_{to_name}'
+    FormatConverter().convert(sample_md, expected)
+
+    monkeypatch.setattr(writer_class, 'write', _fail_document_write)
+    FormatConverter(jobs=2).convert(sample_md, tmp_path / to_name)
+    if to_name.endswith('.md'):
+        assert (tmp_path / to_name).read_bytes() == expected.read_bytes()
+
+
+def test_parallel_excel_parse_matches_serial(sample_md, tmp_path):
+    xlsx = tmp_path / 'sample.xlsx'
+    FormatConverter().convert(sample_md, xlsx)
+
+    serial, parallel = tmp_path / 'serial.md', tmp_path / 'parallel.md'
+    FormatConverter().convert(xlsx, serial)
+    FormatConverter(jobs=2).convert(xlsx, parallel)
+    assert parallel.read_bytes() == serial.read_bytes()
+
+
+class _RecordingWriter:
+    """テーブルのセルの型を記録する拡張のライター"""
+
+    def __init__(self, streaming: bool):
+        self.cells = []
+        if streaming:
+            self.write_events = self._write_events
+
+    def write(self, document, file_path):
+        for sheet in document.sheets:
+            self._record(sheet.contents)
+
+    def _write_events(self, events, file_path):
+        from converters.base import EventType
+        self._record(event.value for event in events if event.type == EventType.CONTENT)
+
+    def _record(self, contents):
+        from converters.base import ContentType
+        for content in contents:
+            if content.type == ContentType.TABLE:
+                self.cells.append((list(content.value.headers),
+                                   [list(row) for row in content.value.rows]))
+
+
+@pytest.mark.parametrize('engine', ['openpyxl', 'pandas'])
+def test_writers_get_same_cell_types_from_both_paths(tmp_path, engine):
+    import openpyxl
+    if engine == 'pandas':
+        pytest.importorskip('pandas')
+    source = tmp_path / 'numbers.xlsx'
+    wb = openpyxl.Workbook()
+    wb.active.append(['id', 'price', 'name'])
+    wb.active.append([1, 1.5, 'apple'])
+    wb.active.append([2, 3.25, '2'])
+    wb.save(source)
+
+    results = []
+    for streaming in (True, False):
+        converter = FormatConverter(engine=engine)
+        writer = _RecordingWriter(streaming)
+        converter.add_writer('.rec', writer)
+        converter.convert(source, tmp_path / 'out.rec')
+        results.append(writer.cells)
+
+    expected = [(['id', 'price', 'name'], [[1, 1.5, 'apple'], [2, 3.25, '2']])]
+    assert results[0] == results[1] == expected
+    for cells in results:
+        _, rows = cells[0]
+        assert [[type(value) for value in row] for row in rows] == [[int, float, str]] * 2
+
+
+def _engine_rows(source, tmp_path, engine):
+    converter = FormatConverter(engine=engine)
+    writer = _RecordingWriter(streaming=False)
+    converter.add_writer('.rec', writer)
+    converter.convert(source, tmp_path / 'out.rec')
+    return writer.cells[0]
+
+
+@pytest.mark.parametrize('column, expected', [
+    # 同じ列の True/False と 1/0 を同じ値にまとめない
+    ([True, 1, 1, False, 0], ['True', 1, 1, 'False', 0]),
+    # 大きな整数値の浮動小数点数を int にしない（"3" と保存されるセルは既定でも int）
+    ([1e20, 2.5, 3.0], [1e20, 2.5, 3]),
+])
+def test_pandas_engine_keeps_cell_types(tmp_path, column, expected):
+    import openpyxl
+    pytest.importorskip('pandas')
+    source = tmp_path / 'types.xlsx'
+    wb = openpyxl.Workbook()
+    wb.active.append(['value', 'name'])
+    for index, value in enumerate(column):
+        wb.active.append([value, f'row{index}'])
+    wb.save(source)
+
+    default = _engine_rows(source, tmp_path, 'openpyxl')
+    pandas_rows = _engine_rows(source, tmp_path, 'pandas')
+    assert pandas_rows == default
+    assert [row[0] for row in pandas_rows[1]] == expected
+    assert [type(row[0]) for row in pandas_rows[1]] == [type(value) for value in expected]
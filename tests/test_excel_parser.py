@@ -0,0 +1,74 @@
+"""
+ExcelParser の読み取り専用モード（openpyxl の内部APIを使う読み込みと公開APIの読み込み）
+"""
+import io
+
+import openpyxl
+import pytest
+
+import parsers.excel_parser as excel_parser
+from conftest import table_values
+from parsers.excel_parser import ExcelParser
+
+
+@pytest.fixture
+def unsized_xlsx(tmp_path):
+    """dimension情報がなく、行ごとに幅の異なるブック（書き込み専用モードで作成）"""
+    path = tmp_path / 'unsized.xlsx'
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet('Data')
+    ws.append(['a', 'b'])
+    ws.append([1, 2, 3])
+    ws.append(['x'])
+    wb.create_sheet('Other').append(['h'])
+    wb.save(path)
+    return path
+
+
+def _parse(path):
+    return table_values(ExcelParser().parse(path))
+
+
+def test_private_reader_is_used_with_tested_openpyxl():
+    assert excel_parser._PRIVATE_READER
+
+
+def test_public_reader_gives_same_result(unsized_xlsx, monkeypatch):
+    expected = _parse(unsized_xlsx)
+    assert expected == [('Data', ['a', 'b', ''], [['1', '2', '3'], ['x', '', '']]),
+                        ('Other', ['h'], [])]
+
+    monkeypatch.setattr(excel_parser, '_PRIVATE_READER', False)
+    assert _parse(unsized_xlsx) == expected
+
+
+@pytest.mark.parametrize('as_stream', [False, True], ids=['path', 'stream'])
+def test_falls_back_when_private_attributes_are_missing(unsized_xlsx, monkeypatch, as_stream):
+    expected = _parse(unsized_xlsx)
+
+    def read_worksheets(self):
+        raise AttributeError("'Workbook' object has no attribute '_sheets'")
+
+    monkeypatch.setattr(excel_parser._ReadOnlyExcelReader, 'read_worksheets', read_worksheets)
+    source = io.BytesIO(unsized_xlsx.read_bytes()) if as_stream else unsized_xlsx
+    assert table_values(ExcelParser().parse(source)) == expected
+
+
+def test_scan_max_column_without_private_source(unsized_xlsx):
+    wb = openpyxl.load_workbook(unsized_xlsx, read_only=True)
+    try:
+        ws = wb['Data']
+
+        class PublicOnly:
+            # _get_source のない読み取り専用ワークシート
+            def __getattr__(self, name):
+                if name == '_get_source':
+                    raise AttributeError(name)
+                return getattr(ws, name)
+
+            def calculate_dimension(self, force=False):
+                return ws.calculate_dimension(force=force)
+
+        assert ExcelParser()._scan_max_column(PublicOnly()) == 3
+    finally:
+        wb.close()
@@ -0,0 +1,72 @@
+"""
+ExcelWriter の書き込み（列幅・Document経由とストリーミングの一致）
+"""
+import openpyxl
+import pytest
+
+from converters.base import Content, ContentType, Document, Sheet, Table, document_events
+from writers.excel_writer import ExcelWriter
+
+
+def _document(rows):
+    sheet = Sheet('Data')
+    sheet.add_content(Content(ContentType.TABLE, Table(headers=['a', 'b'], rows=rows)))
+    return Document(sheets=[sheet])
+
+
+def _widths(path):
+    wb = openpyxl.load_workbook(path)
+    dimensions = wb['Data'].column_dimensions
+    return [dimensions[letter].width for letter in 'AB']
+
+
+def test_write_uses_bounded_width_sample(tmp_path):
+    # 列幅は先頭の width_sample_rows 行だけから求め、Documentの行も全ては保留しない
+    rows = [['x', 'y']] * 5 + [['x' * 50, 'y']]
+    target = tmp_path / 'out.xlsx'
+    ExcelWriter(width_sample_rows=3).write(_document(rows), target)
+
+    assert _widths(target) == [3, 3]
+    wb = openpyxl.load_workbook(target, read_only=True)
+    assert [list(row) for row in wb['Data'].iter_rows(values_only=True)] == [['a', 'b']] + rows
+
+
+def test_write_matches_write_events(tmp_path):
+    rows = [[f'value{i}', str(i)] for i in range(ExcelWriter.STREAM_WIDTH_SAMPLE_ROWS + 10)]
+    rows.append(['x' * 60, 'y'])
+    document = _document(rows)
+    written, streamed = tmp_path / 'written.xlsx', tmp_path / 'streamed.xlsx'
+    ExcelWriter().write(document, written)
+    ExcelWriter().write_events(document_events(document), streamed)
+
+    assert _widths(written) == _widths(streamed)
+
+
+def _styled_document():
+    sheet = Sheet('Data')
+    sheet.add_content(Content(ContentType.TITLE, 'Title'))
+    sheet.add_content(Content(ContentType.CODE_BLOCK, 'print(1)\nprint(2)'))
+    sheet.add_content(Content(ContentType.TABLE, Table(headers=['a', 'b'], rows=[['1', '2']])))
+    return Document(sheets=[sheet])
+
+
+def _fonts(path):
+    wb = openpyxl.load_workbook(path)
+    return [[(cell.value, cell.font.name, cell.font.size, cell.font.bold) for cell in row]
+            for row in wb['Data'].iter_rows()]
+
+
+@pytest.mark.parametrize('write_only', [True, False])
+def test_styles_without_private_api_match_shared_styles(tmp_path, monkeypatch, write_only):
+    import writers.styles as styles
+
+    shared = tmp_path / 'shared.xlsx'
+    ExcelWriter(write_only=write_only).write(_styled_document(), shared)
+
+    monkeypatch.setattr(styles, '_shared_styles_supported', lambda wb: False)
+    public = tmp_path / 'public.xlsx'
+    ExcelWriter(write_only=write_only).write(_styled_document(), public)
+
+    assert _fonts(public) == _fonts(shared)
+    assert _fonts(shared)[0][0] == ('Title', None, 14, True)
+    assert _fonts(shared)[1][0] == ('print(1)', 'Courier New', 9, False)
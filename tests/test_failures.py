@@ -0,0 +1,53 @@
+"""
+変換に失敗した場合に書き込み先の元のファイルが残ること
+"""
+import pytest
+
+from converters.converter import FormatConverter
+
+
+@pytest.fixture
+def bad_xlsx(tmp_path):
+    path = tmp_path / 'bad.xlsx'
+    path.write_bytes(b'PK\x03\x04 this is not a workbook')
+    return path
+
+
+@pytest.mark.parametrize('extension', ['.md', '.csv', '.xlsx'])
+def test_failed_conversion_keeps_existing_target(tmp_path, bad_xlsx, extension):
+    target = tmp_path / f'prev{extension}'
+    target.write_bytes(b'previous output')
+
+    with pytest.raises(Exception):
+        FormatConverter().convert(bad_xlsx, target)
+
+    assert target.read_bytes() == b'previous output'
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['bad.xlsx', f'prev{extension}']
+
+
+@pytest.mark.parametrize('extension', ['.md', '.csv', '.xlsx'])
+def test_failure_while_streaming_keeps_existing_target(tmp_path, extension):
+    # 読み込みの途中（書き込み先を開いた後）で失敗する場合
+    source = tmp_path / 'broken.md'
+    rows = b''.join(b'| %d |\n' % i for i in range(50000))
+    source.write_bytes(b'| a |\n| --- |\n' + rows + b'| \xff |\n')
+    target = tmp_path / f'prev{extension}'
+    target.write_bytes(b'previous output')
+
+    with pytest.raises(UnicodeDecodeError):
+        FormatConverter().convert(source, target)
+
+    assert target.read_bytes() == b'previous output'
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['broken.md', f'prev{extension}']
+
+
+def test_successful_conversion_replaces_target(tmp_path, sample_md):
+    target = tmp_path / 'prev.md'
+    target.write_bytes(b'previous output')
+    target.chmod(0o640)
+
+    FormatConverter().convert(sample_md, target)
+
+    assert target.read_bytes() != b'previous output'
+    assert target.stat().st_mode & 0o777 == 0o640
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['prev.md', 'sample.md']
@@ -0,0 +1,36 @@
+"""
+Markdownパーサーの出力と、書き換え前のパーサーの出力（tests/data/markdown/*.jsonl）の一致
+
+期待値の作り方は markdown_golden.py を参照。
+"""
+import json
+
+import pytest
+
+from markdown_golden import DATA_DIR, document_lines, golden_path
+from parsers.markdown_parser import MarkdownParser
+
+CORPUS = sorted(DATA_DIR.glob('*.md'))
+
+
+def load_golden(source):
+    with open(golden_path(source), encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_corpus_has_golden_files():
+    assert CORPUS
+    assert all(golden_path(source).exists() for source in CORPUS)
+
+
+@pytest.mark.parametrize('memory_map', [True, False], ids=['mmap', 'text'])
+@pytest.mark.parametrize('source', CORPUS, ids=lambda path: path.name)
+def test_parse_matches_golden(source, memory_map):
+    document = MarkdownParser(memory_map=memory_map).parse(source)
+    assert document_lines(document) == load_golden(source)
+
+
+@pytest.mark.parametrize('source', CORPUS, ids=lambda path: path.name)
+def test_content_store_matches_golden(source):
+    document = MarkdownParser(content_store=True).parse(source)
+    assert document_lines(document) == load_golden(source)
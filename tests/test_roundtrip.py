@@ -0,0 +1,135 @@
+"""
+形式間の往復変換と、ストリーミング変換・Document経由の変換の一致
+"""
+import csv
+import io
+
+import pytest
+
+from conftest import table_values, xlsx_values
+from converters.converter import FormatConverter
+from parsers.csv_parser import CsvParser
+from parsers.excel_parser import ExcelParser
+from parsers.markdown_parser import MarkdownParser
+from writers.csv_writer import CsvWriter
+from writers.excel_writer import ExcelWriter
+from writers.markdown_writer import MarkdownWriter
+
+
+def test_markdown_excel_markdown_keeps_tables(sample_md, tmp_path):
+    converter = FormatConverter()
+    xlsx = tmp_path / 'sample.xlsx'
+    back = tmp_path / 'back.md'
+    converter.convert(sample_md, xlsx)
+    converter.convert(xlsx, back)
+
+    assert table_values(MarkdownParser().parse(back)) == table_values(
+        MarkdownParser().parse(sample_md))
+
+
+def test_markdown_excel_round_trip_is_stable(sample_md, tmp_path):
+    # 1回目の往復で書式がそろった後は、何度往復しても同じ出力になる
+    converter = FormatConverter()
+    first = converter.convert_bytes(
+        converter.convert_bytes(sample_md.read_bytes(), 'md', 'xlsx'), 'xlsx', 'md')
+    second = converter.convert_bytes(converter.convert_bytes(first, 'md', 'xlsx'), 'xlsx', 'md')
+    assert first == second
+
+
+def test_excel_keeps_numbers(tmp_path):
+    import openpyxl
+    source = tmp_path / 'numbers.xlsx'
+    wb = openpyxl.Workbook()
+    wb.active.title = 'Data'
+    for row in (['id', 'name', 'price'], [1, 'apple', 1.5], [2, '日本語', 3]):
+        wb.active.append(row)
+    wb.save(source)
+
+    back = tmp_path / 'back.xlsx'
+    FormatConverter().convert(source, back)
+    assert xlsx_values(back) == xlsx_values(source)
+
+
+@pytest.mark.parametrize('extension, delimiter', [('.csv', ','), ('.tsv', '\t')])
+def test_csv_round_trip(tmp_path, extension, delimiter):
+    source = tmp_path / f'data{extension}'
+    with open(source, 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f, delimiter=delimiter).writerows(
+            [['id', 'name', 'note'], ['1', 'a, "b"\nc', ''], ['2', '日本語', 'x']])
+    converter = FormatConverter()
+    xlsx = tmp_path / 'data.xlsx'
+    back = tmp_path / f'back{extension}'
+    converter.convert(source, xlsx)
+    converter.convert(xlsx, back)
+
+    assert _read_csv(back, delimiter) == _read_csv(source, delimiter)
+
+
+def test_markdown_csv_writes_one_file_per_sheet(sample_md, tmp_path):
+    target = tmp_path / 'sample.csv'
+    FormatConverter().convert(sample_md, target)
+
+    assert target.read_bytes().decode('utf-8') == 'id,name,price\r\n1,apple,1.5\r\n2,日本語,3\r\n'
+    assert (tmp_path / 'sample_2.csv').read_bytes().decode('utf-8') == 'a,b\r\nx,y\r\n,z\r\n'
+
+
+@pytest.mark.parametrize('writer', [MarkdownWriter(), MarkdownWriter(pretty=True), CsvWriter()],
+                         ids=['markdown', 'markdown-pretty', 'csv'])
+@pytest.mark.parametrize('source_name', ['sample.md', 'sample.xlsx'])
+def test_streaming_matches_document_text(sample_md, tmp_path, writer, source_name):
+    source = _source(sample_md, tmp_path, source_name)
+    parser = _parser(source_name)
+
+    streamed, written = tmp_path / 'streamed.out', tmp_path / 'written.out'
+    writer.write_events(parser.iter_events(source), streamed)
+    writer.write(parser.parse(source), written)
+    assert streamed.read_bytes() == written.read_bytes()
+
+
+@pytest.mark.parametrize('source_name', ['sample.md', 'sample.xlsx'])
+def test_streaming_matches_document_excel(sample_md, tmp_path, source_name):
+    source = _source(sample_md, tmp_path, source_name)
+    parser = _parser(source_name)
+
+    streamed, written = tmp_path / 'streamed.xlsx', tmp_path / 'written.xlsx'
+    ExcelWriter().write_events(parser.iter_events(source), streamed)
+    ExcelWriter().write(parser.parse(source), written)
+    assert xlsx_values(streamed) == xlsx_values(written)
+
+
+def test_excel_read_only_matches_full_load(sample_md, tmp_path):
+    source = _source(sample_md, tmp_path, 'sample.xlsx')
+    assert (table_values(ExcelParser(read_only=True).parse(source))
+            == table_values(ExcelParser(read_only=False).parse(source)))
+
+
+def test_memory_map_matches_text_reading(sample_md):
+    assert (MarkdownParser(memory_map=True).parse(sample_md).sheets
+            == MarkdownParser(memory_map=False).parse(sample_md).sheets)
+
+
+def test_convert_stream_matches_file_conversion(sample_md, tmp_path):
+    converter = FormatConverter()
+    target = tmp_path / 'sample_out.md'
+    converter.convert(sample_md, target)
+
+    output = io.BytesIO()
+    converter.convert_stream(sample_md.read_bytes(), output, 'md', 'md')
+    assert output.getvalue() == target.read_bytes()
+
+
+def _source(sample_md, tmp_path, name):
+    if name.endswith('.md'):
+        return sample_md
+    xlsx = tmp_path / name
+    FormatConverter().convert(sample_md, xlsx)
+    return xlsx
+
+
+def _parser(name):
+    return MarkdownParser() if name.endswith('.md') else ExcelParser()
+
+
+def _read_csv(path, delimiter):
+    with open(path, encoding='utf-8', newline='') as f:
+        return list(csv.reader(f, delimiter=delimiter))
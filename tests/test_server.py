@@ -0,0 +1,118 @@
+"""
+変換サーバーのリクエストの検証とワーカープールの作り直し
+"""
+import asyncio
+import json
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from converters.server import ConversionServer, _HttpError
+
+
+async def _request(port, body, headers):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    head = ['POST /convert HTTP/1.1', f'Content-Length: {len(body)}']
+    head += [f'{name}: {value}' for name, value in headers.items()]
+    writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    status_line, _, _ = response.partition(b'\r\n')
+    return int(status_line.split()[1])
+
+
+def test_path_convert_checks_content_type_host_and_origin(sample_md, tmp_path):
+    body = json.dumps({'from': str(sample_md), 'to': str(tmp_path / 'out.xlsx')}).encode()
+
+    async def run():
+        server = ConversionServer(jobs=1)
+        await server.start('127.0.0.1', 0)
+        port = server.addresses[0][1]
+        json_type = {'Content-Type': 'application/json'}
+        try:
+            return [
+                await _request(port, body, {'Host': f'127.0.0.1:{port}'}),
+                await _request(port, body, {'Host': f'evil.example:{port}', **json_type}),
+                await _request(port, body, {'Host': f'localhost:{port + 1}', **json_type}),
+                await _request(port, body, {'Host': f'localhost:{port}', **json_type,
+                                            'Origin': 'http://evil.example'}),
+                await _request(port, body, {'Host': f'localhost:{port}', **json_type,
+                                            'Origin': f'http://localhost:{port}'}),
+            ]
+        finally:
+            await server.close()
+
+    assert asyncio.run(run()) == [415, 403, 403, 403, 200]
+    assert (tmp_path / 'out.xlsx').exists()
+
+
+class _BrokenExecutor:
+    """投入されたジョブが break_jobs() で BrokenProcessPool になるプール"""
+
+    def __init__(self):
+        self.shutdowns = []
+        self.futures = []
+
+    def submit(self, *args, **kwargs):
+        self.futures.append(Future())
+        return self.futures[-1]
+
+    def break_jobs(self):
+        for future in self.futures:
+            future.set_exception(BrokenProcessPool('worker died'))
+
+    def shutdown(self, wait=True, **kwargs):
+        self.shutdowns.append(wait)
+
+
+def test_broken_pool_is_replaced_once_and_shut_down():
+    server = ConversionServer(jobs=1)
+    broken = _BrokenExecutor()
+    created = []
+
+    def create_executor():
+        created.append(object())
+        return created[-1]
+
+    server._executor = broken
+    server._create_executor = create_executor
+
+    async def run():
+        jobs = asyncio.gather(
+            server._submit((print,)), server._submit((print,)), return_exceptions=True
+        )
+        while len(broken.futures) < 2:
+            await asyncio.sleep(0)
+        broken.break_jobs()
+        results = await jobs
+        return [result.status for result in results if isinstance(result, _HttpError)]
+
+    assert asyncio.run(run()) == [500, 500]
+    # 同じプールで失敗したジョブが続いても作り直すのは1回だけで、古いプールは終了させる
+    assert server._executor is created[0] and len(created) == 1
+    assert broken.shutdowns == [False]
+    assert server.failed == 2
+
+
+def test_broken_pool_does_not_replace_newer_pool():
+    server = ConversionServer(jobs=1)
+    broken = _BrokenExecutor()
+    newer = object()
+    server._executor = broken
+    server._create_executor = pytest.fail
+
+    async def run():
+        job = asyncio.ensure_future(server._submit((print,)))
+        while not broken.futures:
+            await asyncio.sleep(0)
+        # 失敗を受け取る前に他のジョブがプールを作り直していた場合
+        server._executor = newer
+        broken.break_jobs()
+        await job
+
+    with pytest.raises(_HttpError):
+        asyncio.run(run())
+    assert server._executor is newer
+    assert broken.shutdowns == []
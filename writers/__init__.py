@@ -2,4 +2,4 @@
 Writers for writing various file formats
 """
 
-__all__ = ['excel_writer', 'markdown_writer']
+__all__ = ['excel_writer', 'markdown_writer', 'csv_writer']
@@ -0,0 +1,129 @@
+"""
+CSV ライター - 中間形式からCSV・TSVファイルを生成
+"""
+import csv
+from itertools import chain
+from typing import Iterable, Iterator, Optional, Union
+from converters.base import (
+    Document, Content, ContentType, ColumnarTable, Event, EventType,
+    document_events, iter_sheet_contents
+)
+from converters.chunking import part_path, split_sheets
+from converters.profiling import NULL_PROFILER
+from converters.streams import Target, is_path, open_text_target, replace_on_success
+
+# ファイルに書き込む単位（バイト）
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+class CsvWriter:
+    """
+    中間形式からCSVファイルを生成
+
+    CSVに書き込むのはテーブルだけ（見出し・テキストなどは書き込まない）。
+    1つのシートに複数のテーブルがある場合は空行を挟んで続けて書き込み、
+    テーブルのあるシートが複数ある場合は2つ目以降を別のファイル（name_2.csv, …）に書き込む。
+    """
+
+    # シートごとに別のファイルに書き込む（FormatConverter のキャッシュの判定に使う）
+    FILE_PER_SHEET = True
+
+    # フェーズの計測（FormatConverter が設定する）
+    profiler = NULL_PROFILER
+
+    def __init__(self, encoding: str = 'utf-8', dialect: Union[str, csv.Dialect] = 'excel',
+                 delimiter: Optional[str] = None, max_sheet_rows: Optional[int] = None):
+        """
+        Args:
+            encoding: 文字コード（Excelで開く場合は 'utf-8-sig'（BOM付き）または 'cp932'）
+            dialect: csv モジュールのダイアレクト（名前または csv.Dialect）
+            delimiter: 区切り文字（Noneの場合はダイアレクトの区切り文字）
+            max_sheet_rows: 1ファイルの最大行数（ヘッダーを含む）。超えた分は続きのファイル
+                （name_2.csv, …）に書き込み、ヘッダーを繰り返す。Noneの場合は分割しない
+        """
+        self.encoding = encoding
+        self.dialect = dialect
+        self.delimiter = delimiter
+        self.max_sheet_rows = max_sheet_rows
+
+    def write(self, document: Document, file_path: Target):
+        """
+        DocumentオブジェクトをCSVファイルに書き込み
+
+        Args:
+            document: 中間形式のドキュメント
+            file_path: 出力先CSVファイルのパス、またはストリーム
+        """
+        self.write_events(document_events(document), file_path)
+
+    def write_events(self, events: Iterable[Event], file_path: Target):
+        """
+        イベントを受け取りながらCSVファイルに書き込み
+
+        Args:
+            events: パーサーが出力するイベント
+            file_path: 出力先CSVファイルのパス、またはストリーム
+
+        Raises:
+            ValueError: 出力先がストリームで、テーブルのあるシートが複数ある場合
+        """
+        if self.max_sheet_rows is not None:
+            # テーブル以外のコンテンツは書き込まないため行数に数えない
+            events = split_sheets(events, self.max_sheet_rows, row_count=_no_rows)
+
+        events = iter(events)
+        files = 0
+        for event in events:
+            if event.type != EventType.SHEET_START:
+                continue
+            tables = (content for content in iter_sheet_contents(events)
+                      if content.type == ContentType.TABLE)
+            first = next(tables, None)
+            if first is None:
+                continue
+            files += 1
+            if files > 1 and not is_path(file_path):
+                raise ValueError('複数シートのCSVへの書き込みは出力先がファイルの場合のみ使えます')
+            self._write_file(chain([first], tables),
+                             part_path(file_path, files) if files > 1 else file_path)
+
+        if files == 0:
+            # テーブルが1つもない場合も空のファイルを作る
+            self._write_file(iter(()), file_path)
+
+    def _write_file(self, tables: Iterator[Content], file_path: Target):
+        """
+        1シート分のテーブルを1つのファイルに書き込み
+
+        読み込み途中で失敗した場合は書き込み先にある元のファイルを残す。
+        """
+        with replace_on_success(file_path) as target, self._open(target) as f:
+            self._write_tables(f, tables)
+
+    def _open(self, file_path: Target):
+        """書き込み先を開く（改行は csv モジュールが出力する）"""
+        if is_path(file_path):
+            return open(file_path, 'w', encoding=self.encoding, newline='',
+                        buffering=WRITE_BUFFER_SIZE)
+        return open_text_target(file_path, encoding=self.encoding, newline='')
+
+    def _write_tables(self, f, tables: Iterable[Content]):
+        """テーブルのヘッダーと行を書き込み（テーブルの間は空行）"""
+        options = {} if self.delimiter is None else {'delimiter': self.delimiter}
+        writer = csv.writer(f, self.dialect, **options)
+        with self.profiler.phase('write.sheet_content'):
+            for index, content in enumerate(tables):
+                table = content.value
+                if index:
+                    writer.writerow(())
+                writer.writerow(table.headers)
+                if isinstance(table, ColumnarTable):
+                    # 列形式のテーブルは行のリストを作らずに列から行のタプルを作る
+                    writer.writerows(zip(*table.columns) if table.columns
+                                     else [()] * table.num_rows)
+                else:
+                    writer.writerows(table.rows)
+
+
+def _no_rows(content: Content) -> int:
+    return 0
@@ -1,122 +1,270 @@
 """
 Excel ライター - 中間形式からExcelファイルを生成
 """
-from pathlib import Path
+from contextlib import suppress
+from itertools import islice
+from typing import Callable, Dict, Iterable, Optional
 import openpyxl
 from openpyxl.utils import get_column_letter
-from openpyxl.styles import Font, Alignment
-from converters.base import Document, Sheet, Content, ContentType, Table
+from converters.base import (
+    Document, Sheet, Content, ContentType, Table, Event, EventType,
+    document_events, iter_sheet_contents
+)
+from converters.chunking import EXCEL_MAX_ROWS, SheetPart, part_path, split_files, split_sheets
+from converters.profiling import NULL_PROFILER
+from converters.streams import Target, binary_target, is_path, replace_on_success
+from writers.styles import StyleRegistry
 
 
 class ExcelWriter:
     """中間形式からExcelファイルを生成"""
-    
-    def write(self, document: Document, file_path: Path):
+
+    # 書き込み専用モードで列幅の計算に使う先頭行数（width_sample_rows未指定の場合）
+    STREAM_WIDTH_SAMPLE_ROWS = 1000
+
+    # フェーズの計測（FormatConverter が設定する）
+    profiler = NULL_PROFILER
+
+    def __init__(self, write_only: bool = True, width_sample_rows: Optional[int] = None,
+                 max_sheet_rows: int = EXCEL_MAX_ROWS, split_files: bool = False):
+        """
+        Args:
+            write_only: Trueの場合、書き込み専用モードで行単位に追加する。
+                セルオブジェクトをメモリに保持しないため、大きなテーブルでも高速・省メモリ
+            width_sample_rows: 書き込み専用モードで列幅の計算に使う先頭行数。
+                列幅は最初の行より前に確定する必要があるため、この行数だけ保留する
+                （Noneの場合は STREAM_WIDTH_SAMPLE_ROWS）
+            max_sheet_rows: 1シートの最大行数。超えた分は続きのシート（Data_2, Data_3, …）に
+                書き込み、テーブルのヘッダーを繰り返す（既定はExcelの上限）
+            split_files: Trueの場合、続きのシートを別のファイル（name_2.xlsx, …）に書き込む
+        """
+        self.write_only = write_only
+        self.width_sample_rows = width_sample_rows
+        self.max_sheet_rows = max_sheet_rows
+        self.split_files = split_files
+
+    def write(self, document: Document, file_path: Target):
         """
-        Documentオブジェクトをアelファイルに書き込み
-        
+        DocumentオブジェクトをExcelファイルに書き込み
+
         Args:
             document: 中間形式のドキュメント
-            file_path: 出力先Excelファイルのパス
+            file_path: 出力先Excelファイルのパス、またはバイナリストリーム
+        """
+        # Documentの行も全ては保留せず、書き込み専用モードの省メモリを保つ
+        self._write(document_events(document), file_path, self._sample_rows())
+
+    def write_events(self, events: Iterable[Event], file_path: Target):
+        """
+        イベントを受け取りながらExcelファイルに書き込み
+
+        書き込み専用モードでは行をそのまま一時ファイルへ書き出すため、
+        メモリ使用量は列幅計算用に保留する行数までに抑えられる。
+
+        Args:
+            events: パーサーが出力するイベント
+            file_path: 出力先Excelファイルのパス、またはバイナリストリーム
         """
-        wb = openpyxl.Workbook()
-        wb.remove(wb.active)  # デフォルトシートを削除
-        
-        for sheet_data in document.sheets:
-            ws = self._create_sheet(wb, sheet_data.name)
-            self._write_sheet_content(ws, sheet_data)
-        
+        self._write(events, file_path, self._sample_rows())
+
+    def _sample_rows(self) -> int:
+        """列幅の計算に使う先頭行数"""
+        if self.width_sample_rows is None:
+            return self.STREAM_WIDTH_SAMPLE_ROWS
+        return self.width_sample_rows
+
+    def _write(self, events: Iterable[Event], file_path: Target, sample_rows: int):
+        """イベント列を上限の行数ごとにシート（またはファイル）に分けて書き込み"""
+        binary_target(file_path)
+        events = split_sheets(events, self.max_sheet_rows)
+        if not self.split_files:
+            self._write_workbook(events, file_path, sample_rows)
+            return
+
+        if not is_path(file_path):
+            raise ValueError('ファイルへの分割は出力先がファイルの場合のみ使えます')
+        # 1ファイルずつ保存するため、メモリに保持するのは書き込み中のブックだけ
+        for index, file_events in enumerate(split_files(events), start=1):
+            self._write_workbook(file_events, part_path(file_path, index), sample_rows)
+
+    def _write_workbook(self, events: Iterable[Event], file_path: Target,
+                        sample_rows: int):
+        """イベント列からブックを作成して保存"""
+        wb = openpyxl.Workbook(write_only=self.write_only)
+        if not self.write_only:
+            wb.remove(wb.active)  # デフォルトシートを削除
+
+        styles = StyleRegistry(wb)
+        names = _SheetNames()
+        events = iter(events)
+        try:
+            for event in events:
+                if event.type == EventType.SHEET_START:
+                    if isinstance(event.value, SheetPart):
+                        ws = self._create_sheet(wb, event.value.name, event.value.part, names)
+                    else:
+                        ws = self._create_sheet(wb, event.value, names=names)
+                    self._write_contents(ws, iter_sheet_contents(events), sample_rows, styles)
+        except BaseException:
+            # 書き込み専用のシートは書きかけの一時ファイルを閉じてから失敗を伝える
+            if self.write_only:
+                for ws in wb.worksheets:
+                    with suppress(Exception):
+                        ws.close()
+            raise
+
         # シートが一つもない場合はデフォルトを追加
         if len(wb.sheetnames) == 0:
             ws = wb.create_sheet('Sheet1')
-            ws.cell(row=1, column=1, value='(空のドキュメント)')
-        
-        wb.save(file_path)
-    
-    def _create_sheet(self, wb, sheet_name: str):
-        """有効なシート名でシートを作成"""
+            ws.append(['(空のドキュメント)'])
+
+        with self.profiler.phase('write.save'), replace_on_success(file_path) as target:
+            wb.save(target)
+
+    def _create_sheet(self, wb, sheet_name: str, part: int = 1,
+                      names: Optional['_SheetNames'] = None):
+        """
+        有効なシート名でシートを作成（part が2以上の場合は続きのシートとして _2 などを付ける）
+
+        names はブックで使用済みのシート名（Noneの場合はブックから作る）。
+        """
         # シート名を有効な名前に変換（Excelの制約に対応）
         valid_name = sheet_name[:31]  # 最大31文字
         # 無効な文字を削除
         for char in ['\\', '/', '?', '*', '[', ']', ':']:
             valid_name = valid_name.replace(char, '')
-        
+
+        if part > 1:
+            # 番号が31文字に収まるよう元の名前を切り詰める
+            suffix = f'_{part}'
+            valid_name = valid_name[:31 - len(suffix)] + suffix
+
         # 同名シートが存在する場合は番号を付ける
-        if valid_name in wb.sheetnames:
-            counter = 1
-            while f'{valid_name}_{counter}' in wb.sheetnames:
-                counter += 1
-            valid_name = f'{valid_name}_{counter}'
-        
-        return wb.create_sheet(valid_name)
-    
+        if names is None:
+            names = _SheetNames(wb.sheetnames)
+        ws = wb.create_sheet(names.unique(valid_name))
+        # 空の名前などは openpyxl が別の名前を付けるため、実際のシート名を登録する
+        names.used.add(ws.title)
+        return ws
+
     def _write_sheet_content(self, ws, sheet: Sheet):
         """シートにコンテンツを書き込み"""
-        row_idx = 1
-        table_start_row = None
-        
-        for content in sheet.contents:
-            if content.type == ContentType.TITLE:
-                # タイトル（太字、大きめ）
-                cell = ws.cell(row=row_idx, column=1, value=content.value)
-                cell.font = Font(size=14, bold=True)
-                row_idx += 1
-            
-            elif content.type == ContentType.TEXT:
-                # 通常のテキスト
-                ws.cell(row=row_idx, column=1, value=content.value)
-                row_idx += 1
-            
-            elif content.type == ContentType.LIST_ITEM:
-                # リスト項目
-                ws.cell(row=row_idx, column=1, value=f'• {content.value}')
-                row_idx += 1
-            
-            elif content.type == ContentType.NUMBERED_LIST:
-                # 番号付きリスト
-                ws.cell(row=row_idx, column=1, value=content.value)
-                row_idx += 1
-            
-            elif content.type == ContentType.CODE_BLOCK:
-                # コードブロック
-                for line in content.value.split('\n'):
-                    cell = ws.cell(row=row_idx, column=1, value=line)
-                    cell.font = Font(name='Courier New', size=9)
-                    row_idx += 1
-            
-            elif content.type == ContentType.TABLE:
-                # テーブル
-                table: Table = content.value
-                
-                # ヘッダー行
-                for col_idx, header in enumerate(table.headers, start=1):
-                    cell = ws.cell(row=row_idx, column=col_idx, value=header)
-                    cell.font = Font(bold=True)
-                row_idx += 1
-                
-                # データ行
-                for row_data in table.rows:
-                    for col_idx, cell_value in enumerate(row_data, start=1):
-                        ws.cell(row=row_idx, column=col_idx, value=cell_value)
-                    row_idx += 1
-            
-            elif content.type == ContentType.EMPTY:
-                # 空行
-                row_idx += 1
-        
-        # 列幅を自動調整
-        self._auto_adjust_columns(ws)
-    
-    def _auto_adjust_columns(self, ws):
-        """列幅を自動調整"""
-        for column in ws.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            for cell in column:
-                try:
-                    if cell.value:
-                        max_length = max(max_length, len(str(cell.value)))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 80)  # 最大80
-            ws.column_dimensions[column_letter].width = adjusted_width
+        self._write_contents(ws, sheet.contents, self._sample_rows(), StyleRegistry(ws.parent))
+
+    def _write_contents(self, ws, contents: Iterable[Content], sample_rows: int,
+                        styles: StyleRegistry):
+        """コンテンツを順に書き込み、列幅を設定"""
+        with self.profiler.phase('write.sheet_content'):
+            widths = []
+            rows = self._iter_content_rows(contents)
+
+            if self.write_only:
+                # 書き込み専用モードでは列幅を最初の行より前に設定する必要があるため、
+                # 先頭の行を保留して列幅を確定してから書き込む
+                pending = list(islice(rows, sample_rows))
+                for values, _ in pending:
+                    self._track_widths(widths, values)
+                self._apply_column_widths(ws, widths)
+
+                for values, style in pending:
+                    ws.append(self._make_row(ws, values, style, styles))
+                for values, style in rows:
+                    ws.append(self._make_row(ws, values, style, styles))
+            else:
+                # 行を追加しながら列幅を記録（セルを再走査しない）
+                for values, style in rows:
+                    self._track_widths(widths, values)
+                    ws.append(self._make_row(ws, values, style, styles))
+                self._apply_column_widths(ws, widths)
+
+    def _iter_content_rows(self, contents: Iterable[Content]):
+        """コンテンツを (セル値のリスト, 書式の名前) の行単位で返す"""
+        for content in contents:
+            content_rows = _CONTENT_ROWS.get(content.type)
+            if content_rows is not None:
+                yield from content_rows(content)
+
+    def _make_row(self, ws, values, style: Optional[str], styles: StyleRegistry):
+        """書式の指定がある行は書式付きのセルに変換"""
+        if style is None:
+            return values
+        return styles.make_cells(ws, values, style)
+
+    def _track_widths(self, widths: list, values):
+        """列ごとの最大文字数を更新"""
+        if len(values) > len(widths):
+            widths.extend([0] * (len(values) - len(widths)))
+
+        for col_idx, value in enumerate(values):
+            if value is None:
+                continue
+            length = len(value) if type(value) is str else len(str(value))
+            if length > widths[col_idx]:
+                widths[col_idx] = length
+
+    def _apply_column_widths(self, ws, widths: list):
+        """記録した最大文字数から列幅を設定"""
+        with self.profiler.phase('write.column_widths', emit=False):
+            for col_idx, max_length in enumerate(widths, start=1):
+                adjusted_width = min(max_length + 2, 80)  # 最大80
+                ws.column_dimensions[get_column_letter(col_idx)].width = adjusted_width
+
+
+class _SheetNames:
+    """ブックで使用済みのシート名（同名のシートに付ける番号は名前ごとに続きから探す）"""
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.used = set(names)
+        self._next_counter: Dict[str, int] = {}
+
+    def unique(self, name: str) -> str:
+        """使用済みでなければそのまま、使用済みなら name_1, name_2, … の空いている名前を返す"""
+        if name in self.used:
+            counter = self._next_counter.get(name, 1)
+            while f'{name}_{counter}' in self.used:
+                counter += 1
+            self._next_counter[name] = counter + 1
+            name = f'{name}_{counter}'
+        return name
+
+
+def _title_rows(content: Content):
+    # タイトル（太字、大きめ）
+    return ([content.value], 'title'),
+
+
+def _text_rows(content: Content):
+    # 通常のテキスト・番号付きリスト
+    return ([content.value], None),
+
+
+def _list_item_rows(content: Content):
+    return ([f'• {content.value}'], None),
+
+
+def _code_block_rows(content: Content):
+    # コードブロック（1行ずつ等幅フォント）
+    return (([line], 'code') for line in content.value.split('\n'))
+
+
+def _table_rows(content: Content):
+    table: Table = content.value
+    yield table.headers, 'header'
+    for row_data in table.rows:
+        yield row_data, None
+
+
+def _empty_rows(content: Content):
+    return ([], None),
+
+
+# コンテンツの種類ごとに (セル値のリスト, 書式の名前) の行を返す関数
+_CONTENT_ROWS: Dict[ContentType, Callable[[Content], Iterable[tuple]]] = {
+    ContentType.TITLE: _title_rows,
+    ContentType.TEXT: _text_rows,
+    ContentType.LIST_ITEM: _list_item_rows,
+    ContentType.NUMBERED_LIST: _text_rows,
+    ContentType.CODE_BLOCK: _code_block_rows,
+    ContentType.TABLE: _table_rows,
+    ContentType.EMPTY: _empty_rows,
+}
@@ -1,22 +1,79 @@
 """
 Markdown ライター - 中間形式からMarkdownファイルを生成
 """
-from pathlib import Path
-from converters.base import Document, Sheet, Content, ContentType, Table
+import shutil
+import tempfile
+import unicodedata
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, Optional
+from converters.base import (
+    Document, Sheet, Content, ContentType, Table, ColumnarTable, Event, EventType,
+    document_events, iter_sheet_contents
+)
+from converters.chunking import continued_sheet_names, part_path, split_files, split_sheets
+from converters.profiling import NULL_PROFILER
+from converters.streams import Target, is_path, open_text_target, replace_on_success
 
 
 class MarkdownWriter:
     """中間形式からMarkdownファイルを生成"""
+
+    # ストリーミング時に最初のシートをメモリに保持する上限（超えると一時ファイルへ）
+    SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+    # 列形式のテーブルを一度に文字列へ変換する行数
+    COLUMNAR_CHUNK_ROWS = 50000
+
+    # 書き込みをまとめる文字数の既定値
+    BUFFER_SIZE = 1024 * 1024
+
+    # 行形式のテーブルを最初に文字列へ変換する行数（以降は buffer_size に合わせる）
+    FIRST_CHUNK_ROWS = 1024
+
+    # フェーズの計測（FormatConverter が設定する）
+    profiler = NULL_PROFILER
+
+    def __init__(self, max_sheet_rows: Optional[int] = None, split_files: bool = False,
+                 buffer_size: int = BUFFER_SIZE, pretty: bool = False):
+        """
+        Args:
+            max_sheet_rows: 1シートの最大行数（テーブルの行とテーブル以外のコンテンツを数える）。
+                超えた分は続きのシート（## Data_2, …）に書き込み、テーブルのヘッダーを繰り返す。
+                Noneの場合は分割しない
+            split_files: Trueの場合、続きのシートを別のファイル（name_2.md, …）に書き込む
+            buffer_size: 出力をまとめてから書き込む文字数。テーブルはこの大きさごとに
+                複数行をまとめて文字列に変換する
+            pretty: Trueの場合、テーブルの列幅を揃えて出力する（全角文字は2文字分）。
+                列幅を求めるため、テーブルの行を全てメモリに保持する
+
+        Raises:
+            ValueError: max_sheet_rows なしで split_files を指定した場合
+        """
+        if split_files and max_sheet_rows is None:
+            raise ValueError('ファイルへの分割には1シートの最大行数の指定が必要です')
+
+        self.max_sheet_rows = max_sheet_rows
+        self.split_files = split_files
+        self.buffer_size = buffer_size
+        self.pretty = pretty
     
-    def write(self, document: Document, file_path: Path):
+    def write(self, document: Document, file_path: Target):
         """
         Documentオブジェクトをmarkdownファイルに書き込み
         
         Args:
             document: 中間形式のドキュメント
-            file_path: 出力先Markdownファイルのパス
+            file_path: 出力先Markdownファイルのパス、またはストリーム（UTF-8で書き込む）
         """
-        with open(file_path, 'w', encoding='utf-8') as f:
+        if self.max_sheet_rows is not None:
+            # 分割はイベント単位で行う
+            self.write_events(document_events(document), file_path)
+        else:
+            self._write_sheets(document, file_path)
+
+    def _write_sheets(self, document: Document, file_path: Target):
+        """シートを順に書き込み"""
+        with replace_on_success(file_path) as target, open_text_target(target) as f:
             # 複数シートの場合
             for sheet_idx, sheet in enumerate(document.sheets):
                 # シート名を見出しとして追加（複数シートの場合）
@@ -27,50 +84,252 @@ class MarkdownWriter:
                 
                 # シートの内容を書き込み
                 self._write_sheet_content(f, sheet)
-    
+
+    def write_events(self, events: Iterable[Event], file_path: Target):
+        """
+        イベントを受け取りながらMarkdownファイルに書き込み
+
+        シート見出しはシートが複数ある場合のみ出力するため、
+        2つ目のシートが現れるまで最初のシートの出力を一時領域に保留する。
+
+        Args:
+            events: パーサーが出力するイベント
+            file_path: 出力先Markdownファイルのパス、またはストリーム（UTF-8で書き込む）
+        """
+        if self.max_sheet_rows is None:
+            self._write_event_file(events, file_path)
+            return
+
+        events = split_sheets(events, self.max_sheet_rows)
+        if not self.split_files:
+            self._write_event_file(continued_sheet_names(events), file_path)
+            return
+
+        if not is_path(file_path):
+            raise ValueError('ファイルへの分割は出力先がファイルの場合のみ使えます')
+        for index, file_events in enumerate(split_files(events), start=1):
+            self._write_event_file(file_events, part_path(file_path, index))
+
+    def _write_event_file(self, events: Iterable[Event], file_path: Target):
+        """
+        イベントを1つのファイルに書き込み
+
+        読み込み途中で失敗した場合は書き込み先にある元のファイルを残す。
+        """
+        with replace_on_success(file_path) as target, open_text_target(target) as f:
+            self._write_events(events, f)
+
+    def _write_events(self, events: Iterable[Event], f):
+        """イベントを順に書き込み"""
+        with tempfile.SpooledTemporaryFile(
+                max_size=self.SPOOL_MAX_SIZE, mode='w+', encoding='utf-8'
+        ) as spool:
+            events = iter(events)
+            first_sheet_name = None
+            sheet_count = 0
+
+            for event in events:
+                if event.type != EventType.SHEET_START:
+                    continue
+
+                sheet_count += 1
+                if sheet_count == 1:
+                    first_sheet_name = event.value
+                    self._write_contents(spool, iter_sheet_contents(events))
+                    continue
+
+                if sheet_count == 2:
+                    # 複数シートが確定したので最初のシートを見出し付きで出力
+                    f.write(f'## {first_sheet_name}\n\n')
+                    self._copy_spool(spool, f)
+
+                f.write('\n\n')
+                f.write(f'## {event.value}\n\n')
+                self._write_contents(f, iter_sheet_contents(events))
+
+            if sheet_count == 1:
+                self._copy_spool(spool, f)
+
+    def _copy_spool(self, spool, f):
+        """保留していた出力を書き込み先にコピー"""
+        spool.seek(0)
+        shutil.copyfileobj(spool, f)
+        spool.seek(0)
+        spool.truncate()
+
     def _write_sheet_content(self, f, sheet: Sheet):
         """シートのコンテンツをMarkdownとして書き込み"""
-        for content in sheet.contents:
-            if content.type == ContentType.TITLE:
-                f.write(f'# {content.value}\n\n')
-            
-            elif content.type == ContentType.TEXT:
-                f.write(f'{content.value}\n\n')
-            
-            elif content.type == ContentType.LIST_ITEM:
-                f.write(f'- {content.value}\n')
-            
-            elif content.type == ContentType.NUMBERED_LIST:
-                f.write(f'1. {content.value}\n')
-            
-            elif content.type == ContentType.CODE_BLOCK:
-                lang = content.metadata.get('language', '')
-                f.write(f'```{lang}\n')
-                f.write(content.value)
-                f.write('\n```\n\n')
-            
-            elif content.type == ContentType.TABLE:
-                table: Table = content.value
-                self._write_table(f, table)
-            
-            elif content.type == ContentType.EMPTY:
-                f.write('\n')
+        self._write_contents(f, sheet.contents)
+
+    def _write_contents(self, f, contents: Iterable[Content]):
+        """コンテンツを順にMarkdownとして書き込み"""
+        with self.profiler.phase('write.sheet_content'):
+            out = _OutputBuffer(f, self.buffer_size)
+            write = out.write
+            for content in contents:
+                # テーブル以外はコンテンツの種類ごとの関数で文字列にする
+                render = _RENDERERS.get(content.type)
+                if render is not None:
+                    write(render(content))
+                elif content.type == ContentType.TABLE:
+                    table: Table = content.value
+                    self._write_table(out, table)
+            out.flush()
     
-    def _write_table(self, f, table: Table):
+    def _write_table(self, out: '_OutputBuffer', table: Table):
         """テーブルをMarkdown形式で書き込み"""
         if not table.headers:
             return
         
-        # ヘッダー行
-        f.write('| ' + ' | '.join(table.headers) + ' |\n')
-        
-        # 区切り行
-        f.write('| ' + ' | '.join(['---'] * len(table.headers)) + ' |\n')
+        if self.pretty:
+            self._write_pretty_table(out, table)
+            return
         
-        # データ行
-        for row in table.rows:
-            # 列数を揃える
-            row_data = row + [''] * (len(table.headers) - len(row))
-            f.write('| ' + ' | '.join(row_data[:len(table.headers)]) + ' |\n')
+        # ヘッダー行と区切り行
+        out.write('| ' + ' | '.join(table.headers) + ' |\n'
+                  + '| ' + ' | '.join(['---'] * len(table.headers)) + ' |\n')
         
-        f.write('\n')
+        if isinstance(table, ColumnarTable):
+            self._write_columnar_rows(out, table)
+        else:
+            self._write_rows(out, table.rows, len(table.headers))
+        out.write('\n')
+
+    def _write_rows(self, out: '_OutputBuffer', rows: Iterable[list], width: int):
+        """行形式のテーブルの行を、buffer_size 程度ずつまとめて文字列に変換して書き込み"""
+        rows = iter(rows)
+        chunk_rows = self.FIRST_CHUNK_ROWS
+        while True:
+            chunk = list(islice(rows, chunk_rows))
+            if not chunk:
+                return
+            text = _render_rows(chunk, width)
+            out.write(text)
+            # 1行あたりの文字数から、次にまとめる行数を決める
+            chunk_rows = max(1, self.buffer_size * len(chunk) // len(text))
+
+    def _write_columnar_rows(self, out: '_OutputBuffer', table: ColumnarTable):
+        """列形式のテーブルの行を、列ごとにまとめて文字列に変換して書き込み"""
+        width = len(table.headers)
+        columns = table.columns[:width]
+        for start in range(0, table.num_rows, self.COLUMNAR_CHUNK_ROWS):
+            stop = min(start + self.COLUMNAR_CHUNK_ROWS, table.num_rows)
+            cells = [map(str, column[start:stop]) for column in columns]
+            # 列数をヘッダーに揃える
+            cells += [[''] * (stop - start)] * (width - len(cells))
+            out.write('| ' + ' |\n| '.join(map(' | '.join, zip(*cells))) + ' |\n')
+
+    def _write_pretty_table(self, out: '_OutputBuffer', table: Table):
+        """列幅を揃えたテーブルを書き込み（列ごとに1回走査して幅を求める）"""
+        width = len(table.headers)
+        if isinstance(table, ColumnarTable):
+            columns = [list(map(str, column)) for column in table.columns[:width]]
+            columns += [[''] * table.num_rows] * (width - len(columns))
+        else:
+            rows = [_fit_row(row, width) for row in table.rows]
+            columns = [list(map(str, column)) for column in zip(*rows)] or [[]] * width
+
+        widths = [
+            max(3, _display_width(header), max(map(_display_width, column), default=0))
+            for header, column in zip(table.headers, columns)
+        ]
+        header = [_pad(text, column_width) for text, column_width in zip(table.headers, widths)]
+        out.write('| ' + ' | '.join(header) + ' |\n'
+                  + '| ' + ' | '.join('-' * column_width for column_width in widths) + ' |\n')
+
+        padded = [[_pad(text, column_width) for text in column]
+                  for column, column_width in zip(columns, widths)]
+        self._write_rows(out, map(list, zip(*padded)), width)
+        out.write('\n')
+
+
+def _render_title(content: Content) -> str:
+    return f'# {content.value}\n\n'
+
+
+def _render_text(content: Content) -> str:
+    return f'{content.value}\n\n'
+
+
+def _render_list_item(content: Content) -> str:
+    return f'- {content.value}\n'
+
+
+def _render_numbered_list(content: Content) -> str:
+    return f'1. {content.value}\n'
+
+
+def _render_code_block(content: Content) -> str:
+    lang = content.metadata.get('language', '')
+    return f'```{lang}\n{content.value}\n```\n\n'
+
+
+def _render_empty(content: Content) -> str:
+    return '\n'
+
+
+# テーブル以外のコンテンツをMarkdownの文字列にする関数
+_RENDERERS: Dict[ContentType, Callable[[Content], str]] = {
+    ContentType.TITLE: _render_title,
+    ContentType.TEXT: _render_text,
+    ContentType.LIST_ITEM: _render_list_item,
+    ContentType.NUMBERED_LIST: _render_numbered_list,
+    ContentType.CODE_BLOCK: _render_code_block,
+    ContentType.EMPTY: _render_empty,
+}
+
+
+class _OutputBuffer:
+    """小さな書き込みをまとめ、buffer_size 文字ごとに書き込み先へ出力"""
+
+    __slots__ = ('f', 'buffer_size', 'parts', 'size')
+
+    def __init__(self, f, buffer_size: int):
+        self.f = f
+        self.buffer_size = buffer_size
+        self.parts: List[str] = []
+        self.size = 0
+
+    def write(self, text: str):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.parts:
+            self.f.write(''.join(self.parts))
+            self.parts.clear()
+            self.size = 0
+
+
+def _fit_row(row: list, width: int) -> list:
+    """行の長さを列数に揃える（足りない列は空文字列、余る列は切り捨て）"""
+    if len(row) == width:
+        return row
+    return list(row[:width]) + [''] * (width - len(row))
+
+
+def _render_rows(rows: List[list], width: int) -> str:
+    """複数行をまとめてMarkdownの行の文字列にする"""
+    if not all(len(row) == width for row in rows):
+        rows = [_fit_row(row, width) for row in rows]
+    try:
+        # 全てのセルが文字列なら変換せずに連結する
+        body = ' |\n| '.join(map(' | '.join, rows))
+    except TypeError:
+        body = ' |\n| '.join([' | '.join(map(str, row)) for row in rows])
+    return '| ' + body + ' |\n'
+
+
+def _display_width(text: str) -> int:
+    """等幅フォントでの表示幅（全角・東アジアの広い文字は2）"""
+    if text.isascii():
+        return len(text)
+    return sum(2 if unicodedata.east_asian_width(char) in 'WF' else 1 for char in text)
+
+
+def _pad(text: str, width: int) -> str:
+    """表示幅が width になるよう右に空白を足す"""
+    return text + ' ' * (width - _display_width(text))
+
@@ -0,0 +1,92 @@
+"""
+Styles - Excelのセルの書式を名前で共有するレジストリ
+"""
+import inspect
+from typing import Dict, NamedTuple, Optional
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles import Font, Alignment
+
+try:
+    # 書式の番号を共有するための openpyxl の内部API（動作を確認した版は requirements.txt の範囲）
+    from openpyxl.styles.cell_style import StyleArray
+except ImportError:
+    StyleArray = None
+
+
+class CellStyle(NamedTuple):
+    """名前付きの書式（共有するため変更しない）"""
+    font: Font
+    alignment: Optional[Alignment] = None
+
+
+# ライターが使う書式（Fontなどはモジュールの読み込み時に1回だけ作成する）
+STYLES: Dict[str, CellStyle] = {
+    'title': CellStyle(Font(size=14, bold=True)),
+    'header': CellStyle(Font(bold=True)),
+    'code': CellStyle(Font(name='Courier New', size=9)),
+}
+
+
+def _shared_styles_supported(wb) -> bool:
+    """スタイルの番号の共有に使う openpyxl の内部API（StyleArray、ブックの書式一覧）があるか"""
+    return (StyleArray is not None
+            and hasattr(wb, '_fonts') and hasattr(wb, '_alignments')
+            and 'style_array' in inspect.signature(Cell).parameters)
+
+
+class StyleRegistry:
+    """
+    ブックごとに書式をスタイルの番号（StyleArray）に変換して共有
+
+    cell.font への代入はセルごとにFontのハッシュを計算してブックのフォント一覧を探すため、
+    同じ書式のセルが多いと遅い。書式ごとに一度だけ番号を求め、セルにはその写しを設定する。
+    openpyxl の内部APIがない版では、公開APIの cell.font・cell.alignment への代入で設定する。
+    """
+
+    def __init__(self, wb, styles: Dict[str, CellStyle] = STYLES):
+        """
+        Args:
+            wb: 書き込み先のブック
+            styles: 名前と書式の対応
+        """
+        self.wb = wb
+        self.styles = styles
+        self._arrays: Dict[str, 'StyleArray'] = {}
+        self.shared = _shared_styles_supported(wb)
+
+    def style_array(self, name: str) -> 'StyleArray':
+        """
+        書式の名前に対応するスタイルの番号（初回はブックに書式を登録する）
+
+        Raises:
+            KeyError: 書式の名前が不明な場合
+        """
+        array = self._arrays.get(name)
+        if array is None:
+            style = self.styles[name]
+            array = StyleArray()
+            array.fontId = self.wb._fonts.add(style.font)
+            if style.alignment is not None:
+                array.alignmentId = self.wb._alignments.add(style.alignment)
+            self._arrays[name] = array
+        return array
+
+    def make_cells(self, ws, values, name: str) -> list:
+        """値のリストを書式付きのセルのリストに変換（書き込み専用・通常のシートの両方で使える）"""
+        if not self.shared:
+            return self._make_public_cells(ws, values, self.styles[name])
+
+        array = self.style_array(name)
+        # Cell は style_array の写しを持つため、セル同士で番号を共有しない
+        return [Cell(ws, row=1, column=1, value=value, style_array=array) for value in values]
+
+    def _make_public_cells(self, ws, values, style: CellStyle) -> list:
+        """公開APIで書式を設定したセルのリスト（セルごとに書式を探すため遅い）"""
+        cells = []
+        for value in values:
+            cell = WriteOnlyCell(ws, value=value)
+            cell.font = style.font
+            if style.alignment is not None:
+                cell.alignment = style.alignment
+            cells.append(cell)
+        return cells